@@ -0,0 +1,224 @@
+from datetime import datetime
+import json
+import platform
+import random
+import statistics
+import time
+
+from entità.configurazione_prodotti import CatalogoProdotti, Prodotto
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.esecuzione_parallela import esegui_aggregato_parallelo
+from entità.piano_scenario import svuota_cache_piani
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+
+
+# ===============================================
+# BENCHMARK DEI PERCORSI CRITICI
+# ===============================================
+PROFILI = {
+    'rapido': {
+        'prodotti': (3, 100),
+        'repliche': (1_000, 10_000),
+        'worker': (1, 2),
+    },
+    'completo': {
+        'prodotti': (3, 100, 1_000, 10_000),
+        'repliche': (1_000, 10_000, 100_000),
+        'worker': (1, 2, 4),
+    },
+}
+SOGLIA_DEFAULT = 0.10       # rallentamento relativo oltre il quale un caso è segnalato
+DURATA_MINIMA = 0.2         # secondi minimi per ogni misura
+RIPETIZIONI = 5
+SCENARIO_BENCHMARK = 'alta_produzione'
+
+
+def catalogo_sintetico(n_prodotti: int, seed: int = 0) -> CatalogoProdotti:
+    """Catalogo di n_prodotti con tempi e capacità casuali ma riproducibili"""
+    rng = random.Random(seed)
+    return CatalogoProdotti([
+        Prodotto(
+            nome=f"Prodotto {i:05d}",
+            unita_misura='kg',
+            tempo_base_produzione=round(rng.uniform(0.5, 5.0), 2),
+            capacita_max_giornaliera=rng.randint(500, 10_000),
+        )
+        for i in range(n_prodotti)
+    ])
+
+
+def misura(funzione, prepara=None, ripetizioni: int = RIPETIZIONI, durata_minima: float = DURATA_MINIMA) -> dict:
+    """
+    Tempo per chiamata di funzione(): il numero di chiamate per ripetizione cresce finché la
+    ripetizione dura almeno durata_minima, poi si ripete la misura e si tengono minimo e mediana
+
+    Args:
+        funzione (callable): operazione da misurare, senza argomenti
+        prepara (callable | None): eseguita prima di ogni chiamata, fuori dalla misura
+
+    Returns:
+        dict: secondi per chiamata (minimo e mediana), chiamate per ripetizione e ripetizioni
+    """
+    def ripetizione(chiamate: int) -> float:
+        totale = 0.0
+        for _ in range(chiamate):
+            if prepara is not None:
+                prepara()
+            inizio = time.perf_counter()
+            funzione()
+            totale += time.perf_counter() - inizio
+        return totale
+
+    chiamate = 1
+    while True:
+        durata = ripetizione(chiamate)
+        if durata >= durata_minima or chiamate >= 1 << 20:
+            break
+        chiamate *= 2 if durata == 0 else max(2, min(10, int(durata_minima / durata) + 1))
+
+    tempi = [durata / chiamate] + [ripetizione(chiamate) / chiamate for _ in range(ripetizioni - 1)]
+    return {
+        'secondi': min(tempi),
+        'mediana': statistics.median(tempi),
+        'chiamate': chiamate,
+        'ripetizioni': ripetizioni,
+    }
+
+
+def _casi_catalogo(scenario, n_prodotti: int):
+    """Percorsi critici di un singolo simulatore con un catalogo di n_prodotti"""
+    catalogo = catalogo_sintetico(n_prodotti)
+    simulatore = SimulatoreProduzioneKimbo(scenario, catalogo, 0)
+    quantita = simulatore.genera_quantita_casuali()
+    parametri = simulatore.genera_parametri_casuali()
+
+    yield f"applica_scenario[prodotti={n_prodotti}]", simulatore._applica_scenario, None
+    yield f"applica_scenario_senza_cache[prodotti={n_prodotti}]", simulatore._applica_scenario, svuota_cache_piani
+    yield f"genera_quantita_casuali[prodotti={n_prodotti}]", simulatore.genera_quantita_casuali, None
+    yield f"genera_parametri_casuali[prodotti={n_prodotti}]", simulatore.genera_parametri_casuali, None
+    yield (f"calcola_tempo_produzione[prodotti={n_prodotti}]",
+           lambda: simulatore.calcola_tempo_produzione(quantita, parametri), None)
+    yield f"simula_produzione_completa[prodotti={n_prodotti}]", simulatore.simula_produzione_completa, None
+
+
+def esegui_benchmark(profilo: str = 'rapido', durata_minima: float = DURATA_MINIMA,
+                     ripetizioni: int = RIPETIZIONI, stampa: bool = False) -> dict:
+    """
+    Misura i percorsi critici al variare di numero di prodotti, repliche e worker
+
+    Args:
+        profilo (str): 'rapido' o 'completo' (vedi PROFILI)
+        durata_minima (float): secondi minimi per ogni ripetizione di una misura
+        ripetizioni (int): ripetizioni di ogni misura
+        stampa (bool): stampa ogni caso man mano che viene misurato
+
+    Returns:
+        dict: ambiente di esecuzione e tempi per caso, serializzabile in JSON
+    """
+    if profilo not in PROFILI:
+        raise Exception(f"Profilo '{profilo}' non supportato. Valori ammessi: {', '.join(PROFILI)}")
+
+    parametri = PROFILI[profilo]
+    scenario = ConfigurazioneScenari().get_scenario(SCENARIO_BENCHMARK)
+    risultati = {}
+
+    def registra(nome: str, funzione, prepara=None):
+        risultati[nome] = misura(funzione, prepara, ripetizioni, durata_minima)
+        if stampa:
+            print(f"{nome:<60} {risultati[nome]['secondi'] * 1e3:12.4f} ms")
+
+    for n_prodotti in parametri['prodotti']:
+        for nome, funzione, prepara in _casi_catalogo(scenario, n_prodotti):
+            registra(nome, funzione, prepara)
+
+    # Monte Carlo in blocco: catalogo reale e sintetico medio
+    for n_prodotti in parametri['prodotti'][:2]:
+        simulatore = SimulatoreProduzioneKimbo(scenario, catalogo_sintetico(n_prodotti), 0)
+        for n_repliche in parametri['repliche']:
+            registra(f"simula_monte_carlo[prodotti={n_prodotti},repliche={n_repliche}]",
+                     lambda: simulatore.simula_monte_carlo(n_repliche, conserva_repliche=False))
+
+    # Esecuzione parallela: il numero di repliche più alto, a blocchi, su più processi
+    catalogo = catalogo_sintetico(parametri['prodotti'][0])
+    n_repliche = parametri['repliche'][-1]
+    for n_worker in parametri['worker']:
+        registra(f"esegui_aggregato_parallelo[repliche={n_repliche},worker={n_worker}]",
+                 lambda: esegui_aggregato_parallelo(scenario, catalogo, n_repliche, 0, n_worker,
+                                                    dimensione_blocco=max(1, n_repliche // 8)))
+
+    return {
+        'profilo': profilo,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'piattaforma': platform.platform(),
+        'risultati': risultati,
+    }
+
+
+def salva_benchmark(risultati: dict, percorso: str) -> None:
+    with open(percorso, 'w', encoding='utf-8') as file:
+        json.dump(risultati, file, ensure_ascii=False, indent=2)
+
+
+def carica_benchmark(percorso: str) -> dict:
+    try:
+        with open(percorso, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise Exception(f"File di benchmark '{percorso}' non trovato") from None
+
+
+def confronta_benchmark(riferimento: dict, attuale: dict, soglia: float = SOGLIA_DEFAULT) -> dict:
+    """
+    Confronta due esecuzioni caso per caso sul tempo minimo (la misura meno rumorosa)
+
+    Args:
+        riferimento (dict): risultati salvati come baseline
+        attuale (dict): risultati della nuova esecuzione
+        soglia (float): rallentamento relativo ammesso (es. 0.10 = 10%)
+
+    Returns:
+        dict: rapporto per caso, casi rallentati oltre la soglia e casi mancanti
+    """
+    if soglia < 0:
+        raise Exception("La soglia deve essere maggiore o uguale a zero")
+
+    casi = {}
+    rallentamenti = []
+    for nome, misura_attuale in attuale['risultati'].items():
+        misura_riferimento = riferimento['risultati'].get(nome)
+        if misura_riferimento is None:
+            continue
+
+        rapporto = misura_attuale['secondi'] / misura_riferimento['secondi']
+        casi[nome] = {
+            'riferimento_secondi': misura_riferimento['secondi'],
+            'attuale_secondi': misura_attuale['secondi'],
+            'rapporto': rapporto,
+        }
+        if rapporto > 1 + soglia:
+            rallentamenti.append(nome)
+
+    return {
+        'soglia': soglia,
+        'casi': casi,
+        'rallentamenti': rallentamenti,
+        'mancanti': [nome for nome in riferimento['risultati'] if nome not in attuale['risultati']],
+    }
+
+
+def stampa_confronto(confronto: dict) -> None:
+    """Stampa il confronto in forma tabellare, segnalando i casi oltre la soglia"""
+    print(f"{'caso':<60} {'baseline ms':>12} {'attuale ms':>12} {'rapporto':>9}")
+    for nome, caso in confronto['casi'].items():
+        segnale = '  RALLENTATO' if nome in confronto['rallentamenti'] else ''
+        print(f"{nome:<60} {caso['riferimento_secondi'] * 1e3:12.4f} {caso['attuale_secondi'] * 1e3:12.4f} "
+              f"{caso['rapporto']:9.2f}{segnale}")
+
+    for nome in confronto['mancanti']:
+        print(f"{nome:<60} assente nella nuova esecuzione")
+
+    if confronto['rallentamenti']:
+        print(f"\n{len(confronto['rallentamenti'])} casi rallentati oltre il {confronto['soglia']:.0%}")
+    else:
+        print(f"\nNessun rallentamento oltre il {confronto['soglia']:.0%}")
@@ -0,0 +1,205 @@
+import hashlib
+import pickle
+import sqlite3
+import time
+
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+from entità.monte_carlo import risolvi_backend
+from entità.piano_scenario import impronta_scenario
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+
+
+# ===============================================
+# CACHE PERSISTENTE DEI RISULTATI
+# ===============================================
+PERCORSO_DEFAULT = '.cache_simulazioni.sqlite'
+DIMENSIONE_MASSIMA_DEFAULT = 256 * 1024 * 1024  # byte
+# Versione del modello e della struttura dei risultati, parte della chiave: va incrementata a ogni
+# modifica che cambia i numeri o i campi dei risultati, così le voci precedenti non sono più lette
+# (restano nel file finché non sono eliminate come meno recenti)
+VERSIONE = 3
+
+
+class CacheRisultati:
+    """
+    Archivio locale (SQLite) dei risultati delle simulazioni.
+    La chiave è l'hash canonico di versione, tipo di simulazione, scenario, prodotti, capacità dell'impianto,
+    seed e numero di repliche:
+    con un seed fissato il risultato non può cambiare, quindi viene calcolato una sola volta.
+    Superata la dimensione massima si eliminano le voci usate meno di recente.
+    """
+
+    def __init__(self, percorso: str = PERCORSO_DEFAULT, dimensione_massima: int = DIMENSIONE_MASSIMA_DEFAULT):
+        """
+        Args:
+            percorso (str): file SQLite (':memory:' per una cache non persistente)
+            dimensione_massima (int): byte massimi occupati dai risultati salvati
+        """
+        if dimensione_massima <= 0:
+            raise Exception("La dimensione massima della cache deve essere maggiore di zero")
+
+        self.percorso = percorso
+        self.dimensione_massima = dimensione_massima
+        self.hits = 0
+        self.misses = 0
+
+        self._connessione = sqlite3.connect(percorso)
+        self._connessione.execute("""
+            CREATE TABLE IF NOT EXISTS risultati (
+                chiave TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                nome_scenario TEXT NOT NULL,
+                hash_scenario TEXT NOT NULL,
+                hash_prodotti TEXT NOT NULL,
+                dati BLOB NOT NULL,
+                dimensione INTEGER NOT NULL,
+                ultimo_accesso REAL NOT NULL
+            )
+        """)
+        self._connessione.execute("CREATE INDEX IF NOT EXISTS idx_accesso ON risultati (ultimo_accesso)")
+        self._connessione.commit()
+
+    @staticmethod
+    def chiave(tipo: str, scenario: Scenario, catalogo: CatalogoProdotti, capacita_totale_giornaliera: int,
+               seed: int, n_repliche: int) -> str:
+        """Hash canonico della configurazione di una simulazione"""
+        testo = (f"{VERSIONE}:{tipo}:{impronta_scenario(scenario)}:{catalogo.impronta}:{capacita_totale_giornaliera}:"
+                 f"{seed}:{n_repliche}")
+        return hashlib.sha256(testo.encode()).hexdigest()
+
+    def leggi(self, chiave: str):
+        """Restituisce il risultato salvato oppure None, aggiornandone l'ultimo accesso"""
+        riga = self._connessione.execute("SELECT dati FROM risultati WHERE chiave = ?", (chiave,)).fetchone()
+        if riga is None:
+            return None
+
+        self._connessione.execute("UPDATE risultati SET ultimo_accesso = ? WHERE chiave = ?", (time.time(), chiave))
+        self._connessione.commit()
+        return pickle.loads(riga[0])
+
+    def scrivi(self, chiave: str, tipo: str, scenario: Scenario, catalogo: CatalogoProdotti, valore) -> None:
+        """Salva un risultato ed elimina le voci meno recenti oltre la dimensione massima"""
+        dati = pickle.dumps(valore, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(dati) > self.dimensione_massima:
+            return  # Non entrerebbe comunque: non si svuota la cache per nulla
+
+        self._connessione.execute(
+            "INSERT OR REPLACE INTO risultati VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (chiave, tipo, scenario.nome, impronta_scenario(scenario), catalogo.impronta, dati, len(dati), time.time()),
+        )
+        self._elimina_meno_recenti()
+        self._connessione.commit()
+
+    def _elimina_meno_recenti(self) -> None:
+        occupati = self._connessione.execute("SELECT COALESCE(SUM(dimensione), 0) FROM risultati").fetchone()[0]
+        if occupati <= self.dimensione_massima:
+            return
+
+        righe = self._connessione.execute("SELECT chiave, dimensione FROM risultati ORDER BY ultimo_accesso").fetchall()
+        da_eliminare = []
+        for chiave, dimensione in righe:
+            if occupati <= self.dimensione_massima:
+                break
+            da_eliminare.append((chiave,))
+            occupati -= dimensione
+
+        self._connessione.executemany("DELETE FROM risultati WHERE chiave = ?", da_eliminare)
+
+    def ottieni_o_calcola(self, tipo: str, scenario: Scenario | dict, prodotti, capacita_totale_giornaliera: int,
+                          seed: int | None, n_repliche: int, calcola):
+        """
+        Restituisce il risultato dalla cache o lo calcola con calcola() e lo salva.
+        Senza seed il risultato è casuale e non viene mai messo in cache. capacita_totale_giornaliera
+        deve essere quella usata da calcola(): stabilimenti diversi non condividono le voci.
+
+        Returns:
+            tuple: (risultato, True se letto dalla cache)
+        """
+        if seed is None:
+            return calcola(), False
+
+        scenario = Scenario.da_valore(scenario)
+        catalogo = CatalogoProdotti.da_prodotti(prodotti)
+        chiave = self.chiave(tipo, scenario, catalogo, capacita_totale_giornaliera, seed, n_repliche)
+
+        valore = self.leggi(chiave)
+        if valore is not None:
+            self.hits += 1
+            return valore, True
+
+        self.misses += 1
+        valore = calcola()
+        self.scrivi(chiave, tipo, scenario, catalogo, valore)
+        return valore, False
+
+    def simula_produzione_completa(self, scenario: Scenario | dict, prodotti, seed: int | None,
+                                   capacita_totale_giornaliera: int | None = None) -> tuple[dict, bool]:
+        """
+        Risultato di simula_produzione_completa per un simulatore appena creato con questo seed
+        e questa capacità dell'impianto (default: ConfigurazioneStabilimento), dalla cache se disponibile
+        """
+        capacita = capacita_totale_giornaliera
+        if capacita is None:
+            capacita = ConfigurazioneStabilimento.capacita_totale_giornaliera
+        return self.ottieni_o_calcola(
+            'completa', scenario, prodotti, capacita, seed, 1,
+            lambda: SimulatoreProduzioneKimbo(scenario, prodotti, seed, capacita_totale_giornaliera=capacita)
+            .simula_produzione_completa(),
+        )
+
+    def simula_monte_carlo(self, scenario: Scenario | dict, prodotti, seed: int | None, n_repliche: int,
+                           backend: str = 'auto', capacita_totale_giornaliera: int | None = None) -> tuple[dict, bool]:
+        """
+        Risultato di simula_monte_carlo (aggregati e vettori per replica) per un simulatore appena creato
+        con questo seed e questa capacità dell'impianto (default: ConfigurazioneStabilimento),
+        dalla cache se disponibile
+        """
+        backend = risolvi_backend(backend)
+        capacita = capacita_totale_giornaliera
+        if capacita is None:
+            capacita = ConfigurazioneStabilimento.capacita_totale_giornaliera
+        return self.ottieni_o_calcola(
+            f'monte_carlo:{backend}', scenario, prodotti, capacita, seed, n_repliche,
+            lambda: SimulatoreProduzioneKimbo(scenario, prodotti, seed, capacita_totale_giornaliera=capacita)
+            .simula_monte_carlo(n_repliche, backend),
+        )
+
+    def invalida_prodotti(self, hash_prodotti: str) -> None:
+        """Elimina i risultati calcolati con un catalogo prodotti non più valido"""
+        self._connessione.execute("DELETE FROM risultati WHERE hash_prodotti = ?", (hash_prodotti,))
+        self._connessione.commit()
+
+    def invalida_scenario(self, scenario: Scenario) -> None:
+        """Elimina i risultati di scenari con lo stesso nome ma una configurazione diversa"""
+        self._connessione.execute(
+            "DELETE FROM risultati WHERE nome_scenario = ? AND hash_scenario != ?",
+            (scenario.nome, impronta_scenario(scenario)),
+        )
+        self._connessione.commit()
+
+    def collega(self, configurazione_prodotti=None, configurazione_scenari=None) -> None:
+        """Invalida automaticamente la cache quando add_prodotto/add_scenario modificano le configurazioni"""
+        if configurazione_prodotti is not None:
+            configurazione_prodotti.aggiungi_osservatore(self.invalida_prodotti)
+        if configurazione_scenari is not None:
+            configurazione_scenari.aggiungi_osservatore(self.invalida_scenario)
+
+    def svuota(self) -> None:
+        self._connessione.execute("DELETE FROM risultati")
+        self._connessione.commit()
+
+    def statistiche(self) -> dict:
+        voci, occupati = self._connessione.execute(
+            "SELECT COUNT(*), COALESCE(SUM(dimensione), 0) FROM risultati").fetchone()
+        return {
+            'voci': voci,
+            'byte_occupati': occupati,
+            'dimensione_massima': self.dimensione_massima,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def chiudi(self) -> None:
+        self._connessione.close()
@@ -0,0 +1,104 @@
+from statistics import NormalDist
+import math
+import time
+
+from entità.statistiche_online import AggregatoreRepliche
+
+
+# ===============================================
+# NUMERO DI REPLICHE ADATTIVO
+# ===============================================
+DIMENSIONE_BATCH = 1_000
+
+
+def _precisione_relativa(statistica, z: float) -> float:
+    """Semiampiezza dell'intervallo di confidenza della media divisa per la media"""
+    if statistica.n < 2:
+        return math.inf
+    semiampiezza = z * statistica.deviazione_standard / math.sqrt(statistica.n)
+    if statistica.media == 0:
+        return 0.0 if semiampiezza == 0 else math.inf
+    return semiampiezza / abs(statistica.media)
+
+
+def simula_fino_a_precisione(simulatore, precisione_relativa: float = 0.01, livello_confidenza: float = 0.95,
+                             per_prodotto: bool = False, dimensione_batch: int = DIMENSIONE_BATCH,
+                             repliche_massime: int | None = None, budget_secondi: float | None = None,
+                             backend: str = 'auto') -> dict:
+    """
+    Esegue repliche a batch finché l'intervallo di confidenza di tempo_totale_ore
+    (e, se richiesto, dei tempi di ogni prodotto) non è abbastanza stretto
+
+    Dopo ogni batch si stima dalla varianza osservata quante repliche mancano e si dimensiona
+    il batch successivo di conseguenza: gli scenari poco variabili si fermano presto,
+    quelli rumorosi ricevono più repliche.
+
+    Args:
+        simulatore (SimulatoreProduzioneKimbo): simulatore già configurato
+        precisione_relativa (float): semiampiezza massima ammessa in rapporto alla media (es. 0.01 = 1%)
+        livello_confidenza (float): livello dell'intervallo di confidenza
+        per_prodotto (bool): richiede la precisione anche sul tempo di ogni prodotto
+        dimensione_batch (int): repliche minime per batch
+        repliche_massime (int | None): limite al numero di repliche
+        budget_secondi (float | None): limite di tempo reale
+
+    Returns:
+        dict: repliche usate, motivo dell'arresto, precisione ottenuta e statistiche
+    """
+    if precisione_relativa <= 0:
+        raise Exception("La precisione relativa deve essere maggiore di zero")
+    if not 0 < livello_confidenza < 1:
+        raise Exception("Il livello di confidenza deve essere compreso tra 0 e 1")
+    if dimensione_batch < 2:
+        raise Exception("La dimensione del batch deve essere almeno 2")
+    if repliche_massime is not None and repliche_massime < 2:
+        raise Exception("Il numero massimo di repliche deve essere almeno 2")
+
+    z = NormalDist().inv_cdf(0.5 + livello_confidenza / 2)
+    aggregatore = AggregatoreRepliche()
+    inizio = time.perf_counter()
+    prossimo_batch = dimensione_batch
+
+    while True:
+        if repliche_massime is not None:
+            prossimo_batch = min(prossimo_batch, repliche_massime - aggregatore.n_repliche)
+        aggregatore.aggiorna_colonne(simulatore.genera_colonne_monte_carlo(prossimo_batch, backend))
+
+        statistiche = [aggregatore.tempo_totale_ore]
+        if per_prodotto:
+            statistiche.extend(aggregatore.tempi_prodotti.values())
+        precisioni = [_precisione_relativa(s, z) for s in statistiche]
+        precisione = max(precisioni)
+
+        if precisione <= precisione_relativa:
+            motivo = 'precisione_raggiunta'
+            break
+        if repliche_massime is not None and aggregatore.n_repliche >= repliche_massime:
+            motivo = 'repliche_massime'
+            break
+        if budget_secondi is not None and time.perf_counter() - inizio >= budget_secondi:
+            motivo = 'budget_tempo'
+            break
+
+        # La semiampiezza decresce come 1/sqrt(n): stima delle repliche necessarie,
+        # senza più che raddoppiare ad ogni passo per non superare troppo l'obiettivo
+        n = aggregatore.n_repliche
+        necessarie = math.ceil(n * (precisione / precisione_relativa) ** 2) if math.isfinite(precisione) else 2 * n
+        prossimo_batch = max(dimensione_batch, min(necessarie - n, n))
+
+        # Con un budget di tempo il batch non deve superare le repliche che restano nel budget
+        if budget_secondi is not None:
+            trascorsi = time.perf_counter() - inizio
+            repliche_nel_budget = int((budget_secondi - trascorsi) * n / trascorsi) if trascorsi > 0 else prossimo_batch
+            prossimo_batch = max(dimensione_batch, min(prossimo_batch, repliche_nel_budget))
+
+    return {
+        'scenario': simulatore.scenario_corrente,
+        'repliche_usate': aggregatore.n_repliche,
+        'motivo_arresto': motivo,
+        'precisione_obiettivo': precisione_relativa,
+        'precisione_ottenuta': precisione,
+        'livello_confidenza': livello_confidenza,
+        'secondi': time.perf_counter() - inizio,
+        'statistiche': aggregatore.riepilogo(),
+    }
@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+import hashlib
+import os
+import pickle
+import signal
+import threading
+import time
+
+
+# ===============================================
+# CHECKPOINT DELLE ESECUZIONI LUNGHE
+# ===============================================
+INTERVALLO_DEFAULT = 60.0   # secondi tra due salvataggi
+VERSIONE = 1
+
+
+class Checkpoint:
+    """
+    Stato di avanzamento di un'esecuzione lunga (esegui_aggregato_parallelo, esegui_sweep) salvato su disco.
+
+    Le esecuzioni procedono per unità (blocchi di repliche o gruppi di punti) con seed derivato
+    dal seed principale e dall'indice dell'unità: lo stato del generatore casuale all'inizio di
+    ogni unità è quindi determinato dal suo indice, e per riprendere bastano il numero di unità
+    completate e gli aggregati parziali. Una ripresa produce lo stesso risultato, bit per bit,
+    di un'esecuzione mai interrotta.
+
+    Il file è scritto in modo atomico (file temporaneo + os.replace): un'interruzione durante
+    il salvataggio lascia intatto il checkpoint precedente.
+    """
+
+    def __init__(self, percorso: str, intervallo_secondi: float = INTERVALLO_DEFAULT):
+        """
+        Args:
+            percorso (str): file del checkpoint
+            intervallo_secondi (float): secondi minimi tra due salvataggi periodici
+        """
+        if intervallo_secondi < 0:
+            raise Exception("L'intervallo tra i checkpoint non può essere negativo")
+
+        self.percorso = percorso
+        self.intervallo_secondi = intervallo_secondi
+        self.salvataggi = 0
+        self._ultimo_salvataggio = time.monotonic()
+        self._interrotto = False
+
+    @staticmethod
+    def impronta(tipo: str, argomenti: dict) -> str:
+        """Hash degli argomenti che determinano il risultato dell'esecuzione"""
+        return hashlib.sha256(f"{tipo}:{sorted(argomenti.items())!r}".encode()).hexdigest()
+
+    def leggi(self) -> dict | None:
+        """Contenuto grezzo del checkpoint, None se il file non esiste"""
+        try:
+            with open(self.percorso, 'rb') as file:
+                stato = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError):
+            raise Exception(f"Il file '{self.percorso}' non è un checkpoint valido") from None
+
+        if not isinstance(stato, dict) or stato.get('versione') != VERSIONE:
+            raise Exception(f"Il file '{self.percorso}' non è un checkpoint valido per questa versione")
+        return stato
+
+    def carica(self, tipo: str, argomenti: dict) -> dict | None:
+        """
+        Stato salvato da un'esecuzione con gli stessi argomenti, None se non c'è un checkpoint
+
+        Returns:
+            dict | None: unità completate e stato parziale ('completate', 'parziale')
+        """
+        stato = self.leggi()
+        if stato is None:
+            return None
+        if stato['tipo'] != tipo or stato['impronta'] != self.impronta(tipo, argomenti):
+            raise Exception(f"Il checkpoint '{self.percorso}' appartiene a un'altra esecuzione")
+        return stato
+
+    def salva(self, tipo: str, argomenti: dict, completate: int, totale: int, parziale) -> None:
+        """Scrive il checkpoint in modo atomico"""
+        stato = {
+            'versione': VERSIONE,
+            'tipo': tipo,
+            'impronta': self.impronta(tipo, argomenti),
+            'argomenti': argomenti,
+            'completate': completate,
+            'totale': totale,
+            'parziale': parziale,
+        }
+
+        temporaneo = f"{self.percorso}.tmp"
+        with open(temporaneo, 'wb') as file:
+            pickle.dump(stato, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporaneo, self.percorso)
+
+        self.salvataggi += 1
+        self._ultimo_salvataggio = time.monotonic()
+
+    def avanza(self, tipo: str, argomenti: dict, completate: int, totale: int, parziale) -> None:
+        """
+        Da chiamare dopo ogni unità completata: salva se è trascorso l'intervallo, se l'esecuzione
+        è terminata o se è stata chiesta un'interruzione; in quest'ultimo caso solleva KeyboardInterrupt
+        """
+        scaduto = time.monotonic() - self._ultimo_salvataggio >= self.intervallo_secondi
+        if scaduto or self._interrotto or completate == totale:
+            self.salva(tipo, argomenti, completate, totale, parziale)
+        if self._interrotto and completate < totale:
+            raise KeyboardInterrupt
+
+    @contextmanager
+    def proteggi(self):
+        """
+        Durante il blocco SIGINT (Ctrl+C) e SIGTERM non interrompono l'unità in corso: avanza()
+        salva lo stato appena l'unità è completata e solleva poi KeyboardInterrupt.
+        Un secondo segnale interrompe subito. I gestori si installano solo nel thread principale.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+
+        def interrompi(numero, frame):
+            if self._interrotto:
+                raise KeyboardInterrupt
+            self._interrotto = True
+
+        precedenti = {s: signal.signal(s, interrompi) for s in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            yield
+        finally:
+            for numero, gestore in precedenti.items():
+                signal.signal(numero, gestore)
@@ -0,0 +1,775 @@
+from contextlib import nullcontext
+from dataclasses import replace
+from functools import partial
+import argparse
+import csv
+import json
+import sys
+
+from entità.benchmark import (DURATA_MINIMA, PROFILI, RIPETIZIONI, SOGLIA_DEFAULT, carica_benchmark,
+                               confronta_benchmark, esegui_benchmark, salva_benchmark, stampa_confronto)
+from entità.campionamento_adattivo import DIMENSIONE_BATCH, simula_fino_a_precisione
+from entità.checkpoint import INTERVALLO_DEFAULT, Checkpoint
+from entità.configurazione_prodotti import ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.configurazione_stabilimento import ConfigurazioneGruppo
+from entità.esecuzione_parallela import deriva_seed, esegui_aggregato_parallelo
+from entità.esperimenti import esegui_sweep, griglia_fattoriale, ipercubo_latino, scrivi_tabella_csv
+from entità.fermi_macchina import ModelloFermi
+from entità.formato_colonnare import scrivi_colonnare
+from entità.gruppo_stabilimenti import simula_gruppo
+from entità.monte_carlo import DIMENSIONE_BLOCCO
+from entità.ottimizzazione_capacita import (COSTO_EFFICIENZA, TURNI_MASSIMI, costo_predefinito, efficienza_necessaria,
+                                           ottimizza_capacita)
+from entità.report import CRITERI, LIVELLI, PRIMI_DEFAULT, dati_report, rendi_report, scrivi_report
+from entità.report import FORMATI as FORMATI_REPORT
+from entità.sensibilita import (AMPIEZZA_DEFAULT, CAMPIONI_SOBOL, LIVELLI_MORRIS, METODI, REPLICHE_DEFAULT,
+                                 TRAIETTORIE_MORRIS, USCITE, analizza_sensibilita, intervalli_predefiniti)
+from entità.servizio import HOST_DEFAULT, LIMITE_CODA, PORTA_DEFAULT, REPLICHE_MASSIME, avvia_servizio
+from entità.simulatore_eventi import SimulatoreEventiKimbo
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+from entità.sorgenti_domanda import apri_sorgente
+from entità.stima_analitica import probabilita_oltre, stima_analitica, verifica_monte_carlo
+from entità.strumentazione import Strumentazione
+
+
+# ===============================================
+# ESECUZIONE NON INTERATTIVA
+# ===============================================
+FORMATI = ('jsonl', 'csv', 'colonnare')
+
+
+def scrivi_jsonl(record, destinazione) -> int:
+    """
+    Scrive un record JSON per riga man mano che il generatore li produce
+
+    Returns:
+        int: numero di record scritti
+    """
+    scritti = 0
+    for riga in record:
+        destinazione.write(json.dumps(riga, ensure_ascii=False))
+        destinazione.write('\n')
+        scritti += 1
+
+    return scritti
+
+
+def scrivi_csv(record, destinazione, nomi_prodotti: list[str]) -> int:
+    """
+    Scrive i record in formato CSV, con una coppia di colonne (quantità, tempo) per prodotto
+
+    Returns:
+        int: numero di record scritti
+    """
+    intestazione = ['replica', 'tempo_totale_ore', 'tempo_totale_giorni', 'vincoli_rispettati', 'capacita_totale_effettiva']
+    for nome in nomi_prodotti:
+        intestazione.append(f"quantita:{nome}")
+        intestazione.append(f"tempo_produzione_ore:{nome}")
+
+    writer = csv.writer(destinazione)
+    writer.writerow(intestazione)
+
+    scritti = 0
+    for riga in record:
+        valori = [riga['replica'], riga['tempo_totale_ore'], riga['tempo_totale_giorni'],
+                  int(riga['vincoli_rispettati']), riga['capacita_totale_effettiva']]
+        for nome in nomi_prodotti:
+            valori.append(riga['quantita'][nome])
+            valori.append(riga['tempo_produzione_ore'][nome])
+        writer.writerow(valori)
+        scritti += 1
+
+    return scritti
+
+
+def crea_strumentazione(argomenti: argparse.Namespace) -> Strumentazione | None:
+    """Strumentazione richiesta con --strumenta/--allocazioni/--profila, None se nessuna opzione è attiva"""
+    if not (argomenti.strumenta or argomenti.allocazioni or argomenti.profila):
+        return None
+    return Strumentazione(allocazioni=argomenti.allocazioni, profilo=argomenti.profila)
+
+
+def aggiungi_opzioni_strumentazione(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--strumenta', action='store_true', help='Stampa su stderr i tempi per fase')
+    parser.add_argument('--allocazioni', action='store_true', help='Misura anche la memoria allocata per fase')
+    parser.add_argument('--profila', action='store_true', help='Aggiunge al report il profilo cProfile')
+
+
+def crea_checkpoint(argomenti: argparse.Namespace) -> Checkpoint | None:
+    if not argomenti.checkpoint:
+        return None
+    return Checkpoint(argomenti.checkpoint, argomenti.intervallo_checkpoint)
+
+
+def aggiungi_opzioni_checkpoint(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--checkpoint', help='File in cui salvare l\'avanzamento (riprendibile con "riprendi")')
+    parser.add_argument('--intervallo-checkpoint', type=float, default=INTERVALLO_DEFAULT,
+                        help=f'Secondi tra due salvataggi del checkpoint (default: {INTERVALLO_DEFAULT:g})')
+
+
+def _segnala_interruzione(checkpoint: Checkpoint | None) -> int:
+    """Messaggio di uscita dopo Ctrl+C/SIGTERM, con il comando per riprendere"""
+    if checkpoint is not None and checkpoint.salvataggi:
+        print(f"Interrotto: avanzamento salvato in '{checkpoint.percorso}'. "
+              f"Per riprendere: python main.py riprendi {checkpoint.percorso}", file=sys.stderr)
+    else:
+        print("Interrotto", file=sys.stderr)
+    return 130
+
+
+def comando_run(argomenti: argparse.Namespace) -> int:
+    """Esegue le repliche richieste e le scrive in streaming su stdout o su file"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    scenario = configurazione_scenari.get_scenario(argomenti.scenario)
+    prodotti = configurazione_prodotti.get_prodotti()
+
+    strumentazione = crea_strumentazione(argomenti)
+    simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, argomenti.seed, strumentazione,
+                                           fermi=carica_fermi(argomenti))
+
+    if argomenti.formato == 'colonnare':
+        if not argomenti.output:
+            raise Exception("Il formato colonnare richiede --output")
+        with simulatore.strumentazione.profila(), simulatore.strumentazione.fase('totale'):
+            scrivi_colonnare(simulatore, argomenti.repliche, argomenti.output, argomenti.blocco, argomenti.backend)
+        if strumentazione is not None:
+            strumentazione.stampa_report(sys.stderr)
+        return 0
+
+    record = simulatore.genera_repliche(argomenti.repliche, argomenti.blocco, argomenti.backend)
+
+    destinazione = open(argomenti.output, 'w', encoding='utf-8', newline='') if argomenti.output else sys.stdout
+    try:
+        with simulatore.strumentazione.profila(), simulatore.strumentazione.fase('totale'):
+            if argomenti.formato == 'jsonl':
+                scrivi_jsonl(record, destinazione)
+            else:
+                scrivi_csv(record, destinazione, [p.nome for p in prodotti])
+    finally:
+        if destinazione is not sys.stdout:
+            destinazione.close()
+
+    if strumentazione is not None:
+        strumentazione.stampa_report(sys.stderr)
+
+    return 0
+
+
+def carica_fermi(argomenti: argparse.Namespace) -> ModelloFermi | None:
+    """Modello di guasti e cambi formato indicato con --fermi, None se assente"""
+    if not argomenti.fermi:
+        return None
+    return ModelloFermi.da_json(argomenti.fermi)
+
+
+def aggiungi_opzione_fermi(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--fermi', help='File JSON con guasti per linea e cambi formato (default: nessun fermo)')
+
+
+def record_orizzonte(scenario, prodotti, giorni: int | None, repliche: int, seed: int | None, sorgente=None,
+                     fermi: ModelloFermi | None = None):
+    """
+    Record giornalieri di più repliche dell'orizzonte, una replica dopo l'altra.
+    Ogni replica ha un seed derivato dal seed principale; le tuple sono convertite in dizionari per prodotto.
+    """
+    for replica in range(repliche):
+        seed_replica = deriva_seed(seed, replica) if seed is not None else None
+        simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, seed_replica, fermi=fermi)
+        nomi = simulatore.catalogo.nomi
+        for record in simulatore.simula_orizzonte(giorni, sorgente=sorgente):
+            riga = record.a_dict()
+            for campo in ('domanda', 'produzione', 'arretrato'):
+                riga[campo] = dict(zip(nomi, riga[campo]))
+            riga['replica'] = replica
+            yield riga
+
+
+def comando_orizzonte(argomenti: argparse.Namespace) -> int:
+    """Simula un orizzonte di più giorni e scrive un record JSON per giorno e replica"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    scenario = configurazione_scenari.get_scenario(argomenti.scenario)
+    sorgente = None
+    giorni = argomenti.giorni
+    if argomenti.domanda_file:
+        sorgente = apri_sorgente(argomenti.domanda_file, prodotti_sconosciuti=argomenti.prodotti_sconosciuti)
+    elif giorni is None:
+        giorni = 365
+
+    record = record_orizzonte(scenario, configurazione_prodotti.get_catalogo(), giorni,
+                              argomenti.repliche, argomenti.seed, sorgente, carica_fermi(argomenti))
+
+    destinazione = open(argomenti.output, 'w', encoding='utf-8') if argomenti.output else sys.stdout
+    try:
+        scrivi_jsonl(record, destinazione)
+    finally:
+        if destinazione is not sys.stdout:
+            destinazione.close()
+
+    return 0
+
+
+def comando_eventi(argomenti: argparse.Namespace) -> int:
+    """Simula a eventi discreti la produzione di un lotto, con le macchine al lavoro solo durante i turni"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    scenario = configurazione_scenari.get_scenario(argomenti.scenario)
+    if argomenti.turni is not None:
+        scenario = replace(scenario, turni_giorno=argomenti.turni)
+    simulatore = SimulatoreEventiKimbo(scenario, configurazione_prodotti.get_catalogo(), argomenti.seed,
+                                       dimensione_lotto=argomenti.dimensione_lotto, ora_inizio=argomenti.ora_inizio)
+
+    risultati = simulatore.simula()
+    risultati['scenario'] = risultati['scenario'].a_dict()
+
+    print(json.dumps(risultati, ensure_ascii=False, indent=2))
+    return 0
+
+
+def comando_report(argomenti: argparse.Namespace) -> int:
+    """
+    Report di una o più simulazioni complete: i report sono resi in memoria e scritti
+    con una sola operazione, in testo, JSON (lista per più repliche) o CSV
+    """
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    scenario = configurazione_scenari.get_scenario(argomenti.scenario)
+    catalogo = configurazione_prodotti.get_catalogo()
+    fermi = carica_fermi(argomenti)
+
+    report = []
+    for replica in range(argomenti.repliche):
+        seed_replica = deriva_seed(argomenti.seed, replica) if argomenti.seed is not None else None
+        simulatore = SimulatoreProduzioneKimbo(scenario, catalogo, seed_replica, fermi=fermi)
+        risultato = simulatore.simula_produzione_completa()
+        dati = dati_report(risultato['quantita_prodotti'], risultato['parametri_operativi'],
+                           risultato['risultati_produzione'], scenario.ore_lavorative_giorno,
+                           argomenti.livello, argomenti.primi, argomenti.criterio)
+        if argomenti.repliche > 1:
+            dati['replica'] = replica
+        report.append(dati)
+
+    testo = rendi_report(report[0] if len(report) == 1 else report, argomenti.formato)
+    if argomenti.output:
+        with open(argomenti.output, 'w', encoding='utf-8', newline='') as destinazione:
+            scrivi_report(testo, destinazione)
+    else:
+        scrivi_report(testo)
+    return 0
+
+
+def comando_stima(argomenti: argparse.Namespace) -> int:
+    """Replica finché la stima di tempo_totale_ore non raggiunge la precisione richiesta"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    scenario = configurazione_scenari.get_scenario(argomenti.scenario)
+    strumentazione = crea_strumentazione(argomenti)
+    simulatore = SimulatoreProduzioneKimbo(scenario, configurazione_prodotti.get_prodotti(), argomenti.seed,
+                                           strumentazione, fermi=carica_fermi(argomenti))
+
+    with simulatore.strumentazione.profila():
+        risultati = simula_fino_a_precisione(
+            simulatore,
+            precisione_relativa=argomenti.precisione,
+            per_prodotto=argomenti.per_prodotto,
+            dimensione_batch=argomenti.batch,
+            repliche_massime=argomenti.repliche_massime,
+            budget_secondi=argomenti.budget_secondi,
+            backend=argomenti.backend,
+        )
+    risultati['scenario'] = risultati['scenario'].a_dict()
+
+    print(json.dumps(risultati, ensure_ascii=False, indent=2))
+    if strumentazione is not None:
+        strumentazione.stampa_report(sys.stderr)
+    return 0
+
+
+def _leggi_campi(specifiche: list[str], latino: bool) -> dict:
+    """
+    Interpreta le opzioni --campo: 'nome=v1,v2,...' per la griglia, 'nome=min:max' per l'ipercubo latino
+    """
+    campi = {}
+    for specifica in specifiche:
+        if '=' not in specifica:
+            raise Exception(f"Campo non valido '{specifica}': usare nome=valori")
+        nome, valori = specifica.split('=', 1)
+        if latino:
+            if ':' not in valori:
+                raise Exception(f"Campo non valido '{specifica}': usare nome=minimo:massimo")
+            minimo, massimo = valori.split(':', 1)
+            campi[nome.strip()] = (float(minimo), float(massimo))
+        else:
+            campi[nome.strip()] = [json.loads(v) for v in valori.split(',')]
+
+    return campi
+
+
+def comando_sweep(argomenti: argparse.Namespace) -> int:
+    """Esegue un piano sperimentale sui campi dello scenario e scrive una riga CSV per punto"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    base = configurazione_scenari.get_scenario(argomenti.scenario)
+    campi = _leggi_campi(argomenti.campo, argomenti.lhs is not None)
+    if argomenti.lhs is not None:
+        punti = ipercubo_latino(base, campi, argomenti.lhs, argomenti.seed)
+    else:
+        punti = griglia_fattoriale(base, campi)
+
+    checkpoint = crea_checkpoint(argomenti)
+    try:
+        righe = esegui_sweep(punti, configurazione_prodotti.get_prodotti(), argomenti.repliche, argomenti.seed,
+                             argomenti.worker, argomenti.backend, checkpoint=checkpoint,
+                             fermi=carica_fermi(argomenti))
+    except KeyboardInterrupt:
+        return _segnala_interruzione(checkpoint)
+
+    return _scrivi_sweep(righe, argomenti.output)
+
+
+def _scrivi_sweep(righe: list[dict], output: str | None) -> int:
+    destinazione = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+    try:
+        scrivi_tabella_csv(righe, destinazione)
+    finally:
+        if destinazione is not sys.stdout:
+            destinazione.close()
+
+    return 0
+
+
+def _stampa_aggregato(risultati: dict) -> None:
+    print(json.dumps({
+        'scenario': risultati['scenario'].a_dict(),
+        'n_repliche': risultati['n_repliche'],
+        'n_worker': risultati['n_worker'],
+        'dimensione_blocco': risultati['dimensione_blocco'],
+        'statistiche': risultati['statistiche'],
+    }, ensure_ascii=False, indent=2))
+
+
+def comando_monte_carlo(argomenti: argparse.Namespace) -> int:
+    """Repliche Monte Carlo aggregate su più processi, con checkpoint opzionale"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    strumentazione = crea_strumentazione(argomenti)
+    checkpoint = crea_checkpoint(argomenti)
+    try:
+        with strumentazione.profila() if strumentazione is not None else nullcontext():
+            risultati = esegui_aggregato_parallelo(
+                configurazione_scenari.get_scenario(argomenti.scenario),
+                configurazione_prodotti.get_catalogo(),
+                argomenti.repliche,
+                argomenti.seed,
+                argomenti.worker,
+                argomenti.backend,
+                argomenti.blocco,
+                strumentazione,
+                checkpoint,
+                carica_fermi(argomenti),
+            )
+    except KeyboardInterrupt:
+        return _segnala_interruzione(checkpoint)
+
+    _stampa_aggregato(risultati)
+    if strumentazione is not None:
+        strumentazione.stampa_report(sys.stderr)
+    return 0
+
+
+def comando_riprendi(argomenti: argparse.Namespace) -> int:
+    """Riprende un'esecuzione monte-carlo o sweep dal suo checkpoint"""
+    checkpoint = Checkpoint(argomenti.checkpoint, argomenti.intervallo_checkpoint)
+    stato = checkpoint.leggi()
+    if stato is None:
+        raise Exception(f"Checkpoint '{argomenti.checkpoint}' non trovato")
+
+    print(f"Ripresa da '{argomenti.checkpoint}': {stato['completate']}/{stato['totale']} unità completate",
+          file=sys.stderr)
+    try:
+        if stato['tipo'] == 'aggregato':
+            risultati = esegui_aggregato_parallelo(n_worker=argomenti.worker, checkpoint=checkpoint,
+                                                   **stato['argomenti'])
+            _stampa_aggregato(risultati)
+            return 0
+
+        righe = esegui_sweep(n_worker=argomenti.worker, checkpoint=checkpoint, **stato['argomenti'])
+    except KeyboardInterrupt:
+        return _segnala_interruzione(checkpoint)
+
+    return _scrivi_sweep(righe, argomenti.output)
+
+
+def comando_gruppo(argomenti: argparse.Namespace) -> int:
+    """Simula stabilimenti e linee in parallelo e riduce i risultati per stabilimento e gruppo"""
+    if argomenti.configurazione:
+        configurazione = ConfigurazioneGruppo.da_json(argomenti.configurazione)
+    else:
+        configurazione = ConfigurazioneGruppo()
+
+    risultati = simula_gruppo(configurazione.get_siti(), argomenti.repliche, argomenti.seed, argomenti.worker,
+                              argomenti.backend, argomenti.blocco)
+    print(json.dumps(risultati, ensure_ascii=False, indent=2))
+    return 0
+
+
+def comando_sensibilita(argomenti: argparse.Namespace) -> int:
+    """Indici di sensibilità (OAT, Morris, Sobol) dell'uscita rispetto a scenario e tempi base"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    base = configurazione_scenari.get_scenario(argomenti.scenario)
+    catalogo = configurazione_prodotti.get_catalogo()
+    if argomenti.fattore:
+        intervalli = _leggi_campi(argomenti.fattore, True)
+    else:
+        intervalli = intervalli_predefiniti(base, catalogo, argomenti.uscita, argomenti.ampiezza)
+
+    risultati = analizza_sensibilita(base, catalogo, argomenti.metodo or METODI, intervalli, argomenti.uscita,
+                                     argomenti.repliche, argomenti.campioni, argomenti.traiettorie,
+                                     argomenti.livelli, argomenti.seed, argomenti.worker, argomenti.backend)
+    print(json.dumps(risultati, ensure_ascii=False, indent=2))
+    return 0
+
+
+def comando_analitica(argomenti: argparse.Namespace) -> int:
+    """Stima in forma chiusa di tempo totale e superamenti, con verifica Monte Carlo opzionale"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    scenario = configurazione_scenari.get_scenario(argomenti.scenario)
+    catalogo = configurazione_prodotti.get_catalogo()
+
+    if argomenti.verifica:
+        risultati = verifica_monte_carlo(scenario, catalogo, argomenti.verifica, argomenti.seed, argomenti.backend)
+        stima = risultati['analitica']
+    else:
+        risultati = stima = stima_analitica(scenario, catalogo)
+
+    if argomenti.soglia_ore:
+        stima['oltre_soglia'] = {str(soglia): probabilita_oltre(stima, soglia) for soglia in argomenti.soglia_ore}
+    stima['scenario'] = stima['scenario'].a_dict()
+
+    print(json.dumps(risultati, ensure_ascii=False, indent=2))
+    return 0
+
+
+def comando_capacita(argomenti: argparse.Namespace) -> int:
+    """Cerca ore, turni ed efficienza più economici per evadere una domanda entro la scadenza"""
+    configurazione_scenari = ConfigurazioneScenari()
+    configurazione_prodotti = ConfigurazioneProdotti()
+
+    domanda = {}
+    for specifica in argomenti.domanda:
+        if '=' not in specifica:
+            raise Exception(f"Domanda non valida '{specifica}': usare nome=quantità")
+        nome, quantita = specifica.rsplit('=', 1)
+        domanda[nome.strip()] = int(quantita)
+
+    livelli = [float(e) for e in argomenti.efficienza.split(',')] if argomenti.efficienza else None
+    scenario = configurazione_scenari.get_scenario(argomenti.scenario)
+    risultati = ottimizza_capacita(
+        scenario,
+        domanda,
+        argomenti.scadenza,
+        configurazione_prodotti.get_prodotti(),
+        probabilita=argomenti.probabilita,
+        livelli_efficienza=livelli,
+        turni_massimi=argomenti.turni_massimi,
+        costo=partial(costo_predefinito, costo_efficienza=argomenti.costo_efficienza),
+        n_repliche=argomenti.repliche,
+        seed=argomenti.seed,
+        backend=argomenti.backend,
+    )
+    if argomenti.efficienza_necessaria:
+        risultati['efficienza_necessaria'] = efficienza_necessaria(
+            scenario,
+            domanda,
+            argomenti.scadenza,
+            configurazione_prodotti.get_prodotti(),
+            probabilita=argomenti.probabilita,
+            n_repliche=argomenti.repliche,
+            seed=argomenti.seed,
+            backend=argomenti.backend,
+        )
+
+    if risultati['scenario'] is not None:
+        risultati['scenario'] = risultati['scenario'].a_dict()
+    for candidato in risultati['candidati']:
+        candidato['scenario'] = candidato['scenario'].a_dict()
+
+    print(json.dumps(risultati, ensure_ascii=False, indent=2))
+    return 0
+
+
+def comando_benchmark(argomenti: argparse.Namespace) -> int:
+    """Misura i percorsi critici, salva i tempi e li confronta con una baseline se indicata"""
+    risultati = esegui_benchmark(argomenti.profilo, argomenti.durata_minima, argomenti.ripetizioni, stampa=True)
+    if argomenti.output:
+        salva_benchmark(risultati, argomenti.output)
+
+    if argomenti.baseline:
+        print()
+        confronto = confronta_benchmark(carica_benchmark(argomenti.baseline), risultati, argomenti.soglia)
+        stampa_confronto(confronto)
+        return 1 if confronto['rallentamenti'] else 0
+
+    return 0
+
+
+def comando_confronta_benchmark(argomenti: argparse.Namespace) -> int:
+    """Confronta due file di benchmark già salvati"""
+    confronto = confronta_benchmark(carica_benchmark(argomenti.baseline), carica_benchmark(argomenti.attuale),
+                                    argomenti.soglia)
+    stampa_confronto(confronto)
+    return 1 if confronto['rallentamenti'] else 0
+
+
+def comando_servizio(argomenti: argparse.Namespace) -> int:
+    """Avvia il servizio HTTP di simulazione fino a Ctrl+C"""
+    avvia_servizio(argomenti.host, argomenti.porta, n_worker=argomenti.worker, limite_coda=argomenti.coda,
+                   repliche_massime=argomenti.repliche_massime)
+    return 0
+
+
+def crea_parser() -> argparse.ArgumentParser:
+    """Costruisce il parser degli argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(
+        prog='python -m entità.cli',
+        description='Simulatore Produzione Kimbo - esecuzione non interattiva',
+    )
+    sottocomandi = parser.add_subparsers(dest='comando', required=True)
+
+    run = sottocomandi.add_parser('run', help='Esegue le repliche e scrive un record per replica')
+    run.add_argument('--scenario', required=True, help='Nome dello scenario (es. alta_produzione)')
+    run.add_argument('--repliche', type=int, default=1, help='Numero di repliche (default: 1)')
+    run.add_argument('--formato', '--format', dest='formato', choices=FORMATI, default='jsonl',
+                     help='Formato di uscita; colonnare è binario e richiede --output (default: jsonl)')
+    run.add_argument('--output', help='File di destinazione (default: stdout)')
+    run.add_argument('--seed', type=int, default=None, help='Seed per i dati casuali')
+    run.add_argument('--blocco', type=int, default=DIMENSIONE_BLOCCO,
+                     help=f'Repliche calcolate per blocco (default: {DIMENSIONE_BLOCCO})')
+    run.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                     help='Backend di calcolo (default: auto)')
+    aggiungi_opzioni_strumentazione(run)
+    aggiungi_opzione_fermi(run)
+    run.set_defaults(esegui=comando_run)
+
+    report = sottocomandi.add_parser('report', help='Report leggibile di una o più simulazioni complete')
+    report.add_argument('--scenario', required=True, help='Nome dello scenario (es. alta_produzione)')
+    report.add_argument('--repliche', type=int, default=1, help='Numero di simulazioni (default: 1)')
+    report.add_argument('--seed', type=int, default=None, help='Seed principale')
+    report.add_argument('--formato', choices=FORMATI_REPORT, default='testo', help='Formato del report (default: testo)')
+    report.add_argument('--livello', choices=LIVELLI, default='completo',
+                        help='completo, primi N prodotti o sola sintesi (default: completo)')
+    report.add_argument('--primi', type=int, default=PRIMI_DEFAULT,
+                        help=f'Prodotti mostrati con --livello primi (default: {PRIMI_DEFAULT})')
+    report.add_argument('--criterio', choices=tuple(CRITERI), default='capacita',
+                        help='Ordinamento dei prodotti con --livello primi (default: capacita)')
+    report.add_argument('--output', help='File di destinazione (default: stdout)')
+    aggiungi_opzione_fermi(report)
+    report.set_defaults(esegui=comando_report)
+
+    stima = sottocomandi.add_parser('stima', help='Replica finché la stima non raggiunge la precisione richiesta')
+    stima.add_argument('--scenario', required=True, help='Nome dello scenario (es. alta_produzione)')
+    stima.add_argument('--precisione', type=float, default=0.01,
+                       help='Semiampiezza relativa massima dell\'intervallo di confidenza (default: 0.01)')
+    stima.add_argument('--per-prodotto', action='store_true', help='Richiede la precisione anche per ogni prodotto')
+    stima.add_argument('--batch', type=int, default=DIMENSIONE_BATCH,
+                       help=f'Repliche minime per batch (default: {DIMENSIONE_BATCH})')
+    stima.add_argument('--repliche-massime', type=int, default=None, help='Limite al numero di repliche')
+    stima.add_argument('--budget-secondi', type=float, default=None, help='Limite di tempo in secondi')
+    stima.add_argument('--seed', type=int, default=None, help='Seed per i dati casuali')
+    stima.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                       help='Backend di calcolo (default: auto)')
+    aggiungi_opzioni_strumentazione(stima)
+    aggiungi_opzione_fermi(stima)
+    stima.set_defaults(esegui=comando_stima)
+
+    orizzonte = sottocomandi.add_parser('orizzonte', help='Simula più giorni con arretrato e scrive un record per giorno')
+    orizzonte.add_argument('--scenario', required=True, help='Nome dello scenario (es. alta_produzione)')
+    orizzonte.add_argument('--giorni', type=int, default=None,
+                           help='Giorni dell\'orizzonte (default: 365, oppure tutto lo storico con --domanda-file)')
+    orizzonte.add_argument('--domanda-file', help='Storico ordini .csv o .jsonl (colonne data, prodotto, quantita)')
+    orizzonte.add_argument('--prodotti-sconosciuti', choices=('errore', 'ignora'), default='errore',
+                           help='Ordini di prodotti assenti dal catalogo (default: errore)')
+    orizzonte.add_argument('--repliche', type=int, default=1, help='Numero di repliche dell\'orizzonte (default: 1)')
+    orizzonte.add_argument('--seed', type=int, default=None, help='Seed principale')
+    orizzonte.add_argument('--output', help='File di destinazione (default: stdout)')
+    aggiungi_opzione_fermi(orizzonte)
+    orizzonte.set_defaults(esegui=comando_orizzonte)
+
+    eventi = sottocomandi.add_parser('eventi', help='Simulazione a eventi discreti di un lotto con turni e macchine')
+    eventi.add_argument('--scenario', required=True, help='Nome dello scenario (es. alta_produzione)')
+    eventi.add_argument('--turni', type=int, default=None, help='Turni giornalieri (default: quelli dello scenario)')
+    eventi.add_argument('--dimensione-lotto', type=int, default=100, help='Unità per lotto (default: 100)')
+    eventi.add_argument('--ora-inizio', type=float, default=6.0, help='Ora di inizio del primo turno (default: 6)')
+    eventi.add_argument('--seed', type=int, default=None, help='Seed per i dati casuali')
+    eventi.set_defaults(esegui=comando_eventi)
+
+    sweep = sottocomandi.add_parser('sweep', help='Piano sperimentale sui campi dello scenario (griglia o ipercubo latino)')
+    sweep.add_argument('--scenario', required=True, help='Scenario di partenza per i campi non variati')
+    sweep.add_argument('--campo', action='append', required=True,
+                       help='Campo da variare: nome=v1,v2,... (griglia) oppure nome=min:max (con --lhs)')
+    sweep.add_argument('--lhs', type=int, default=None, help='Numero di punti dell\'ipercubo latino (default: griglia completa)')
+    sweep.add_argument('--repliche', type=int, default=1000, help='Repliche per punto (default: 1000)')
+    sweep.add_argument('--seed', type=int, default=0, help='Seed principale (default: 0)')
+    sweep.add_argument('--worker', type=int, default=None, help='Numero di processi (default: numero di CPU)')
+    sweep.add_argument('--output', help='File CSV di destinazione (default: stdout)')
+    sweep.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                       help='Backend di calcolo (default: auto)')
+    aggiungi_opzioni_checkpoint(sweep)
+    aggiungi_opzione_fermi(sweep)
+    sweep.set_defaults(esegui=comando_sweep)
+
+    monte_carlo = sottocomandi.add_parser('monte-carlo', help='Statistiche di molte repliche aggregate su più processi')
+    monte_carlo.add_argument('--scenario', required=True, help='Nome dello scenario (es. alta_produzione)')
+    monte_carlo.add_argument('--repliche', type=int, default=100_000, help='Numero di repliche (default: 100000)')
+    monte_carlo.add_argument('--seed', type=int, default=0, help='Seed principale (default: 0)')
+    monte_carlo.add_argument('--worker', type=int, default=None, help='Numero di processi (default: numero di CPU)')
+    monte_carlo.add_argument('--blocco', type=int, default=DIMENSIONE_BLOCCO,
+                             help=f'Repliche per blocco (default: {DIMENSIONE_BLOCCO})')
+    monte_carlo.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                             help='Backend di calcolo (default: auto)')
+    aggiungi_opzioni_checkpoint(monte_carlo)
+    aggiungi_opzioni_strumentazione(monte_carlo)
+    aggiungi_opzione_fermi(monte_carlo)
+    monte_carlo.set_defaults(esegui=comando_monte_carlo)
+
+    riprendi = sottocomandi.add_parser('riprendi', help='Riprende un\'esecuzione monte-carlo o sweep dal checkpoint')
+    riprendi.add_argument('checkpoint', help='File di checkpoint')
+    riprendi.add_argument('--worker', type=int, default=None, help='Numero di processi (default: numero di CPU)')
+    riprendi.add_argument('--output', help='File CSV di destinazione per uno sweep (default: stdout)')
+    riprendi.add_argument('--intervallo-checkpoint', type=float, default=INTERVALLO_DEFAULT,
+                          help=f'Secondi tra due salvataggi del checkpoint (default: {INTERVALLO_DEFAULT:g})')
+    riprendi.set_defaults(esegui=comando_riprendi)
+
+    gruppo = sottocomandi.add_parser('gruppo', help='Simula più stabilimenti e linee in parallelo')
+    gruppo.add_argument('--configurazione', help='File JSON con i siti (default: un solo stabilimento standard)')
+    gruppo.add_argument('--repliche', type=int, default=10_000, help='Repliche per sito (default: 10000)')
+    gruppo.add_argument('--seed', type=int, default=0, help='Seed principale (default: 0)')
+    gruppo.add_argument('--worker', type=int, default=None, help='Numero di processi (default: numero di CPU)')
+    gruppo.add_argument('--blocco', type=int, default=DIMENSIONE_BLOCCO,
+                        help=f'Repliche per blocco (default: {DIMENSIONE_BLOCCO})')
+    gruppo.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                        help='Backend di calcolo (default: auto)')
+    gruppo.set_defaults(esegui=comando_gruppo)
+
+    sensibilita = sottocomandi.add_parser('sensibilita', help='Analisi di sensibilità (OAT, Morris, Sobol) sui fattori')
+    sensibilita.add_argument('--scenario', required=True, help='Scenario di riferimento (es. alta_produzione)')
+    sensibilita.add_argument('--metodo', choices=METODI, action='append',
+                             help='Metodo da applicare (ripetibile, default: tutti)')
+    sensibilita.add_argument('--uscita', choices=USCITE, default='tempo_totale_ore',
+                             help='Grandezza di cui analizzare la media (default: tempo_totale_ore)')
+    sensibilita.add_argument('--fattore', action='append',
+                             help='Fattore e intervallo: nome=min:max, es. tempo_base_produzione:Capsule/Cialde=1.5:2.1 '
+                                  '(ripetibile, default: tutti con --ampiezza)')
+    sensibilita.add_argument('--ampiezza', type=float, default=AMPIEZZA_DEFAULT,
+                             help=f'Variazione relativa degli intervalli predefiniti (default: {AMPIEZZA_DEFAULT})')
+    sensibilita.add_argument('--repliche', type=int, default=REPLICHE_DEFAULT,
+                             help=f'Repliche comuni a tutte le valutazioni (default: {REPLICHE_DEFAULT})')
+    sensibilita.add_argument('--campioni', type=int, default=CAMPIONI_SOBOL,
+                             help=f'Righe delle matrici di Sobol (default: {CAMPIONI_SOBOL})')
+    sensibilita.add_argument('--traiettorie', type=int, default=TRAIETTORIE_MORRIS,
+                             help=f'Traiettorie di Morris (default: {TRAIETTORIE_MORRIS})')
+    sensibilita.add_argument('--livelli', type=int, default=LIVELLI_MORRIS,
+                             help=f'Livelli della griglia di Morris (default: {LIVELLI_MORRIS})')
+    sensibilita.add_argument('--seed', type=int, default=0, help='Seed di uniformi e piani (default: 0)')
+    sensibilita.add_argument('--worker', type=int, default=None, help='Numero di processi (default: numero di CPU)')
+    sensibilita.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                             help='Backend di calcolo (default: auto)')
+    sensibilita.set_defaults(esegui=comando_sensibilita)
+
+    analitica = sottocomandi.add_parser('analitica', help='Stima analitica di tempo totale e superamenti, senza repliche')
+    analitica.add_argument('--scenario', required=True, help='Nome dello scenario (es. alta_produzione)')
+    analitica.add_argument('--soglia-ore', type=float, action='append',
+                           help='Probabilità che il tempo totale superi queste ore (ripetibile)')
+    analitica.add_argument('--verifica', type=int, default=None, metavar='REPLICHE',
+                           help='Confronta la stima con una simulazione Monte Carlo di REPLICHE repliche')
+    analitica.add_argument('--seed', type=int, default=0, help='Seed della verifica (default: 0)')
+    analitica.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                           help='Backend di calcolo della verifica (default: auto)')
+    analitica.set_defaults(esegui=comando_analitica)
+
+    capacita = sottocomandi.add_parser('capacita', help='Ore e turni minimi per evadere una domanda entro una scadenza',
+                                       description='Ore, turni ed efficienza minimi per evadere una domanda entro una '
+                                                   'scadenza. Il modello non considera guasti e cambi formato (--fermi).')
+    capacita.add_argument('--scenario', required=True, help='Scenario di partenza (variabilità e range)')
+    capacita.add_argument('--domanda', action='append', required=True,
+                          help='Quantità da produrre: nome=quantità (ripetibile)')
+    capacita.add_argument('--scadenza', type=float, required=True, help='Giorni lavorativi disponibili')
+    capacita.add_argument('--probabilita', type=float, default=0.9,
+                          help='Probabilità minima di rispettare la scadenza (default: 0.9)')
+    capacita.add_argument('--efficienza', help='Livelli di efficienza da considerare, separati da virgola')
+    capacita.add_argument('--costo-efficienza', type=float, default=COSTO_EFFICIENZA,
+                          help='Costo dell\'efficienza in ore giornaliere equivalenti per efficienza 1.0 '
+                               f'(default: {COSTO_EFFICIENZA:g})')
+    capacita.add_argument('--efficienza-necessaria', action='store_true',
+                          help='Aggiunge l\'efficienza minima che basta con le ore e i turni dello scenario')
+    capacita.add_argument('--turni-massimi', type=int, default=TURNI_MASSIMI,
+                          help=f'Turni giornalieri ammessi (default: {TURNI_MASSIMI})')
+    capacita.add_argument('--repliche', type=int, default=2000, help='Repliche comuni a tutte le valutazioni (default: 2000)')
+    capacita.add_argument('--seed', type=int, default=0, help='Seed delle repliche (default: 0)')
+    capacita.add_argument('--backend', choices=('auto', 'array', 'numpy'), default='auto',
+                          help='Backend di calcolo (default: auto)')
+    capacita.set_defaults(esegui=comando_capacita)
+
+    benchmark = sottocomandi.add_parser('benchmark', help='Misura i tempi dei percorsi critici')
+    benchmark.add_argument('--profilo', choices=tuple(PROFILI), default='rapido',
+                           help='Dimensioni di catalogo, repliche e worker da misurare (default: rapido)')
+    benchmark.add_argument('--output', help='File JSON in cui salvare i tempi (es. baseline)')
+    benchmark.add_argument('--baseline', help='File JSON di riferimento con cui confrontare i tempi')
+    benchmark.add_argument('--soglia', type=float, default=SOGLIA_DEFAULT,
+                           help=f'Rallentamento relativo segnalato (default: {SOGLIA_DEFAULT})')
+    benchmark.add_argument('--durata-minima', type=float, default=DURATA_MINIMA,
+                           help=f'Secondi minimi per ripetizione (default: {DURATA_MINIMA})')
+    benchmark.add_argument('--ripetizioni', type=int, default=RIPETIZIONI,
+                           help=f'Ripetizioni di ogni misura (default: {RIPETIZIONI})')
+    benchmark.set_defaults(esegui=comando_benchmark)
+
+    confronta = sottocomandi.add_parser('confronta-benchmark', help='Confronta due file di benchmark')
+    confronta.add_argument('baseline', help='File JSON di riferimento')
+    confronta.add_argument('attuale', help='File JSON della nuova esecuzione')
+    confronta.add_argument('--soglia', type=float, default=SOGLIA_DEFAULT,
+                           help=f'Rallentamento relativo segnalato (default: {SOGLIA_DEFAULT})')
+    confronta.set_defaults(esegui=comando_confronta_benchmark)
+
+    servizio = sottocomandi.add_parser('servizio', help='Avvia il servizio HTTP JSON di simulazione')
+    servizio.add_argument('--host', default=HOST_DEFAULT, help=f'Indirizzo di ascolto (default: {HOST_DEFAULT})')
+    servizio.add_argument('--porta', type=int, default=PORTA_DEFAULT, help=f'Porta di ascolto (default: {PORTA_DEFAULT})')
+    servizio.add_argument('--worker', type=int, default=None, help='Processi di calcolo (default: numero di CPU)')
+    servizio.add_argument('--coda', type=int, default=LIMITE_CODA,
+                          help=f'Calcoli distinti in corso oltre i quali si risponde 503 (default: {LIMITE_CODA})')
+    servizio.add_argument('--repliche-massime', type=int, default=REPLICHE_MASSIME,
+                          help=f'Repliche massime per richiesta (default: {REPLICHE_MASSIME})')
+    servizio.set_defaults(esegui=comando_servizio)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Punto di ingresso della riga di comando"""
+    parser = crea_parser()
+    argomenti = parser.parse_args(argv)
+
+    try:
+        return argomenti.esegui(argomenti)
+    except BrokenPipeError:
+        # Uscita interrotta da un consumatore a valle (es. head): non è un errore
+        return 0
+    except Exception as e:
+        print(f"Errore: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
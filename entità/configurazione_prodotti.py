@@ -1,37 +1,160 @@
+from array import array
+from dataclasses import asdict, dataclass
+import hashlib
+
+
+@dataclass(frozen=True, slots=True)
+class Prodotto:
+    """
+    Prodotto del catalogo Kimbo.
+    Immutabile e senza __dict__: occupa molta meno memoria di un dizionario equivalente.
+    """
+    nome: str
+    unita_misura: str
+    tempo_base_produzione: float  # minuti per unità
+    capacita_max_giornaliera: int  # unità/giorno
+
+    @classmethod
+    def da_dict(cls, dati: dict) -> "Prodotto":
+        """Crea un prodotto a partire dal dizionario usato nelle versioni precedenti"""
+        return cls(
+            nome=dati['nome'],
+            unita_misura=dati['unita_misura'],
+            tempo_base_produzione=float(dati['tempo_base_produzione']),
+            capacita_max_giornaliera=int(dati['capacita_max_giornaliera']),
+        )
+
+    def a_dict(self) -> dict:
+        return asdict(self)
+
+
+class CatalogoProdotti:
+    """
+    Vista compatta e in sola lettura di un elenco di prodotti.
+    Mantiene un indice nome -> posizione per ricerche O(1) e i campi numerici
+    in array paralleli, allineati alla posizione del prodotto.
+    Due cataloghi con gli stessi prodotti nello stesso ordine sono uguali e hanno lo stesso hash.
+    """
+    __slots__ = ('prodotti', 'nomi', 'indice', 'tempi_base', 'capacita_max', '_impronta')
+
+    def __init__(self, prodotti):
+        self.prodotti = tuple(p if isinstance(p, Prodotto) else Prodotto.da_dict(p) for p in prodotti)
+        self.nomi = tuple(p.nome for p in self.prodotti)
+        self.indice = {nome: i for i, nome in enumerate(self.nomi)}
+
+        if len(self.indice) != len(self.nomi):
+            raise Exception("Il catalogo contiene prodotti con lo stesso nome")
+
+        self.tempi_base = array('d', [p.tempo_base_produzione for p in self.prodotti])
+        self.capacita_max = array('q', [p.capacita_max_giornaliera for p in self.prodotti])
+        self._impronta = None
+
+    @classmethod
+    def da_prodotti(cls, prodotti) -> "CatalogoProdotti":
+        """Restituisce prodotti se è già un catalogo, altrimenti lo costruisce"""
+        if isinstance(prodotti, cls):
+            return prodotti
+        return cls(prodotti)
+
+    @property
+    def impronta(self) -> str:
+        """Hash del contenuto del catalogo, calcolato alla prima richiesta"""
+        if self._impronta is None:
+            self._impronta = hashlib.sha256(repr(self.prodotti).encode()).hexdigest()
+        return self._impronta
+
+    def __hash__(self) -> int:
+        return hash(self.impronta)
+
+    def __eq__(self, altro) -> bool:
+        if not isinstance(altro, CatalogoProdotti):
+            return NotImplemented
+        return self is altro or self.impronta == altro.impronta
+
+    def indice_di(self, nome: str) -> int:
+        """Posizione del prodotto nel catalogo"""
+        try:
+            return self.indice[nome]
+        except KeyError:
+            raise Exception("Prodotto non trovato!") from None
+
+    def __len__(self) -> int:
+        return len(self.prodotti)
+
+    def __iter__(self):
+        return iter(self.prodotti)
+
+    def __getitem__(self, posizione: int) -> Prodotto:
+        return self.prodotti[posizione]
+
+
 class ConfigurazioneProdotti:
     prodotti = []
 
     def __init__(self):
         # Configurazione prodotti base
         self.prodotti = [
-            {
-                'nome': 'Caffè in Grani',
-                'unita_misura': 'kg',
-                'tempo_base_produzione': 2.5,  # minuti per kg
-                'capacita_max_giornaliera': 5000  # kg/giorno
-            },
-            {
-                'nome': 'Caffè Macinato',
-                'unita_misura': 'kg',
-                'tempo_base_produzione': 3.2,  # minuti per kg (include macinazione)
-                'capacita_max_giornaliera': 4000  # kg/giorno
-            },
-
-            {
-                'nome': 'Capsule/Cialde',
-                'unita_misura': 'confezioni',
-                'tempo_base_produzione': 1.8,  # minuti per confezione
-                'capacita_max_giornaliera': 8000  # confezioni/giorno
-            }
+            Prodotto(
+                nome='Caffè in Grani',
+                unita_misura='kg',
+                tempo_base_produzione=2.5,  # minuti per kg
+                capacita_max_giornaliera=5000  # kg/giorno
+            ),
+            Prodotto(
+                nome='Caffè Macinato',
+                unita_misura='kg',
+                tempo_base_produzione=3.2,  # minuti per kg (include macinazione)
+                capacita_max_giornaliera=4000  # kg/giorno
+            ),
+
+            Prodotto(
+                nome='Capsule/Cialde',
+                unita_misura='confezioni',
+                tempo_base_produzione=1.8,  # minuti per confezione
+                capacita_max_giornaliera=8000  # confezioni/giorno
+            )
         ]
 
-    def get_prodotti(self) -> list[dict]:
+        self._indice = {p.nome: i for i, p in enumerate(self.prodotti)}
+        self._catalogo = None
+        self._osservatori = []
+
+    def get_prodotti(self) -> list[Prodotto]:
         return self.prodotti
 
-    def add_prodotto(self, nuovo_prodotto:dict) -> None:
-        for p in self.prodotti:
-            if p['nome'] == nuovo_prodotto['nome']:
-                raise Exception(f"Prodotto '{nuovo_prodotto['nome']}' già presente")
+    def get_prodotto(self, nome: str) -> Prodotto:
+        """Restituisce il prodotto con il nome indicato (ricerca O(1))"""
+        if nome not in self._indice:
+            raise Exception("Prodotto non trovato!")
+
+        return self.prodotti[self._indice[nome]]
+
+    def get_catalogo(self) -> CatalogoProdotti:
+        """Restituisce il catalogo compatto, ricostruito solo dopo una modifica"""
+        if self._catalogo is None:
+            self._catalogo = CatalogoProdotti(self.prodotti)
+
+        return self._catalogo
+
+    def aggiungi_osservatore(self, osservatore) -> None:
+        """
+        Registra una funzione chiamata dopo ogni modifica del catalogo,
+        con l'impronta del catalogo precedente (es. per invalidare una cache)
+        """
+        self._osservatori.append(osservatore)
+
+    def add_prodotto(self, nuovo_prodotto: Prodotto | dict) -> None:
+        if isinstance(nuovo_prodotto, dict):
+            nuovo_prodotto = Prodotto.da_dict(nuovo_prodotto)
+
+        if nuovo_prodotto.nome in self._indice:
+            raise Exception(f"Prodotto '{nuovo_prodotto.nome}' già presente")
+
+        impronta_precedente = self.get_catalogo().impronta if self._osservatori else None
 
+        self._indice[nuovo_prodotto.nome] = len(self.prodotti)
         self.prodotti.append(nuovo_prodotto)
+        self._catalogo = None
 
+        for osservatore in self._osservatori:
+            osservatore(impronta_precedente)
@@ -1,3 +1,46 @@
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """
+    Scenario produttivo immutabile.
+    I campi corrispondono alle chiavi dei dizionari usati nelle versioni precedenti.
+    """
+    nome: str
+    descrizione: str
+    ore_lavorative_giorno: int
+    turni_giorno: int
+    efficienza_impianti: float
+    variabilita_tempi: float
+    variabilita_capacita: float
+    range_quantita: tuple[float, float]
+
+    @classmethod
+    def da_dict(cls, dati: dict) -> "Scenario":
+        """Crea uno scenario a partire dal dizionario usato nelle versioni precedenti"""
+        return cls(
+            nome=dati['nome'],
+            descrizione=dati['descrizione'],
+            ore_lavorative_giorno=dati['ore_lavorative_giorno'],
+            turni_giorno=dati['turni_giorno'],
+            efficienza_impianti=dati['efficienza_impianti'],
+            variabilita_tempi=dati['variabilita_tempi'],
+            variabilita_capacita=dati['variabilita_capacita'],
+            range_quantita=tuple(dati['range_quantita']),
+        )
+
+    @classmethod
+    def da_valore(cls, scenario: "Scenario | dict") -> "Scenario":
+        """Restituisce scenario se è già uno Scenario, altrimenti lo converte dal dizionario"""
+        if isinstance(scenario, cls):
+            return scenario
+        return cls.da_dict(scenario)
+
+    def a_dict(self) -> dict:
+        return asdict(self)
+
+
 # ===============================================
 # CONFIGURAZIONE SCENARI
 # ===============================================
@@ -11,50 +54,67 @@ class ConfigurazioneScenari:
     def __init__(self):
         self.scenari = [
 
-            {   # Scenario Produzione Standard
-                'nome': 'produzione_standard',
-                'descrizione': 'Configurazione normale di produzione giornaliera',
-                'ore_lavorative_giorno': 8,
-                'turni_giorno': 1,
-                'efficienza_impianti': 1.0,
-                'variabilita_tempi': 0.1,  # ±10%
-                'variabilita_capacita': 0.05,  # ±5%
-                'range_quantita': (0.3, 0.7),  # 30%-70% della capacità
-            },
-
-            {    # Scenario Alta Produzione
-                'nome': 'alta_produzione',
-                'descrizione': 'Configurazione per periodi di alta domanda',
-                'ore_lavorative_giorno': 16,
-                'turni_giorno': 2,
-                'efficienza_impianti': 0.9,
-                'variabilita_tempi': 0.15,  # ±15%
-                'variabilita_capacita': 0.1,  # ±10%
-                'range_quantita': (0.6, 0.9),  # 60%-90% della capacità
-            },
-
-            {    # Scenario Personalizzato
-                'nome': 'personalizzato',
-                'descrizione': 'Produzione ridotta per periodo festivo',
-                'ore_lavorative_giorno': 4,
-                'turni_giorno': 1,
-                'efficienza_impianti': 0.6,
-                'variabilita_tempi': 0.3,
-                'variabilita_capacita': 0.25,
-                'range_quantita': (0.1, 0.3),
-            }
+            Scenario(   # Scenario Produzione Standard
+                nome='produzione_standard',
+                descrizione='Configurazione normale di produzione giornaliera',
+                ore_lavorative_giorno=8,
+                turni_giorno=1,
+                efficienza_impianti=1.0,
+                variabilita_tempi=0.1,  # ±10%
+                variabilita_capacita=0.05,  # ±5%
+                range_quantita=(0.3, 0.7),  # 30%-70% della capacità
+            ),
+
+            Scenario(    # Scenario Alta Produzione
+                nome='alta_produzione',
+                descrizione='Configurazione per periodi di alta domanda',
+                ore_lavorative_giorno=16,
+                turni_giorno=2,
+                efficienza_impianti=0.9,
+                variabilita_tempi=0.15,  # ±15%
+                variabilita_capacita=0.1,  # ±10%
+                range_quantita=(0.6, 0.9),  # 60%-90% della capacità
+            ),
+
+            Scenario(    # Scenario Personalizzato
+                nome='personalizzato',
+                descrizione='Produzione ridotta per periodo festivo',
+                ore_lavorative_giorno=4,
+                turni_giorno=1,
+                efficienza_impianti=0.6,
+                variabilita_tempi=0.3,
+                variabilita_capacita=0.25,
+                range_quantita=(0.1, 0.3),
+            )
         ]
 
-    def get_scenari_disponibili(self) -> list[dict]:
+        self._indice = {s.nome: i for i, s in enumerate(self.scenari)}
+        self._osservatori = []
+
+    def get_scenari_disponibili(self) -> list[Scenario]:
         """Restituisce la lista di tutti gli scenari configurabili"""
         return self.scenari
 
-    def add_scenario(self, nuovo_scenario: dict) -> None:
-        for s in self.scenari:
-            if s['nome'] == nuovo_scenario['nome']:
-                raise Exception(f"Scenario '{nuovo_scenario['nome']}' già presente")
+    def get_scenario(self, nome: str) -> Scenario:
+        """Restituisce lo scenario con il nome indicato (ricerca O(1))"""
+        if nome not in self._indice:
+            disponibili = ', '.join(s.nome for s in self.scenari)
+            raise Exception(f"Scenario '{nome}' non trovato. Scenari disponibili: {disponibili}")
 
-        self.scenari.append(nuovo_scenario)
+        return self.scenari[self._indice[nome]]
+
+    def aggiungi_osservatore(self, osservatore) -> None:
+        """Registra una funzione chiamata con il nuovo scenario dopo ogni add_scenario (es. per invalidare una cache)"""
+        self._osservatori.append(osservatore)
 
+    def add_scenario(self, nuovo_scenario: Scenario | dict) -> None:
+        nuovo_scenario = Scenario.da_valore(nuovo_scenario)
 
+        if nuovo_scenario.nome in self._indice:
+            raise Exception(f"Scenario '{nuovo_scenario.nome}' già presente")
+
+        self._indice[nuovo_scenario.nome] = len(self.scenari)
+        self.scenari.append(nuovo_scenario)
 
+        for osservatore in self._osservatori:
+            osservatore(nuovo_scenario)
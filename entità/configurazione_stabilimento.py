@@ -1,2 +1,145 @@
+from dataclasses import dataclass
+import json
+
+from entità.configurazione_prodotti import ConfigurazioneProdotti, Prodotto
+from entità.configurazione_scenari import ConfigurazioneScenari, Scenario
+from entità.fermi_macchina import ModelloFermi
+
+
 class ConfigurazioneStabilimento:
-    capacita_totale_giornaliera = 15000
\ No newline at end of file
+    capacita_totale_giornaliera = 15000
+
+
+@dataclass(frozen=True, slots=True)
+class Sito:
+    """
+    Stabilimento o linea produttiva con capacità, mix di prodotti e scenario propri.
+    Le linee indicano lo stabilimento a cui appartengono; un sito senza stabilimento è uno stabilimento a sé.
+    I fermi (guasti e cambi formato) sono facoltativi.
+    """
+    nome: str
+    capacita_totale_giornaliera: int
+    scenario: Scenario
+    prodotti: tuple[Prodotto, ...]
+    stabilimento: str | None = None
+    fermi: ModelloFermi | None = None
+
+    def __post_init__(self):
+        if self.capacita_totale_giornaliera <= 0:
+            raise Exception(f"La capacità del sito '{self.nome}' deve essere maggiore di zero")
+        if not self.prodotti:
+            raise Exception(f"Il sito '{self.nome}' non ha prodotti")
+        if self.fermi is not None:
+            self.fermi.verifica(p.nome for p in self.prodotti)
+
+    @property
+    def nome_stabilimento(self) -> str:
+        """Stabilimento a cui il sito appartiene (il sito stesso se non è una linea)"""
+        return self.stabilimento or self.nome
+
+    @classmethod
+    def da_dict(cls, dati: dict, configurazione_scenari: ConfigurazioneScenari,
+                configurazione_prodotti: ConfigurazioneProdotti) -> "Sito":
+        """
+        Crea un sito dal dizionario di configurazione.
+        Scenario e prodotti possono essere nomi già configurati o dizionari completi;
+        senza 'prodotti' il sito produce l'intero catalogo.
+        """
+        scenario = dati.get('scenario', 'produzione_standard')
+        if isinstance(scenario, str):
+            scenario = configurazione_scenari.get_scenario(scenario)
+
+        prodotti = dati.get('prodotti')
+        if prodotti is None:
+            prodotti = configurazione_prodotti.get_prodotti()
+        else:
+            prodotti = [configurazione_prodotti.get_prodotto(p) if isinstance(p, str) else Prodotto.da_dict(p)
+                        for p in prodotti]
+
+        return cls(
+            nome=dati['nome'],
+            capacita_totale_giornaliera=int(dati.get('capacita_totale_giornaliera',
+                                                     ConfigurazioneStabilimento.capacita_totale_giornaliera)),
+            scenario=Scenario.da_valore(scenario),
+            prodotti=tuple(prodotti),
+            stabilimento=dati.get('stabilimento'),
+            fermi=ModelloFermi.da_dict(dati['fermi']) if dati.get('fermi') else None,
+        )
+
+    def a_dict(self) -> dict:
+        return {
+            'nome': self.nome,
+            'stabilimento': self.stabilimento,
+            'capacita_totale_giornaliera': self.capacita_totale_giornaliera,
+            'scenario': self.scenario.a_dict(),
+            'prodotti': [p.a_dict() for p in self.prodotti],
+            'fermi': self.fermi.a_dict() if self.fermi is not None else None,
+        }
+
+
+# ===============================================
+# CONFIGURAZIONE GRUPPO DI STABILIMENTI
+# ===============================================
+class ConfigurazioneGruppo:
+    """
+    Stabilimenti e linee del gruppo, simulati come unità indipendenti (vedi gruppo_stabilimenti).
+    Per default contiene un solo stabilimento con la capacità di ConfigurazioneStabilimento,
+    lo scenario standard e l'intero catalogo.
+    """
+
+    def __init__(self, configurazione_scenari: ConfigurazioneScenari | None = None,
+                 configurazione_prodotti: ConfigurazioneProdotti | None = None):
+        self.configurazione_scenari = configurazione_scenari or ConfigurazioneScenari()
+        self.configurazione_prodotti = configurazione_prodotti or ConfigurazioneProdotti()
+
+        self.siti = [
+            Sito(
+                nome='Stabilimento Kimbo',
+                capacita_totale_giornaliera=ConfigurazioneStabilimento.capacita_totale_giornaliera,
+                scenario=self.configurazione_scenari.get_scenario('produzione_standard'),
+                prodotti=tuple(self.configurazione_prodotti.get_prodotti()),
+            )
+        ]
+        self._indice = {s.nome: i for i, s in enumerate(self.siti)}
+
+    @classmethod
+    def da_json(cls, percorso: str, configurazione_scenari: ConfigurazioneScenari | None = None,
+                configurazione_prodotti: ConfigurazioneProdotti | None = None) -> "ConfigurazioneGruppo":
+        """
+        Legge i siti da un file JSON: {"siti": [{"nome": ..., "stabilimento": ..., "capacita_totale_giornaliera": ...,
+        "scenario": ..., "prodotti": [...]}, ...]}. I siti del file sostituiscono quello di default.
+        """
+        with open(percorso, encoding='utf-8') as file:
+            dati = json.load(file)
+
+        if not dati.get('siti'):
+            raise Exception(f"Il file '{percorso}' non contiene siti")
+
+        configurazione = cls(configurazione_scenari, configurazione_prodotti)
+        configurazione.siti = []
+        configurazione._indice = {}
+        for sito in dati['siti']:
+            configurazione.add_sito(sito)
+
+        return configurazione
+
+    def get_siti(self) -> list[Sito]:
+        return self.siti
+
+    def get_sito(self, nome: str) -> Sito:
+        """Restituisce il sito con il nome indicato (ricerca O(1))"""
+        if nome not in self._indice:
+            disponibili = ', '.join(s.nome for s in self.siti)
+            raise Exception(f"Sito '{nome}' non trovato. Siti disponibili: {disponibili}")
+
+        return self.siti[self._indice[nome]]
+
+    def add_sito(self, nuovo_sito: Sito | dict) -> None:
+        if isinstance(nuovo_sito, dict):
+            nuovo_sito = Sito.da_dict(nuovo_sito, self.configurazione_scenari, self.configurazione_prodotti)
+
+        if nuovo_sito.nome in self._indice:
+            raise Exception(f"Sito '{nuovo_sito.nome}' già presente")
+
+        self._indice[nuovo_sito.nome] = len(self.siti)
+        self.siti.append(nuovo_sito)
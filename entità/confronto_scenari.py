@@ -0,0 +1,158 @@
+from itertools import combinations
+from statistics import NormalDist
+import math
+import random
+
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+from entità.monte_carlo import DIMENSIONE_BLOCCO, genera_uniformi, np, somma_vettore, valuta_su_uniformi
+from entità.piano_scenario import compila_piano
+
+
+# ===============================================
+# CONFRONTO TRA SCENARI CON NUMERI CASUALI COMUNI
+# ===============================================
+class _Accumulatore:
+    """Media e varianza per blocchi (formula di Chan), numericamente stabile"""
+    __slots__ = ('n', 'media', 'm2')
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def aggiungi_blocco(self, valori) -> None:
+        n_b = len(valori)
+        if n_b == 0:
+            return
+        media_b = math.fsum(valori) / n_b
+        m2_b = math.fsum([(x - media_b) ** 2 for x in valori])
+
+        n = self.n + n_b
+        delta = media_b - self.media
+        self.media += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+
+    @property
+    def varianza(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def semiampiezza(self, z: float) -> float:
+        return z * math.sqrt(self.varianza / self.n) if self.n > 0 else math.inf
+
+
+def _unita(valori, antitetiche: bool) -> list:
+    """Unità statistiche indipendenti: la replica o, con le antitetiche, la media della coppia"""
+    valori = valori.tolist() if np is not None and isinstance(valori, np.ndarray) else valori
+    if not antitetiche:
+        return valori
+
+    meta = len(valori) // 2
+    return [(a + b) / 2 for a, b in zip(valori[:meta], valori[meta:])]
+
+
+def confronta_scenari_multipli(scenari: list[Scenario | dict], prodotti, n_repliche: int = 10_000,
+                               seed: int | None = None, antitetiche: bool = False,
+                               livello_confidenza: float = 0.95, backend: str = 'auto',
+                               dimensione_blocco: int = DIMENSIONE_BLOCCO) -> dict:
+    """
+    Confronta N scenari sugli stessi numeri casuali (common random numbers)
+
+    Ogni replica estrae una volta le uniformi di quantità, tempi e capacità e le applica a tutti
+    gli scenari: le differenze tra scenari non sono disturbate da estrazioni indipendenti e
+    l'intervallo di confidenza si stringe con molte meno repliche. Con antitetiche=True
+    ogni replica è accoppiata alla sua speculare (1 - u).
+
+    Args:
+        scenari (list): scenari da confrontare (almeno due)
+        prodotti: catalogo o lista di prodotti, comune a tutti gli scenari
+        n_repliche (int): numero di repliche per scenario (pari con le antitetiche)
+        seed (int | None): seed del generatore casuale
+        antitetiche (bool): usa le variabili antitetiche
+        livello_confidenza (float): livello degli intervalli di confidenza
+        backend (str): 'auto', 'array' o 'numpy'
+        dimensione_blocco (int): repliche generate insieme per blocco
+
+    Returns:
+        dict: media di ogni scenario e differenza di ogni coppia con il relativo intervallo
+    """
+    if len(scenari) < 2:
+        raise Exception("Selezionare almeno due scenari da confrontare")
+    if n_repliche <= 1:
+        raise Exception("Il numero di repliche deve essere maggiore di uno")
+    if antitetiche and n_repliche % 2 != 0:
+        raise Exception("Con le variabili antitetiche il numero di repliche deve essere pari")
+    if not 0 < livello_confidenza < 1:
+        raise Exception("Il livello di confidenza deve essere compreso tra 0 e 1")
+
+    rng = random.Random(seed)
+    catalogo = CatalogoProdotti.da_prodotti(prodotti)
+    scenari = [Scenario.da_valore(s) for s in scenari]
+    piani = [compila_piano(s, catalogo, ConfigurazioneStabilimento.capacita_totale_giornaliera) for s in scenari]
+    coppie = list(combinations(range(len(scenari)), 2))
+
+    if antitetiche and dimensione_blocco % 2 != 0:
+        dimensione_blocco += 1
+
+    medie = [_Accumulatore() for _ in scenari]
+    differenze = {coppia: _Accumulatore() for coppia in coppie}
+    violazioni = [0] * len(scenari)
+
+    eseguite = 0
+    while eseguite < n_repliche:
+        n_blocco = min(dimensione_blocco, n_repliche - eseguite)
+        uniformi = genera_uniformi(rng, n_blocco, len(catalogo), backend, antitetiche)
+
+        valori = []
+        for i, piano in enumerate(piani):
+            risultato = valuta_su_uniformi(piano, uniformi)
+            violazioni[i] += n_blocco - int(somma_vettore(risultato['vincoli_rispettati']))
+            unita = _unita(risultato['tempo_totale_ore'], antitetiche)
+            medie[i].aggiungi_blocco(unita)
+            valori.append(unita)
+
+        for a, b in coppie:
+            differenze[(a, b)].aggiungi_blocco([y - x for x, y in zip(valori[a], valori[b])])
+
+        eseguite += n_blocco
+
+    z = NormalDist().inv_cdf(0.5 + livello_confidenza / 2)
+
+    risultati_scenari = {}
+    for scenario, accumulatore, n_violazioni in zip(scenari, medie, violazioni):
+        risultati_scenari[scenario.nome] = {
+            'tempo_totale_ore_medio': accumulatore.media,
+            'semiampiezza': accumulatore.semiampiezza(z),
+            'percentuale_vincoli_violati': n_violazioni / n_repliche * 100,
+        }
+
+    risultati_differenze = []
+    for a, b in coppie:
+        accumulatore = differenze[(a, b)]
+        semiampiezza = accumulatore.semiampiezza(z)
+        inferiore = accumulatore.media - semiampiezza
+        superiore = accumulatore.media + semiampiezza
+
+        # Varianza che la differenza avrebbe con estrazioni indipendenti, a parità di unità
+        varianza_indipendente = medie[a].varianza + medie[b].varianza
+        riduzione = varianza_indipendente / accumulatore.varianza if accumulatore.varianza > 0 else math.inf
+
+        risultati_differenze.append({
+            'scenario_a': scenari[a].nome,
+            'scenario_b': scenari[b].nome,
+            'differenza_ore': accumulatore.media,  # b - a: positiva se b richiede più ore
+            'semiampiezza': semiampiezza,
+            'intervallo': (inferiore, superiore),
+            'significativa': inferiore > 0 or superiore < 0,
+            'riduzione_varianza': riduzione,
+        })
+
+    return {
+        'n_repliche': n_repliche,
+        'antitetiche': antitetiche,
+        'livello_confidenza': livello_confidenza,
+        'scenari': risultati_scenari,
+        'differenze': risultati_differenze,
+    }
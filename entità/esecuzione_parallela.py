@@ -0,0 +1,258 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+import hashlib
+import os
+
+from entità.checkpoint import Checkpoint
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+from entità.fermi_macchina import ModelloFermi
+from entità.monte_carlo import DIMENSIONE_BLOCCO, np, riepiloga_repliche, risolvi_backend
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+from entità.statistiche_online import AggregatoreRepliche
+from entità.strumentazione import Strumentazione
+
+
+# ===============================================
+# ESECUZIONE PARALLELA DELLE REPLICHE
+# ===============================================
+
+def deriva_seed(seed_master: int, indice_blocco: int) -> int:
+    """
+    Deriva in modo deterministico il seed di un blocco di repliche dal seed principale.
+    Ogni blocco ha il proprio flusso casuale indipendente, qualunque sia il worker che lo esegue.
+    """
+    digest = hashlib.sha256(f"{seed_master}:{indice_blocco}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def suddividi_blocchi(n_repliche: int, dimensione_blocco: int = DIMENSIONE_BLOCCO) -> list[tuple[int, int]]:
+    """
+    Divide n_repliche in blocchi di dimensione fissa
+
+    Returns:
+        list[tuple[int, int]]: coppie (indice_blocco, repliche_nel_blocco)
+    """
+    if n_repliche <= 0:
+        raise Exception("Il numero di repliche deve essere maggiore di zero")
+    if dimensione_blocco <= 0:
+        raise Exception("La dimensione del blocco deve essere maggiore di zero")
+
+    blocchi = []
+    for indice, inizio in enumerate(range(0, n_repliche, dimensione_blocco)):
+        blocchi.append((indice, min(dimensione_blocco, n_repliche - inizio)))
+
+    return blocchi
+
+
+def _esegui_blocco(scenario: dict, prodotti: list[dict], seed: int, n_repliche: int, backend: str,
+                   fermi: ModelloFermi | None = None) -> dict:
+    """Esegue un blocco di repliche in un processo worker con il proprio simulatore"""
+    simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, seed, fermi=fermi)
+    return simulatore.genera_colonne_monte_carlo(n_repliche, backend)
+
+
+def _aggrega_blocco(scenario: dict, prodotti: list[dict], seed: int, n_repliche: int, backend: str,
+                    fermi: ModelloFermi | None = None) -> AggregatoreRepliche:
+    """Esegue un blocco e ne restituisce solo l'aggregato, senza i vettori per replica"""
+    aggregatore = AggregatoreRepliche()
+    aggregatore.aggiorna_colonne(_esegui_blocco(scenario, prodotti, seed, n_repliche, backend, fermi))
+    return aggregatore
+
+
+def _aggrega_blocco_strumentato(allocazioni: bool, profilo: bool, scenario: dict, prodotti: list[dict], seed: int,
+                                n_repliche: int, backend: str,
+                                fermi: ModelloFermi | None = None) -> tuple[AggregatoreRepliche, Strumentazione]:
+    """Come _aggrega_blocco, restituendo anche le misure raccolte dal worker"""
+    strumentazione = Strumentazione(allocazioni, profilo)
+    with strumentazione.profila():
+        simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, seed, strumentazione, fermi=fermi)
+        colonne = simulatore.genera_colonne_monte_carlo(n_repliche, backend)
+        aggregatore = AggregatoreRepliche()
+        with strumentazione.fase('aggregazione'):
+            aggregatore.aggiorna_colonne(colonne)
+    return aggregatore, strumentazione
+
+
+def _esegui_blocchi(funzione, scenario, prodotti, n_repliche: int, seed_master: int, n_worker: int | None,
+                    backend: str, dimensione_blocco: int, primo_blocco: int = 0):
+    """
+    Esegue funzione su ogni blocco a partire da primo_blocco, in processo o con un ProcessPoolExecutor.
+
+    Returns:
+        tuple: (numero di worker usati, iteratore dei risultati nell'ordine dei blocchi)
+    """
+    blocchi = suddividi_blocchi(n_repliche, dimensione_blocco)[primo_blocco:]
+    n_worker = n_worker or os.cpu_count() or 1
+    n_worker = max(1, min(n_worker, len(blocchi)))
+
+    seeds = [deriva_seed(seed_master, indice) for indice, _ in blocchi]
+    dimensioni = [n for _, n in blocchi]
+
+    def risultati():
+        if n_worker == 1:
+            for seed, n in zip(seeds, dimensioni):
+                yield funzione(scenario, prodotti, seed, n, backend)
+            return
+
+        with ProcessPoolExecutor(max_workers=n_worker) as executor:
+            try:
+                yield from executor.map(
+                    funzione,
+                    [scenario] * len(blocchi),
+                    [prodotti] * len(blocchi),
+                    seeds,
+                    dimensioni,
+                    [backend] * len(blocchi),
+                    chunksize=max(1, len(blocchi) // (n_worker * 4)),
+                )
+            finally:
+                # Consumo interrotto (errore o checkpoint): i blocchi non ancora avviati non vengono eseguiti
+                executor.shutdown(cancel_futures=True)
+
+    return n_worker, risultati()
+
+
+def _concatena(vettori: list):
+    """Concatena i vettori dei blocchi mantenendo l'ordine dei blocchi"""
+    if np is not None and isinstance(vettori[0], np.ndarray):
+        return np.concatenate(vettori)
+
+    risultato = vettori[0]
+    for vettore in vettori[1:]:
+        risultato.extend(vettore)
+    return risultato
+
+
+def unisci_colonne(blocchi: list[dict]) -> dict:
+    """
+    Unisce le colonne prodotte dai singoli blocchi in un'unica serie di vettori
+    """
+    colonne = {
+        'quantita': {},
+        'tempo_produzione_ore': {},
+        'superamenti': {},
+        'vincoli_rispettati': _concatena([b['vincoli_rispettati'] for b in blocchi]),
+        'capacita_totale_effettiva': _concatena([b['capacita_totale_effettiva'] for b in blocchi]),
+        'tempo_totale_ore': _concatena([b['tempo_totale_ore'] for b in blocchi]),
+        'tempo_totale_giorni': _concatena([b['tempo_totale_giorni'] for b in blocchi]),
+    }
+
+    for nome in blocchi[0]['quantita']:
+        colonne['quantita'][nome] = _concatena([b['quantita'][nome] for b in blocchi])
+        colonne['tempo_produzione_ore'][nome] = _concatena([b['tempo_produzione_ore'][nome] for b in blocchi])
+        colonne['superamenti'][nome] = sum(b['superamenti'][nome] for b in blocchi)
+
+    return colonne
+
+
+def esegui_repliche_parallele(scenario: dict, prodotti: list[dict], n_repliche: int, seed_master: int,
+                              n_worker: int | None = None, backend: str = 'auto',
+                              dimensione_blocco: int = DIMENSIONE_BLOCCO, conserva_repliche: bool = True,
+                              fermi: ModelloFermi | None = None) -> dict:
+    """
+    Distribuisce le repliche Monte Carlo su più processi
+
+    Le repliche sono divise in blocchi di dimensione fissa e ogni blocco usa un seed derivato
+    dal seed principale e dal proprio indice. Il risultato è quindi identico bit per bit
+    per un dato seed_master e una data dimensione_blocco, qualunque sia il numero di worker.
+
+    Args:
+        scenario (dict): scenario produttivo
+        prodotti (list[dict]): lista dei prodotti
+        n_repliche (int): numero totale di repliche
+        seed_master (int): seed principale da cui derivare i flussi dei blocchi
+        n_worker (int | None): numero di processi (default: numero di CPU)
+        backend (str): 'auto', 'array' o 'numpy'
+        dimensione_blocco (int): repliche per blocco
+        conserva_repliche (bool): se False restituisce solo le statistiche di sintesi
+        fermi (ModelloFermi | None): guasti e cambi formato applicati in ogni blocco
+
+    Returns:
+        dict: stessa struttura di SimulatoreProduzioneKimbo.simula_monte_carlo
+    """
+    n_worker, risultati = _esegui_blocchi(partial(_esegui_blocco, fermi=fermi), scenario, prodotti, n_repliche, seed_master,
+                                          n_worker, backend, dimensione_blocco)
+    risultati_blocchi = list(risultati)
+
+    backend_usato = risultati_blocchi[0]['backend']
+    colonne = unisci_colonne(risultati_blocchi)
+
+    risultati = {
+        'scenario': scenario,
+        'n_repliche': n_repliche,
+        'backend': backend_usato,
+        'n_worker': n_worker,
+        'dimensione_blocco': dimensione_blocco,
+        'statistiche': riepiloga_repliche(colonne, n_repliche),
+    }
+
+    if conserva_repliche:
+        colonne.pop('superamenti')
+        risultati['repliche'] = colonne
+
+    return risultati
+
+
+def esegui_aggregato_parallelo(scenario: dict, prodotti: list[dict], n_repliche: int, seed_master: int,
+                               n_worker: int | None = None, backend: str = 'auto',
+                               dimensione_blocco: int = DIMENSIONE_BLOCCO,
+                               strumentazione: Strumentazione | None = None,
+                               checkpoint: Checkpoint | None = None,
+                               fermi: ModelloFermi | None = None) -> dict:
+    """
+    Come esegui_repliche_parallele, ma ogni worker restituisce solo l'aggregato del proprio blocco.
+    Gli aggregati sono uniti nell'ordine dei blocchi: la memoria resta proporzionale al numero
+    di prodotti e il risultato è identico per un dato seed_master con qualunque numero di worker.
+    Con una strumentazione, le misure di ogni blocco vi sono unite al termine.
+
+    Con un checkpoint, blocchi completati e aggregato parziale sono salvati periodicamente
+    e all'interruzione (Ctrl+C/SIGTERM); se il file esiste già l'esecuzione riprende da lì
+    e il risultato è identico a quello di un'esecuzione senza interruzioni.
+    Il modello di fermi, se indicato, è salvato con gli argomenti e usato anche dalla ripresa.
+
+    Returns:
+        dict: statistiche di sintesi (percentili stimati) e AggregatoreRepliche complessivo
+    """
+    funzione = partial(_aggrega_blocco, fermi=fermi)
+    if strumentazione is not None:
+        funzione = partial(_aggrega_blocco_strumentato, strumentazione.allocazioni, strumentazione.profilo,
+                           fermi=fermi)
+
+    aggregatore = AggregatoreRepliche()
+    primo_blocco = 0
+    if checkpoint is not None:
+        scenario = Scenario.da_valore(scenario)
+        prodotti = CatalogoProdotti.da_prodotti(prodotti).prodotti
+        backend = risolvi_backend(backend)
+        argomenti = {'scenario': scenario, 'prodotti': prodotti, 'n_repliche': n_repliche,
+                     'seed_master': seed_master, 'backend': backend, 'dimensione_blocco': dimensione_blocco}
+        if fermi is not None:
+            # Solo se presente: i checkpoint senza fermi mantengono la stessa impronta
+            argomenti['fermi'] = fermi
+        n_blocchi = len(suddividi_blocchi(n_repliche, dimensione_blocco))
+        stato = checkpoint.carica('aggregato', argomenti)
+        if stato is not None:
+            primo_blocco, aggregatore = stato['completate'], stato['parziale']
+
+    n_worker, risultati = _esegui_blocchi(funzione, scenario, prodotti, n_repliche, seed_master,
+                                          n_worker, backend, dimensione_blocco, primo_blocco)
+
+    with checkpoint.proteggi() if checkpoint is not None else nullcontext():
+        for indice, risultato in enumerate(risultati, primo_blocco + 1):
+            if strumentazione is not None:
+                risultato, misure_blocco = risultato
+                strumentazione.unisci(misure_blocco)
+            aggregatore.unisci(risultato)
+            if checkpoint is not None:
+                checkpoint.avanza('aggregato', argomenti, indice, n_blocchi, aggregatore)
+
+    return {
+        'scenario': scenario,
+        'n_repliche': n_repliche,
+        'n_worker': n_worker,
+        'dimensione_blocco': dimensione_blocco,
+        'statistiche': aggregatore.riepilogo(),
+        'aggregatore': aggregatore,
+    }
@@ -0,0 +1,259 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import replace
+import csv
+import itertools
+import os
+import random
+
+from entità.checkpoint import Checkpoint
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+from entità.esecuzione_parallela import deriva_seed
+from entità.fermi_macchina import ModelloFermi
+from entità.monte_carlo import riepiloga_repliche, risolvi_backend
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+
+
+# ===============================================
+# PIANI SPERIMENTALI SUI CAMPI DELLO SCENARIO
+# ===============================================
+CAMPI_INTERI = ('ore_lavorative_giorno',)
+CAMPI_DECIMALI = ('efficienza_impianti', 'variabilita_tempi', 'variabilita_capacita')
+# Estremi di range_quantita, variabili separatamente (la coppia intera non è un campo dello sweep)
+CAMPI_RANGE = ('range_quantita_min', 'range_quantita_max')
+CAMPI_VARIABILI = CAMPI_INTERI + CAMPI_DECIMALI + CAMPI_RANGE
+
+# Campi dello scenario che il modello Monte Carlo valutato dallo sweep non usa
+CAMPI_NON_VALUTATI = {
+    'turni_giorno': "il modello Monte Carlo dipende solo dalle ore lavorative; per valutare i turni "
+                    "usare il comando eventi (--turni) o il comando capacita",
+}
+
+PUNTI_PER_TASK = 16
+
+
+def _verifica_campi(campi) -> None:
+    for campo in campi:
+        if campo in CAMPI_NON_VALUTATI:
+            raise Exception(f"Campo '{campo}' non variabile nello sweep: {CAMPI_NON_VALUTATI[campo]}")
+        if campo not in CAMPI_VARIABILI:
+            raise Exception(f"Campo '{campo}' non variabile. Campi disponibili: {', '.join(CAMPI_VARIABILI)}")
+
+
+def applica_valori(base: Scenario, valori: dict) -> Scenario:
+    """
+    Restituisce una copia di base con i campi indicati sostituiti.
+    Il nome del nuovo scenario riporta i valori usati, es. produzione_standard[efficienza_impianti=0.8]
+    """
+    valori = dict(valori)
+    minimo, massimo = base.range_quantita
+    if 'range_quantita_min' in valori or 'range_quantita_max' in valori:
+        minimo = valori.pop('range_quantita_min', minimo)
+        massimo = valori.pop('range_quantita_max', massimo)
+        valori['range_quantita'] = (minimo, massimo)
+
+    etichetta = ', '.join(f"{campo}={valore}" for campo, valore in valori.items())
+    return replace(base, nome=f"{base.nome}[{etichetta}]", **valori)
+
+
+def griglia_fattoriale(base: Scenario | dict, livelli: dict[str, list]) -> list[tuple[dict, Scenario]]:
+    """
+    Piano fattoriale completo: tutte le combinazioni dei livelli indicati
+
+    Args:
+        base (Scenario | dict): scenario da cui partire per i campi non variati
+        livelli (dict): campo -> lista dei valori da provare
+
+    Returns:
+        list: coppie (valori del punto, scenario corrispondente)
+    """
+    base = Scenario.da_valore(base)
+    _verifica_campi(livelli)
+    if any(len(valori) == 0 for valori in livelli.values()):
+        raise Exception("Ogni campo deve avere almeno un livello")
+
+    campi = list(livelli)
+    punti = []
+    for combinazione in itertools.product(*(livelli[c] for c in campi)):
+        valori = dict(zip(campi, combinazione))
+        punti.append((valori, applica_valori(base, valori)))
+
+    return punti
+
+
+def ipercubo_latino(base: Scenario | dict, intervalli: dict[str, tuple[float, float]], n_punti: int,
+                    seed: int | None = None) -> list[tuple[dict, Scenario]]:
+    """
+    Campionamento a ipercubo latino: ogni intervallo è diviso in n_punti strati
+    e ogni strato di ogni campo è usato esattamente una volta
+
+    Args:
+        base (Scenario | dict): scenario da cui partire per i campi non variati
+        intervalli (dict): campo -> (minimo, massimo)
+        n_punti (int): numero di punti da generare
+        seed (int | None): seed per la posizione dei punti negli strati
+
+    Returns:
+        list: coppie (valori del punto, scenario corrispondente)
+    """
+    base = Scenario.da_valore(base)
+    _verifica_campi(intervalli)
+    if n_punti <= 0:
+        raise Exception("Il numero di punti deve essere maggiore di zero")
+
+    rng = random.Random(seed)
+    colonne = {}
+    for campo, (minimo, massimo) in intervalli.items():
+        if minimo > massimo:
+            raise Exception(f"Intervallo di '{campo}' non valido: minimo maggiore del massimo")
+        strati = list(range(n_punti))
+        rng.shuffle(strati)
+        valori = [minimo + (massimo - minimo) * (s + rng.random()) / n_punti for s in strati]
+        if campo in CAMPI_INTERI:
+            valori = [int(round(v)) for v in valori]
+        colonne[campo] = valori
+
+    punti = []
+    for i in range(n_punti):
+        valori = {campo: colonne[campo][i] for campo in colonne}
+        punti.append((valori, applica_valori(base, valori)))
+
+    return punti
+
+
+def _valuta_punti(scenari: list[Scenario], catalogo: CatalogoProdotti, seeds: list[int],
+                  n_repliche: int, backend: str, fermi: ModelloFermi | None = None) -> list[dict]:
+    """Valuta un gruppo di punti nello stesso worker, con un solo catalogo per tutto il gruppo"""
+    risultati = []
+    for scenario, seed in zip(scenari, seeds):
+        simulatore = SimulatoreProduzioneKimbo(scenario, catalogo, seed, fermi=fermi)
+        colonne = simulatore.genera_colonne_monte_carlo(n_repliche, backend)
+        statistiche = riepiloga_repliche(colonne, n_repliche)
+        ore = statistiche['tempo_totale_ore']
+        risultati.append({
+            'tempo_totale_ore_medio': ore['media'],
+            'tempo_totale_ore_deviazione_standard': ore['deviazione_standard'],
+            'tempo_totale_ore_p50': ore['p50'],
+            'tempo_totale_ore_p95': ore['p95'],
+            'tempo_totale_ore_p99': ore['p99'],
+            'tempo_totale_giorni_medio': statistiche['tempo_totale_giorni']['media'],
+            'percentuale_vincoli_violati': statistiche['percentuale_vincoli_violati'],
+        })
+
+    return risultati
+
+
+def _esegui_gruppi(gruppi: list, catalogo: CatalogoProdotti, n_repliche: int, backend: str, n_worker: int,
+                   fermi: ModelloFermi | None = None):
+    """Statistiche di ogni gruppo di punti, nell'ordine dei gruppi, man mano che sono pronte"""
+    if n_worker == 1:
+        for scenari, seeds in gruppi:
+            yield _valuta_punti(scenari, catalogo, seeds, n_repliche, backend, fermi)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_worker) as executor:
+        try:
+            yield from executor.map(
+                _valuta_punti,
+                [s for s, _ in gruppi],
+                [catalogo] * len(gruppi),
+                [g for _, g in gruppi],
+                [n_repliche] * len(gruppi),
+                [backend] * len(gruppi),
+                [fermi] * len(gruppi),
+            )
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+def esegui_sweep(punti: list[tuple[dict, Scenario]], prodotti, n_repliche: int = 1_000, seed: int = 0,
+                 n_worker: int | None = None, backend: str = 'auto',
+                 punti_per_task: int = PUNTI_PER_TASK, checkpoint: Checkpoint | None = None,
+                 fermi: ModelloFermi | None = None) -> list[dict]:
+    """
+    Esegue n_repliche Monte Carlo per ogni punto di un piano sperimentale
+
+    I punti sono raggruppati in task da punti_per_task e distribuiti su un ProcessPoolExecutor;
+    il catalogo prodotti è compilato una volta e condiviso da tutti i punti. Ogni punto usa
+    un seed derivato dal seed principale e dal proprio indice, quindi i risultati non dipendono
+    dal numero di worker. Con un checkpoint i task completati sono salvati periodicamente
+    e all'interruzione; se il file esiste già lo sweep riprende dal primo task mancante.
+    Il modello di fermi, se indicato, vale per tutti i punti ed è salvato con gli argomenti.
+
+    Args:
+        punti (list): coppie (valori, scenario) di griglia_fattoriale o ipercubo_latino
+        prodotti: catalogo o lista di prodotti
+        n_repliche (int): repliche per punto
+        seed (int): seed principale
+        n_worker (int | None): numero di processi (default: numero di CPU)
+        backend (str): 'auto', 'array' o 'numpy'
+        punti_per_task (int): punti valutati da un worker per ogni task
+        checkpoint (Checkpoint | None): salvataggio e ripresa dell'avanzamento
+        fermi (ModelloFermi | None): guasti e cambi formato applicati in ogni punto
+
+    Returns:
+        list[dict]: una riga per punto con i valori dei campi e le statistiche di sintesi
+    """
+    if not punti:
+        raise Exception("Il piano sperimentale non contiene punti")
+    if n_repliche <= 0:
+        raise Exception("Il numero di repliche deve essere maggiore di zero")
+    if punti_per_task <= 0:
+        raise Exception("Il numero di punti per task deve essere maggiore di zero")
+
+    catalogo = CatalogoProdotti.da_prodotti(prodotti)
+    scenari = [scenario for _, scenario in punti]
+    seeds = [deriva_seed(seed, indice) for indice in range(len(punti))]
+
+    gruppi = [(scenari[i:i + punti_per_task], seeds[i:i + punti_per_task])
+              for i in range(0, len(punti), punti_per_task)]
+
+    esiti = []
+    if checkpoint is not None:
+        backend = risolvi_backend(backend)
+        argomenti = {'punti': punti, 'prodotti': catalogo.prodotti, 'n_repliche': n_repliche, 'seed': seed,
+                     'backend': backend, 'punti_per_task': punti_per_task}
+        if fermi is not None:
+            # Solo se presente: i checkpoint senza fermi mantengono la stessa impronta
+            argomenti['fermi'] = fermi
+        stato = checkpoint.carica('sweep', argomenti)
+        if stato is not None:
+            esiti = stato['parziale']
+
+    mancanti = gruppi[len(esiti):]
+    n_worker = max(1, min(n_worker or os.cpu_count() or 1, len(mancanti)))
+
+    with checkpoint.proteggi() if checkpoint is not None else nullcontext():
+        for esito in _esegui_gruppi(mancanti, catalogo, n_repliche, backend, n_worker, fermi):
+            esiti.append(esito)
+            if checkpoint is not None:
+                checkpoint.avanza('sweep', argomenti, len(esiti), len(gruppi), esiti)
+
+    righe = []
+    for indice, ((valori, _), statistiche) in enumerate(zip(punti, itertools.chain.from_iterable(esiti))):
+        riga = {'punto': indice}
+        for campo, valore in valori.items():
+            riga[campo] = list(valore) if isinstance(valore, tuple) else valore
+        riga['n_repliche'] = n_repliche
+        riga.update(statistiche)
+        righe.append(riga)
+
+    return righe
+
+
+def scrivi_tabella_csv(righe: list[dict], destinazione) -> int:
+    """
+    Scrive i risultati di esegui_sweep in un'unica tabella CSV, una riga per punto
+
+    Returns:
+        int: numero di righe scritte
+    """
+    if not righe:
+        return 0
+
+    writer = csv.DictWriter(destinazione, fieldnames=list(righe[0]))
+    writer.writeheader()
+    writer.writerows(righe)
+    return len(righe)
+
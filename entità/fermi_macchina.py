@@ -0,0 +1,363 @@
+from array import array
+from dataclasses import dataclass, field
+from functools import partial
+import json
+import math
+
+from entità.monte_carlo import np
+
+
+# ===============================================
+# GUASTI, RIPARAZIONI E CAMBI FORMATO
+# ===============================================
+# I guasti sono campionati estraendo direttamente i tempi di funzionamento tra un guasto e il
+# successivo: il costo di un lotto o di una giornata è proporzionale al numero di guasti, non alla
+# durata simulata. Tutti i tempi sono in minuti.
+DISTRIBUZIONI = ('esponenziale', 'weibull')
+# Oltre questa media di guasti per lotto exp(-media) perde precisione: si contano i tempi tra guasti
+MEDIA_MASSIMA_POISSON = 500
+
+
+@dataclass(frozen=True, slots=True)
+class Distribuzione:
+    """
+    Durata aleatoria in minuti.
+    esponenziale: scala = media; weibull: scala e forma (forma > 1 guasti per usura, < 1 guasti precoci)
+    """
+    tipo: str
+    scala: float
+    forma: float = 1.0
+
+    def __post_init__(self):
+        if self.tipo not in DISTRIBUZIONI:
+            raise Exception(f"Distribuzione '{self.tipo}' non supportata. Distribuzioni: {', '.join(DISTRIBUZIONI)}")
+        if self.scala <= 0 or self.forma <= 0:
+            raise Exception("Scala e forma della distribuzione devono essere maggiori di zero")
+
+    @classmethod
+    def da_dict(cls, dati: dict) -> "Distribuzione":
+        return cls(tipo=dati['tipo'], scala=float(dati['scala']), forma=float(dati.get('forma', 1.0)))
+
+    def a_dict(self) -> dict:
+        return {'tipo': self.tipo, 'scala': self.scala, 'forma': self.forma}
+
+    @property
+    def media(self) -> float:
+        if self.tipo == 'esponenziale':
+            return self.scala
+        return self.scala * math.gamma(1 + 1 / self.forma)
+
+    def campiona(self, rng) -> float:
+        if self.tipo == 'esponenziale':
+            return rng.expovariate(1 / self.scala)
+        return rng.weibullvariate(self.scala, self.forma)
+
+    def campionatore(self, rng):
+        """Funzione senza argomenti che estrae una durata, senza ricontrollare il tipo a ogni estrazione"""
+        if self.tipo == 'esponenziale':
+            return partial(rng.expovariate, 1 / self.scala)
+        return partial(rng.weibullvariate, self.scala, self.forma)
+
+    def somma(self, rng, k: int) -> float:
+        """Somma di k durate indipendenti: per l'esponenziale una sola estrazione Gamma(k, scala)"""
+        if k == 0:
+            return 0.0
+        if self.tipo == 'esponenziale':
+            return rng.gammavariate(k, self.scala)
+        # Come rng.weibullvariate, senza una chiamata di metodo per estrazione
+        casuale = rng.random
+        esponente = 1 / self.forma
+        return self.scala * sum((-math.log(1.0 - casuale())) ** esponente for _ in range(k))
+
+    def campiona_vettore(self, generatore, n: int):
+        """n durate indipendenti estratte in blocco con un generatore NumPy"""
+        if self.tipo == 'esponenziale':
+            return generatore.exponential(self.scala, n)
+        return self.scala * generatore.weibull(self.forma, n)
+
+    def somma_vettore(self, generatore, conteggi):
+        """Per ogni elemento di conteggi, somma di altrettante durate indipendenti (NumPy)"""
+        if self.tipo == 'esponenziale':
+            somme = np.zeros(len(conteggi))
+            positivi = conteggi > 0
+            somme[positivi] = generatore.gamma(conteggi[positivi], self.scala)
+            return somme
+        estrazioni = self.campiona_vettore(generatore, int(conteggi.sum()))
+        return np.bincount(np.repeat(np.arange(len(conteggi)), conteggi), weights=estrazioni,
+                           minlength=len(conteggi))
+
+
+def _poisson(casuale, media: float) -> int:
+    """Estrazione di una Poisson per inversione: un'uniforme e circa media passi aritmetici"""
+    probabilita = math.exp(-media)
+    cumulata = probabilita
+    u = casuale()
+    k = 0
+    while u > cumulata and probabilita > 0:
+        k += 1
+        probabilita *= media / k
+        cumulata += probabilita
+    return k
+
+
+@dataclass(frozen=True, slots=True)
+class ModelloGuasti:
+    """Guasti di una linea: minuti di funzionamento tra due guasti e durata della riparazione"""
+    tempo_tra_guasti: Distribuzione
+    riparazione: Distribuzione
+
+    @classmethod
+    def da_dict(cls, dati: dict) -> "ModelloGuasti":
+        return cls(Distribuzione.da_dict(dati['tempo_tra_guasti']), Distribuzione.da_dict(dati['riparazione']))
+
+    def a_dict(self) -> dict:
+        return {'tempo_tra_guasti': self.tempo_tra_guasti.a_dict(), 'riparazione': self.riparazione.a_dict()}
+
+    @property
+    def disponibilita(self) -> float:
+        """Frazione di tempo in funzione nel lungo periodo, MTBF / (MTBF + MTTR)"""
+        return self.tempo_tra_guasti.media / (self.tempo_tra_guasti.media + self.riparazione.media)
+
+    def campiona_fermo(self, rng, minuti_operativi: float) -> tuple[int, float]:
+        """
+        Guasti durante minuti_operativi di lavorazione, con la linea appena avviata
+
+        Returns:
+            tuple[int, float]: numero di guasti e minuti di fermo per le riparazioni
+        """
+        guasti = 0
+        fermo = 0.0
+        prossimo = self.tempo_tra_guasti.campiona(rng)
+        while prossimo <= minuti_operativi:
+            guasti += 1
+            fermo += self.riparazione.campiona(rng)
+            prossimo += self.tempo_tra_guasti.campiona(rng)
+        return guasti, fermo
+
+    def fermi_colonna(self, rng, minuti) -> list[float]:
+        """
+        Minuti di fermo per ogni durata di lavorazione in minuti (vedi campiona_fermo).
+        Con tempi tra guasti esponenziali il numero di guasti è una Poisson di media durata / scala,
+        estratta con una sola uniforme; le riparazioni di una replica sono sommate con una sola
+        chiamata (Distribuzione.somma).
+        """
+        tra_guasti = self.tempo_tra_guasti.campionatore(rng)
+        esponenziale = self.tempo_tra_guasti.tipo == 'esponenziale'
+        scala = self.tempo_tra_guasti.scala
+        esponente = 1 / self.tempo_tra_guasti.forma
+        casuale = rng.random
+        log = math.log
+        somma = self.riparazione.somma
+        fermi = []
+        for durata in minuti:
+            if esponenziale and durata / scala <= MEDIA_MASSIMA_POISSON:
+                guasti = _poisson(casuale, durata / scala)
+            elif esponenziale:
+                guasti = 0
+                prossimo = tra_guasti()
+                while prossimo <= durata:
+                    guasti += 1
+                    prossimo += tra_guasti()
+            else:
+                # Weibull estratta come in rng.weibullvariate, senza una chiamata di metodo per guasto
+                guasti = 0
+                prossimo = scala * (-log(1.0 - casuale())) ** esponente
+                while prossimo <= durata:
+                    guasti += 1
+                    prossimo += scala * (-log(1.0 - casuale())) ** esponente
+            fermi.append(somma(rng, guasti) if guasti else 0.0)
+        return fermi
+
+    def fermi_vettore(self, generatore, minuti):
+        """
+        Come fermi_colonna con un generatore NumPy: per tempi tra guasti esponenziali il numero di
+        guasti è una Poisson di media minuti / scala, altrimenti si estrae un tempo tra guasti per
+        tutte le repliche ancora in lavorazione a ogni passo (tanti passi quanti i guasti massimi)
+        """
+        distribuzione = self.tempo_tra_guasti
+        if distribuzione.tipo == 'esponenziale':
+            guasti = generatore.poisson(minuti / distribuzione.scala)
+        else:
+            guasti = np.zeros(len(minuti), dtype=np.int64)
+            attive = np.arange(len(minuti))
+            prossimo = np.zeros(len(minuti))
+            while attive.size:
+                prossimo += distribuzione.campiona_vettore(generatore, attive.size)
+                guastate = prossimo <= minuti[attive]
+                attive = attive[guastate]
+                prossimo = prossimo[guastate]
+                guasti[attive] += 1
+        return self.riparazione.somma_vettore(generatore, guasti)
+
+    def campiona_giornata(self, rng, minuti_giornata: float, residuo: float | None,
+                          riparazione_in_corso: float) -> tuple[int, float, float, float]:
+        """
+        Alterna funzionamento e riparazioni in una giornata di minuti_giornata, proseguendo lo stato
+        della giornata precedente: una riparazione che supera la fine della giornata continua il giorno dopo.
+
+        Args:
+            residuo (float | None): minuti di funzionamento al prossimo guasto (None: linea nuova)
+            riparazione_in_corso (float): minuti di riparazione rimasti dalla giornata precedente
+
+        Returns:
+            tuple: guasti, minuti di funzionamento, residuo e riparazione in corso per la giornata successiva
+        """
+        orologio = min(riparazione_in_corso, minuti_giornata)
+        riparazione_in_corso -= orologio
+        prossimo = self.tempo_tra_guasti.campiona(rng) if residuo is None else residuo
+        guasti = 0
+        operativi = 0.0
+
+        while orologio < minuti_giornata:
+            libero = minuti_giornata - orologio
+            if prossimo > libero:
+                operativi += libero
+                prossimo -= libero
+                break
+            orologio += prossimo
+            operativi += prossimo
+            guasti += 1
+            fine_riparazione = orologio + self.riparazione.campiona(rng)
+            prossimo = self.tempo_tra_guasti.campiona(rng)
+            if fine_riparazione > minuti_giornata:
+                riparazione_in_corso = fine_riparazione - minuti_giornata
+            orologio = min(fine_riparazione, minuti_giornata)
+
+        return guasti, operativi, prossimo, riparazione_in_corso
+
+
+@dataclass(frozen=True, slots=True)
+class ModelloFermi:
+    """
+    Fermi di un impianto: guasti per linea (una linea per prodotto) e matrice dei cambi formato.
+    I prodotti senza modello di guasto non si fermano; le coppie assenti dalla matrice non richiedono cambio.
+
+    Esempio di configurazione JSON:
+        {"guasti": {"Caffè in Grani": {"tempo_tra_guasti": {"tipo": "weibull", "scala": 900, "forma": 1.5},
+                                       "riparazione": {"tipo": "esponenziale", "scala": 45}}},
+         "cambi_formato": {"Caffè in Grani": {"Caffè Macinato": 20}, "Caffè Macinato": {"Capsule/Cialde": 35}}}
+    """
+    guasti: dict = field(default_factory=dict)             # prodotto -> ModelloGuasti
+    cambi_formato: dict = field(default_factory=dict)      # prodotto -> {prodotto successivo -> minuti}
+
+    @classmethod
+    def da_dict(cls, dati: dict) -> "ModelloFermi":
+        sconosciute = set(dati) - {'guasti', 'cambi_formato'}
+        if sconosciute:
+            raise Exception(f"Chiavi non riconosciute nella configurazione dei fermi: {', '.join(sorted(sconosciute))}")
+        cambi = {da: {a: float(minuti) for a, minuti in successivi.items()}
+                 for da, successivi in dati.get('cambi_formato', {}).items()}
+        for successivi in cambi.values():
+            if any(minuti < 0 for minuti in successivi.values()):
+                raise Exception("I minuti di cambio formato non possono essere negativi")
+        return cls(
+            guasti={nome: ModelloGuasti.da_dict(modello) for nome, modello in dati.get('guasti', {}).items()},
+            cambi_formato=cambi,
+        )
+
+    @classmethod
+    def da_json(cls, percorso: str) -> "ModelloFermi":
+        with open(percorso, encoding='utf-8') as file:
+            return cls.da_dict(json.load(file))
+
+    def a_dict(self) -> dict:
+        return {
+            'guasti': {nome: modello.a_dict() for nome, modello in self.guasti.items()},
+            'cambi_formato': self.cambi_formato,
+        }
+
+    def verifica(self, nomi) -> None:
+        """Solleva un'eccezione se il modello cita prodotti assenti dal catalogo"""
+        nomi = set(nomi)
+        citati = set(self.guasti) | set(self.cambi_formato)
+        for successivi in self.cambi_formato.values():
+            citati.update(successivi)
+        sconosciuti = sorted(citati - nomi)
+        if sconosciuti:
+            raise Exception(f"Fermi configurati per prodotti non presenti nel catalogo: {', '.join(sconosciuti)}")
+
+    def matrice_cambi(self, nomi) -> list[list[float]]:
+        """
+        Minuti di cambio formato tra i prodotti nell'ordine di nomi: la riga i è il prodotto precedente,
+        la colonna j il successivo; la riga aggiuntiva len(nomi) (nessun prodotto precedente) è nulla
+        """
+        matrice = [[self.cambi_formato.get(da, {}).get(a, 0.0) for a in nomi] for da in nomi]
+        matrice.append([0.0] * len(nomi))
+        return matrice
+
+    def minuti_cambio(self, sequenza) -> float:
+        """Minuti di cambio formato per produrre i prodotti nell'ordine dato"""
+        totale = 0.0
+        precedente = None
+        for nome in sequenza:
+            if precedente is not None:
+                totale += self.cambi_formato.get(precedente, {}).get(nome, 0.0)
+            precedente = nome
+        return totale
+
+
+def _minuti_cambio_colonne(modello: ModelloFermi, quantita: dict, nomi, usa_numpy: bool):
+    """Minuti di cambio formato di ogni replica, scorrendo le colonne delle quantità nell'ordine del catalogo"""
+    matrice = modello.matrice_cambi(nomi)
+    n = len(quantita[nomi[0]])
+    if usa_numpy:
+        matrice = np.asarray(matrice)
+        precedente = np.full(n, len(nomi))
+        minuti = np.zeros(n)
+        for j, nome in enumerate(nomi):
+            lavorato = quantita[nome] > 0
+            minuti += np.where(lavorato, matrice[precedente, j], 0.0)
+            precedente = np.where(lavorato, j, precedente)
+        return minuti
+
+    precedente = [len(nomi)] * n
+    minuti = [0.0] * n
+    for j, nome in enumerate(nomi):
+        for i, q in enumerate(quantita[nome]):
+            if q > 0:
+                minuti[i] += matrice[precedente[i]][j]
+                precedente[i] = j
+    return minuti
+
+
+def applica_fermi_colonne(colonne: dict, modello: ModelloFermi, rng, nomi, ore_lavorative: int) -> None:
+    """
+    Aggiunge i fermi alle colonne di esegui_repliche: per ogni replica i guasti di ogni linea
+    durante la sua lavorazione e i cambi formato tra i prodotti lavorati, nell'ordine del catalogo.
+    Con colonne NumPy guasti e riparazioni sono estratti in blocco per colonna.
+    Aggiorna in place tempo_produzione_ore per prodotto, tempo_totale_ore e tempo_totale_giorni.
+    """
+    usa_numpy = np is not None and isinstance(colonne['tempo_totale_ore'], np.ndarray)
+
+    if usa_numpy:
+        generatore = np.random.default_rng(rng.getrandbits(64))
+        ore_totali = colonne['tempo_totale_ore']
+        for nome in nomi:
+            guasti = modello.guasti.get(nome)
+            if guasti is None:
+                continue
+            ore_prodotto = colonne['tempo_produzione_ore'][nome]
+            ore_fermo = guasti.fermi_vettore(generatore, ore_prodotto * 60) / 60
+            colonne['tempo_produzione_ore'][nome] = ore_prodotto + ore_fermo
+            ore_totali = ore_totali + ore_fermo
+        if modello.cambi_formato:
+            ore_totali = ore_totali + _minuti_cambio_colonne(modello, colonne['quantita'], nomi, True) / 60
+        colonne['tempo_totale_ore'] = ore_totali
+        colonne['tempo_totale_giorni'] = ore_totali / ore_lavorative
+        return
+
+    ore_totali = list(colonne['tempo_totale_ore'])
+    for nome in nomi:
+        guasti = modello.guasti.get(nome)
+        if guasti is None:
+            continue
+        ore_prodotto = colonne['tempo_produzione_ore'][nome]
+        ore_fermo = [fermo / 60 for fermo in guasti.fermi_colonna(rng, [ore * 60 for ore in ore_prodotto])]
+        colonne['tempo_produzione_ore'][nome] = array('d', map(float.__add__, ore_prodotto, ore_fermo))
+        ore_totali = list(map(float.__add__, ore_totali, ore_fermo))
+    if modello.cambi_formato:
+        minuti_cambio = _minuti_cambio_colonne(modello, colonne['quantita'], nomi, False)
+        ore_totali = [ore + minuti / 60 for ore, minuti in zip(ore_totali, minuti_cambio)]
+
+    colonne['tempo_totale_ore'] = array('d', ore_totali)
+    colonne['tempo_totale_giorni'] = array('d', [ore / ore_lavorative for ore in ore_totali])
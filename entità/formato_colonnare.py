@@ -0,0 +1,265 @@
+from array import array
+import json
+import mmap
+import os
+import struct
+import sys
+
+from entità.monte_carlo import DIMENSIONE_BLOCCO, np
+
+
+# ===============================================
+# FORMATO BINARIO COLONNARE DELLE REPLICHE
+# ===============================================
+# Struttura del file:
+#   preambolo (32 byte): firma, versione, posizione e lunghezza dell'intestazione
+#   colonne: un vettore a larghezza fissa per grandezza, ognuno allineato a 8 byte
+#   intestazione JSON: prodotti (una sola volta), metadati e posizione di ogni colonna
+# L'intestazione è scritta per ultima: un file senza intestazione è un'esecuzione interrotta.
+FIRMA = b'KIMBOCOL'
+VERSIONE = 1
+PREAMBOLO = struct.Struct('<8sIIQQ')  # firma, versione, riservato, posizione e lunghezza dell'intestazione
+ALLINEAMENTO = 8
+ESTENSIONE = '.kcol'
+
+# (grandezza, tipo array.array) delle colonne di impianto e per prodotto
+COLONNE_IMPIANTO = (
+    ('tempo_totale_ore', 'd'),
+    ('tempo_totale_giorni', 'd'),
+    ('vincoli_rispettati', 'b'),
+    ('capacita_totale_effettiva', 'q'),
+)
+COLONNE_PRODOTTO = (
+    ('quantita', 'q'),
+    ('tempo_produzione_ore', 'd'),
+)
+_TIPI_NUMPY = {'d': 'float64', 'q': 'int64', 'b': 'int8'}
+
+
+def _allinea(posizione: int) -> int:
+    return -(-posizione // ALLINEAMENTO) * ALLINEAMENTO
+
+
+def _come_buffer(valori, tipo: str):
+    """Vettore di una colonna come buffer contiguo del tipo indicato, senza copie quando possibile"""
+    if np is not None and isinstance(valori, np.ndarray):
+        return np.ascontiguousarray(valori, dtype=_TIPI_NUMPY[tipo])
+    if isinstance(valori, array) and valori.typecode == tipo:
+        return valori
+    return array(tipo, valori)
+
+
+class ScrittoreColonnare:
+    """
+    Scrive le colonne di genera_colonne_monte_carlo in un file colonnare, un blocco alla volta.
+    Il numero di repliche è noto in anticipo: ogni colonna ha una posizione fissa nel file e
+    ogni blocco vi è scritto in blocco (una sola write per colonna), con i valori non arrotondati.
+
+    Esempio:
+        with ScrittoreColonnare('repliche.kcol', simulatore.catalogo.nomi, n) as scrittore:
+            scrittore.scrivi_blocco(simulatore.genera_colonne_monte_carlo(n))
+    """
+
+    def __init__(self, percorso: str, prodotti, n_repliche: int, metadati: dict | None = None):
+        """
+        Args:
+            percorso (str): file di destinazione
+            prodotti: nomi dei prodotti, nell'ordine del catalogo
+            n_repliche (int): repliche che saranno scritte
+            metadati (dict | None): informazioni serializzabili in JSON (scenario, seed, ...)
+        """
+        if n_repliche <= 0:
+            raise Exception("Il numero di repliche deve essere maggiore di zero")
+
+        self.percorso = percorso
+        self.prodotti = list(prodotti)
+        self.n_repliche = n_repliche
+        self.metadati = metadati or {}
+        self.scritte = 0
+        self.superamenti = {nome: 0 for nome in self.prodotti}
+
+        self.colonne = []
+        posizione = PREAMBOLO.size
+        definizioni = [(nome, None, tipo) for nome, tipo in COLONNE_IMPIANTO]
+        definizioni += [(nome, prodotto, tipo) for prodotto in self.prodotti for nome, tipo in COLONNE_PRODOTTO]
+        for nome, prodotto, tipo in definizioni:
+            posizione = _allinea(posizione)
+            dimensione = array(tipo).itemsize
+            self.colonne.append({'nome': nome, 'prodotto': prodotto, 'tipo': tipo, 'posizione': posizione,
+                                 'dimensione_elemento': dimensione})
+            posizione += dimensione * n_repliche
+        self._fine_colonne = _allinea(posizione)
+
+        self._file = open(percorso, 'wb')
+        self._file.truncate(self._fine_colonne)
+
+    def scrivi_blocco(self, colonne: dict) -> None:
+        """Aggiunge un blocco di repliche (struttura di genera_colonne_monte_carlo)"""
+        n = len(colonne['tempo_totale_ore'])
+        if self.scritte + n > self.n_repliche:
+            raise Exception(f"Il file è stato dimensionato per {self.n_repliche} repliche")
+
+        for colonna in self.colonne:
+            if colonna['prodotto'] is None:
+                valori = colonne[colonna['nome']]
+            else:
+                valori = colonne[colonna['nome']][colonna['prodotto']]
+            self._file.seek(colonna['posizione'] + self.scritte * colonna['dimensione_elemento'])
+            self._file.write(_come_buffer(valori, colonna['tipo']))
+
+        for nome in self.prodotti:
+            self.superamenti[nome] += colonne['superamenti'][nome]
+        self.scritte += n
+
+    def chiudi(self) -> None:
+        """Scrive intestazione e preambolo: solo da qui il file è leggibile"""
+        if self._file.closed:
+            return
+        if self.scritte != self.n_repliche:
+            self._file.close()
+            raise Exception(f"Scritte {self.scritte} repliche su {self.n_repliche}: file incompleto")
+
+        intestazione = json.dumps({
+            'n_repliche': self.n_repliche,
+            'ordine_byte': sys.byteorder,
+            'prodotti': self.prodotti,
+            'superamenti': self.superamenti,
+            'metadati': self.metadati,
+            'colonne': [{k: c[k] for k in ('nome', 'prodotto', 'tipo', 'posizione')} for c in self.colonne],
+        }, ensure_ascii=False).encode()
+
+        self._file.seek(self._fine_colonne)
+        self._file.write(intestazione)
+        self._file.seek(0)
+        self._file.write(PREAMBOLO.pack(FIRMA, VERSIONE, 0, self._fine_colonne, len(intestazione)))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_eccezione, eccezione, traccia):
+        if tipo_eccezione is None:
+            self.chiudi()
+        else:
+            # Un file senza intestazione non è utilizzabile: non lo si lascia su disco
+            self._file.close()
+            os.remove(self.percorso)
+        return False
+
+
+class LettoreColonnare:
+    """
+    Legge un file colonnare tramite mmap: le colonne sono memoryview sul file mappato, senza copie
+    né conversioni, e le porzioni (slicing) di una colonna non leggono il resto del file.
+    Le viste restituite vanno rilasciate (o eliminate) prima di chiudere il lettore.
+    """
+
+    def __init__(self, percorso: str):
+        self.percorso = percorso
+        with open(percorso, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < PREAMBOLO.size:
+                raise Exception(f"Il file '{percorso}' non è un file colonnare valido")
+            self._mappa = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        firma, versione, _, posizione, lunghezza = PREAMBOLO.unpack_from(self._mappa)
+        if firma != FIRMA:
+            self._mappa.close()
+            raise Exception(f"Il file '{percorso}' non è un file colonnare valido")
+        if versione != VERSIONE or posizione == 0:
+            self._mappa.close()
+            raise Exception(f"Il file colonnare '{percorso}' è incompleto o di una versione non supportata")
+
+        intestazione = json.loads(self._mappa[posizione:posizione + lunghezza])
+        if intestazione['ordine_byte'] != sys.byteorder:
+            self._mappa.close()
+            raise Exception(f"Il file '{percorso}' è stato scritto con ordine dei byte {intestazione['ordine_byte']}")
+
+        self.n_repliche = intestazione['n_repliche']
+        self.prodotti = intestazione['prodotti']
+        self.superamenti = intestazione['superamenti']
+        self.metadati = intestazione['metadati']
+        self._colonne = {(c['nome'], c['prodotto']): c for c in intestazione['colonne']}
+        self._vista = memoryview(self._mappa)
+
+    def _definizione(self, nome: str, prodotto: str | None) -> dict:
+        colonna = self._colonne.get((nome, prodotto))
+        if colonna is None:
+            descrizione = f"{nome}[{prodotto}]" if prodotto is not None else nome
+            raise Exception(f"Colonna '{descrizione}' non presente nel file")
+        return colonna
+
+    def colonna(self, nome: str, prodotto: str | None = None) -> memoryview:
+        """
+        Colonna completa come memoryview tipizzata (es. colonna('tempo_totale_ore')[1000:2000])
+
+        Args:
+            nome (str): grandezza (vedi COLONNE_IMPIANTO e COLONNE_PRODOTTO)
+            prodotto (str | None): prodotto, per le grandezze per prodotto
+        """
+        colonna = self._definizione(nome, prodotto)
+        inizio = colonna['posizione']
+        fine = inizio + array(colonna['tipo']).itemsize * self.n_repliche
+        return self._vista[inizio:fine].cast(colonna['tipo'])
+
+    def colonna_numpy(self, nome: str, prodotto: str | None = None):
+        """Colonna come ndarray in sola lettura sul file mappato (richiede NumPy)"""
+        if np is None:
+            raise Exception("NumPy non è installato")
+        colonna = self._definizione(nome, prodotto)
+        return np.frombuffer(self._mappa, dtype=_TIPI_NUMPY[colonna['tipo']], count=self.n_repliche,
+                             offset=colonna['posizione'])
+
+    def blocchi(self, dimensione_blocco: int = DIMENSIONE_BLOCCO):
+        """
+        Porzioni consecutive di tutte le colonne, nella struttura di genera_colonne_monte_carlo
+        (senza i superamenti, disponibili solo in totale nell'attributo superamenti)
+        """
+        if dimensione_blocco <= 0:
+            raise Exception("La dimensione del blocco deve essere maggiore di zero")
+
+        impianto = {nome: self.colonna(nome) for nome, _ in COLONNE_IMPIANTO}
+        prodotti = {nome: {p: self.colonna(nome, p) for p in self.prodotti} for nome, _ in COLONNE_PRODOTTO}
+        for inizio in range(0, self.n_repliche, dimensione_blocco):
+            fine = min(inizio + dimensione_blocco, self.n_repliche)
+            blocco = {nome: vista[inizio:fine] for nome, vista in impianto.items()}
+            for nome, viste in prodotti.items():
+                blocco[nome] = {p: vista[inizio:fine] for p, vista in viste.items()}
+            yield blocco
+
+    def chiudi(self) -> None:
+        try:
+            self._vista.release()
+            self._mappa.close()
+        except BufferError:
+            raise Exception("Rilasciare le colonne lette prima di chiudere il file colonnare") from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *eccezione):
+        self.chiudi()
+        return False
+
+
+def scrivi_colonnare(simulatore, n_repliche: int, percorso: str, dimensione_blocco: int = DIMENSIONE_BLOCCO,
+                     backend: str = 'auto') -> int:
+    """
+    Genera n_repliche a blocchi e le scrive in formato colonnare.
+    I blocchi consumano il generatore del simulatore come genera_repliche: con lo stesso seed
+    i valori coincidono con quelli dei formati jsonl e csv, senza arrotondamenti.
+
+    Returns:
+        int: numero di repliche scritte
+    """
+    if dimensione_blocco <= 0:
+        raise Exception("La dimensione del blocco deve essere maggiore di zero")
+
+    metadati = {'scenario': simulatore.scenario_corrente.a_dict(), 'backend': backend}
+    with ScrittoreColonnare(percorso, simulatore.catalogo.nomi, n_repliche, metadati) as scrittore:
+        while scrittore.scritte < n_repliche:
+            n_blocco = min(dimensione_blocco, n_repliche - scrittore.scritte)
+            colonne = simulatore.genera_colonne_monte_carlo(n_blocco, backend)
+            scrittore.metadati['backend'] = colonne['backend']
+            scrittore.scrivi_blocco(colonne)
+
+    return n_repliche
@@ -0,0 +1,172 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+import os
+
+from entità.configurazione_stabilimento import Sito
+from entità.esecuzione_parallela import deriva_seed, suddividi_blocchi
+from entità.monte_carlo import DIMENSIONE_BLOCCO, np
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+from entità.statistiche_online import AggregatoreRepliche
+
+
+# ===============================================
+# SIMULAZIONE DI UN GRUPPO DI STABILIMENTI
+# ===============================================
+# Ogni (sito, blocco di repliche) è un'unità di lavoro indipendente: aggiungere un sito aggiunge
+# unità da distribuire sui worker, non lavoro in serie. La replica i del gruppo è formata dalle
+# repliche i dei singoli siti, che lavorano in parallelo: le ore si sommano, i giorni sono quelli
+# del sito più lento e i vincoli sono rispettati solo se lo sono in tutti i siti.
+
+def _simula_blocco_sito(sito: Sito, seed: int, n_repliche: int, backend: str) -> tuple[AggregatoreRepliche, dict]:
+    """
+    Esegue un blocco di repliche di un sito in un processo worker
+
+    Returns:
+        tuple: aggregato del blocco e vettori per replica necessari alla riduzione di gruppo
+    """
+    simulatore = SimulatoreProduzioneKimbo(sito.scenario, sito.prodotti, seed,
+                                           capacita_totale_giornaliera=sito.capacita_totale_giornaliera,
+                                           fermi=sito.fermi)
+    colonne = simulatore.genera_colonne_monte_carlo(n_repliche, backend)
+
+    aggregatore = AggregatoreRepliche()
+    aggregatore.aggiorna_colonne(colonne)
+    vettori = {nome: colonne[nome] for nome in ('tempo_totale_ore', 'tempo_totale_giorni', 'vincoli_rispettati')}
+    return aggregatore, vettori
+
+
+def _combina(vettori: list, operazione_numpy, operazione, tipo: str):
+    """Combina replica per replica i vettori di più siti"""
+    if np is not None and isinstance(vettori[0], np.ndarray):
+        return reduce(operazione_numpy, vettori)
+    return array(tipo, map(operazione, *vettori))
+
+
+def riduci_blocco(vettori_siti: list[dict]) -> dict:
+    """
+    Colonne di gruppo di un blocco a partire dai vettori dei siti che lo compongono
+
+    Returns:
+        dict: colonne nella struttura di genera_colonne_monte_carlo, senza dettagli per prodotto
+    """
+    return {
+        'tempo_totale_ore': _combina([v['tempo_totale_ore'] for v in vettori_siti],
+                                     np.add if np is not None else None, lambda *ore: sum(ore), 'd'),
+        'tempo_totale_giorni': _combina([v['tempo_totale_giorni'] for v in vettori_siti],
+                                        np.maximum if np is not None else None, lambda *giorni: max(giorni), 'd'),
+        'vincoli_rispettati': _combina([v['vincoli_rispettati'] for v in vettori_siti],
+                                       np.logical_and if np is not None else None, lambda *vincoli: all(vincoli), 'b'),
+        'quantita': {},
+        'tempo_produzione_ore': {},
+        'superamenti': {},
+    }
+
+
+def _esegui_unita(unita: list[tuple[Sito, int, int]], n_worker: int, backend: str):
+    """Esegue le unità (sito, seed, repliche) in processo o con un ProcessPoolExecutor, nell'ordine dato"""
+    if n_worker == 1:
+        for sito, seed, n in unita:
+            yield _simula_blocco_sito(sito, seed, n, backend)
+        return
+
+    siti, seeds, dimensioni = zip(*unita)
+    with ProcessPoolExecutor(max_workers=n_worker) as executor:
+        try:
+            yield from executor.map(_simula_blocco_sito, siti, seeds, dimensioni, [backend] * len(unita),
+                                    chunksize=max(1, len(unita) // (n_worker * 4)))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+def _riepilogo_gruppo(aggregatore: AggregatoreRepliche, aggregatori_siti: list[AggregatoreRepliche]) -> dict:
+    """Statistiche di un insieme di siti, con la quantità media complessiva per prodotto"""
+    statistiche = aggregatore.riepilogo()
+    quantita = {}
+    for aggregato in aggregatori_siti:
+        for nome, totale in aggregato.quantita_prodotti.items():
+            quantita[nome] = quantita.get(nome, 0) + totale
+    statistiche['prodotti'] = {nome: {'quantita_media': totale / aggregatore.n_repliche}
+                               for nome, totale in quantita.items()}
+    return statistiche
+
+
+def simula_gruppo(siti: list[Sito], n_repliche: int, seed_master: int = 0, n_worker: int | None = None,
+                  backend: str = 'auto', dimensione_blocco: int = DIMENSIONE_BLOCCO) -> dict:
+    """
+    Simula i siti come unità indipendenti su più processi e ne riduce i risultati per
+    stabilimento e per l'intero gruppo.
+
+    Il sito i usa il seed deriva_seed(seed_master, i) e i suoi blocchi i seed derivati da
+    quest'ultimo, come esegui_aggregato_parallelo: il risultato di ogni sito non dipende dal
+    numero di worker né dai siti che lo seguono nell'elenco. Gli aggregati sono uniti
+    nell'ordine dei blocchi, quindi anche stabilimenti e gruppo sono identici con qualunque
+    numero di worker.
+
+    Args:
+        siti (list[Sito]): stabilimenti e linee del gruppo
+        n_repliche (int): repliche per sito (la replica i del gruppo unisce le repliche i dei siti)
+        seed_master (int): seed principale
+        n_worker (int | None): numero di processi (default: numero di CPU)
+        backend (str): 'auto', 'array' o 'numpy'
+        dimensione_blocco (int): repliche per blocco
+
+    Returns:
+        dict: statistiche per sito, per stabilimento e di gruppo
+    """
+    if not siti:
+        raise Exception("Il gruppo non contiene siti")
+    nomi = [sito.nome for sito in siti]
+    if len(set(nomi)) != len(nomi):
+        raise Exception("Il gruppo contiene siti con lo stesso nome")
+
+    blocchi = suddividi_blocchi(n_repliche, dimensione_blocco)
+    seeds_siti = [deriva_seed(seed_master, indice) for indice in range(len(siti))]
+    # Ordine blocco per blocco: i risultati di un blocco arrivano consecutivi e si riducono subito
+    unita = [(sito, deriva_seed(seed_sito, indice_blocco), n)
+             for indice_blocco, n in blocchi
+             for sito, seed_sito in zip(siti, seeds_siti)]
+
+    n_worker = n_worker or os.cpu_count() or 1
+    n_worker = max(1, min(n_worker, len(unita)))
+
+    stabilimenti = {}
+    for indice, sito in enumerate(siti):
+        stabilimenti.setdefault(sito.nome_stabilimento, []).append(indice)
+
+    aggregatori_siti = [AggregatoreRepliche() for _ in siti]
+    aggregatori_stabilimenti = {nome: AggregatoreRepliche() for nome in stabilimenti}
+    aggregatore_gruppo = AggregatoreRepliche()
+
+    vettori_blocco = []
+    for posizione, (aggregato, vettori) in enumerate(_esegui_unita(unita, n_worker, backend)):
+        indice_sito = posizione % len(siti)
+        aggregatori_siti[indice_sito].unisci(aggregato)
+        vettori_blocco.append(vettori)
+        if indice_sito < len(siti) - 1:
+            continue
+
+        for nome, indici in stabilimenti.items():
+            aggregatori_stabilimenti[nome].aggiorna_colonne(riduci_blocco([vettori_blocco[i] for i in indici]))
+        aggregatore_gruppo.aggiorna_colonne(riduci_blocco(vettori_blocco))
+        vettori_blocco = []
+
+    return {
+        'n_repliche': n_repliche,
+        'n_worker': n_worker,
+        'dimensione_blocco': dimensione_blocco,
+        'siti': {
+            sito.nome: {
+                'stabilimento': sito.nome_stabilimento,
+                'capacita_totale_giornaliera': sito.capacita_totale_giornaliera,
+                'scenario': sito.scenario.nome,
+                'statistiche': aggregatore.riepilogo(),
+            }
+            for sito, aggregatore in zip(siti, aggregatori_siti)
+        },
+        'stabilimenti': {
+            nome: _riepilogo_gruppo(aggregatori_stabilimenti[nome], [aggregatori_siti[i] for i in indici])
+            for nome, indici in stabilimenti.items()
+        },
+        'gruppo': _riepilogo_gruppo(aggregatore_gruppo, aggregatori_siti),
+    }
@@ -0,0 +1,386 @@
+from array import array
+import math
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # NumPy è opzionale: senza di esso si usa il modulo array
+    np = None
+
+
+# ===============================================
+# MOTORE MONTE CARLO A COLONNE
+# ===============================================
+BACKEND_DISPONIBILI = ('array', 'numpy')
+PERCENTILI = (50, 95, 99)
+DIMENSIONE_BLOCCO = 10_000
+
+
+def risolvi_backend(backend: str) -> str:
+    """
+    Restituisce il backend effettivo da usare per il calcolo a colonne.
+    'auto' sceglie NumPy se installato, altrimenti il modulo array della libreria standard.
+    """
+    if backend == 'auto':
+        return 'numpy' if np is not None else 'array'
+
+    if backend not in BACKEND_DISPONIBILI:
+        raise Exception(f"Backend '{backend}' non supportato. Valori ammessi: auto, {', '.join(BACKEND_DISPONIBILI)}")
+
+    if backend == 'numpy' and np is None:
+        raise Exception("Backend 'numpy' richiesto ma NumPy non è installato")
+
+    return backend
+
+
+def _percentile_ordinato(ordinati, p: float) -> float:
+    """Percentile con interpolazione lineare su una sequenza già ordinata"""
+    if len(ordinati) == 1:
+        return float(ordinati[0])
+
+    posizione = (len(ordinati) - 1) * p / 100
+    inferiore = int(posizione)
+    superiore = min(inferiore + 1, len(ordinati) - 1)
+    frazione = posizione - inferiore
+
+    return float(ordinati[inferiore] + (ordinati[superiore] - ordinati[inferiore]) * frazione)
+
+
+def calcola_statistiche(valori) -> dict:
+    """
+    Calcola le statistiche di sintesi di un vettore di repliche
+
+    Args:
+        valori: sequenza di numeri (array.array, lista o array NumPy)
+
+    Returns:
+        dict: media, deviazione standard campionaria, minimo, massimo e percentili
+    """
+    n = len(valori)
+    if n == 0:
+        raise Exception("Impossibile calcolare le statistiche di un vettore vuoto")
+
+    if np is not None and isinstance(valori, np.ndarray):
+        media = float(valori.mean())
+        deviazione = float(valori.std(ddof=1)) if n > 1 else 0.0
+        percentili = np.percentile(valori, PERCENTILI)
+        statistiche = {
+            'media': media,
+            'deviazione_standard': deviazione,
+            'minimo': float(valori.min()),
+            'massimo': float(valori.max()),
+        }
+        for p, valore in zip(PERCENTILI, percentili):
+            statistiche[f'p{p}'] = float(valore)
+        return statistiche
+
+    media = math.fsum(valori) / n
+    varianza = math.fsum([(x - media) ** 2 for x in valori]) / (n - 1) if n > 1 else 0.0
+    ordinati = sorted(valori)
+
+    statistiche = {
+        'media': media,
+        'deviazione_standard': math.sqrt(varianza),
+        'minimo': float(ordinati[0]),
+        'massimo': float(ordinati[-1]),
+    }
+    for p in PERCENTILI:
+        statistiche[f'p{p}'] = _percentile_ordinato(ordinati, p)
+
+    return statistiche
+
+
+def _colonne_array(rng, n: int, piano) -> dict:
+    """
+    Genera e valuta le repliche con la sola libreria standard.
+    Ogni colonna è costruita con una list comprehension e compattata in un array.array.
+    """
+    var_tempi = piano.scenario.variabilita_tempi
+    var_capacita = piano.scenario.variabilita_capacita
+    capacita_totale = piano.capacita_totale_scenario
+
+    casuale = rng.random
+    mul = operator.mul
+    gt = operator.gt
+    add = operator.add
+    indici = range(n)
+
+    quantita = {}
+    tempi_prodotti = {}
+    superamenti = {}
+    tempo_totale = [0.0] * n
+    quantita_totale = [0] * n
+    vincoli = [True] * n
+
+    for nome, q_min, q_max, tempo_base, capacita_base in zip(piano.catalogo.nomi, piano.quantita_min,
+                                                            piano.quantita_max, piano.tempo_scenario,
+                                                            piano.capacita_scenario):
+        # Quantità: intero uniforme in [quantita_min, quantita_max]
+        ampiezza = q_max - q_min + 1
+        colonna_q = [q_min + int(casuale() * ampiezza) for _ in indici]
+
+        # Tempo unitario: tempo_scenario * (1 + U(-var_tempi, var_tempi))
+        t_min = tempo_base * (1 - var_tempi)
+        t_ampiezza = 2 * var_tempi * tempo_base
+        colonna_t = [t_min + t_ampiezza * casuale() for _ in indici]
+
+        # Capacità effettiva: int(capacita_scenario * (1 + U(-var_capacita, var_capacita)))
+        c_min = capacita_base * (1 - var_capacita)
+        c_ampiezza = 2 * var_capacita * capacita_base
+        colonna_c = [int(c_min + c_ampiezza * casuale()) for _ in indici]
+
+        colonna_minuti = list(map(mul, colonna_q, colonna_t))
+        colonna_superata = list(map(gt, colonna_q, colonna_c))
+
+        tempo_totale = list(map(add, tempo_totale, colonna_minuti))
+        quantita_totale = list(map(add, quantita_totale, colonna_q))
+        if any(colonna_superata):
+            vincoli = [v and not s for v, s in zip(vincoli, colonna_superata)]
+
+        quantita[nome] = array('q', colonna_q)
+        tempi_prodotti[nome] = array('d', [m / 60 for m in colonna_minuti])
+        superamenti[nome] = sum(colonna_superata)
+
+    cap_min = capacita_totale * (1 - var_capacita)
+    cap_ampiezza = 2 * var_capacita * capacita_totale
+    capacita_impianto = array('q', [int(cap_min + cap_ampiezza * casuale()) for _ in indici])
+
+    # Vincolo di capacità totale dell'impianto sulla somma delle quantità
+    vincoli = [v and q <= c for v, q, c in zip(vincoli, quantita_totale, capacita_impianto)]
+
+    return {
+        'quantita': quantita,
+        'tempo_produzione_ore': tempi_prodotti,
+        'superamenti': superamenti,
+        'tempo_totale_minuti': tempo_totale,
+        'vincoli_rispettati': array('b', vincoli),
+        'capacita_totale_effettiva': capacita_impianto,
+    }
+
+
+def _colonne_numpy(rng, n: int, piano) -> dict:
+    """
+    Genera e valuta le repliche con NumPy.
+    Il generatore NumPy è inizializzato da rng, quindi il risultato resta riproducibile con il seed.
+    """
+    var_tempi = piano.scenario.variabilita_tempi
+    var_capacita = piano.scenario.variabilita_capacita
+    capacita_totale = piano.capacita_totale_scenario
+
+    generatore = np.random.default_rng(rng.getrandbits(64))
+
+    quantita = {}
+    tempi_prodotti = {}
+    superamenti = {}
+    tempo_totale = np.zeros(n)
+    quantita_totale = np.zeros(n, dtype=np.int64)
+    vincoli = np.ones(n, dtype=bool)
+
+    for nome, q_min, q_max, tempo_base, capacita_base in zip(piano.catalogo.nomi, piano.quantita_min,
+                                                            piano.quantita_max, piano.tempo_scenario,
+                                                            piano.capacita_scenario):
+        colonna_q = generatore.integers(q_min, q_max + 1, size=n)
+        colonna_t = tempo_base * (1 + generatore.uniform(-var_tempi, var_tempi, size=n))
+        colonna_c = (capacita_base * (1 + generatore.uniform(-var_capacita, var_capacita, size=n))).astype(np.int64)
+
+        colonna_minuti = colonna_q * colonna_t
+        colonna_superata = colonna_q > colonna_c
+
+        tempo_totale += colonna_minuti
+        quantita_totale += colonna_q
+        vincoli &= ~colonna_superata
+
+        quantita[nome] = colonna_q
+        tempi_prodotti[nome] = colonna_minuti / 60
+        superamenti[nome] = int(colonna_superata.sum())
+
+    capacita_impianto = (capacita_totale * (1 + generatore.uniform(-var_capacita, var_capacita, size=n))).astype(np.int64)
+    vincoli &= quantita_totale <= capacita_impianto
+
+    return {
+        'quantita': quantita,
+        'tempo_produzione_ore': tempi_prodotti,
+        'superamenti': superamenti,
+        'tempo_totale_minuti': tempo_totale,
+        'vincoli_rispettati': vincoli,
+        'capacita_totale_effettiva': capacita_impianto,
+    }
+
+
+def esegui_repliche(rng, n_repliche: int, piano, backend: str = 'auto') -> dict:
+    """
+    Esegue n_repliche del modello di calcola_tempo_produzione, una colonna per grandezza
+
+    Args:
+        rng: generatore casuale (random.Random)
+        n_repliche (int): numero di repliche da generare
+        piano (PianoScenario): valori precompilati di scenario e catalogo
+        backend (str): 'auto', 'array' o 'numpy'
+
+    Returns:
+        dict: vettori per replica (valori non arrotondati) e conteggio dei superamenti per prodotto
+    """
+    ore_lavorative = piano.scenario.ore_lavorative_giorno
+
+    if n_repliche <= 0:
+        raise Exception("Il numero di repliche deve essere maggiore di zero")
+    if ore_lavorative == 0:
+        raise Exception("Impossibile calcolare il tempo totale in giorni. Le ore lavorate sono uguale a zero")
+
+    backend = risolvi_backend(backend)
+    genera = _colonne_numpy if backend == 'numpy' else _colonne_array
+    colonne = genera(rng, n_repliche, piano)
+
+    minuti = colonne.pop('tempo_totale_minuti')
+    if backend == 'numpy':
+        colonne['tempo_totale_ore'] = minuti / 60
+        colonne['tempo_totale_giorni'] = minuti / (60 * ore_lavorative)
+    else:
+        colonne['tempo_totale_ore'] = array('d', [m / 60 for m in minuti])
+        colonne['tempo_totale_giorni'] = array('d', [m / (60 * ore_lavorative) for m in minuti])
+
+    colonne['backend'] = backend
+    return colonne
+
+
+def somma_vettore(valori) -> float:
+    """Somma di un vettore, sfruttando NumPy quando il vettore è un ndarray"""
+    if np is not None and isinstance(valori, np.ndarray):
+        return float(valori.sum())
+    return float(sum(valori))
+
+
+def riepiloga_repliche(colonne: dict, n_repliche: int) -> dict:
+    """
+    Costruisce le statistiche di sintesi a partire dalle colonne di esegui_repliche
+    """
+    violazioni = n_repliche - int(somma_vettore(colonne['vincoli_rispettati']))
+
+    statistiche = {
+        'tempo_totale_ore': calcola_statistiche(colonne['tempo_totale_ore']),
+        'tempo_totale_giorni': calcola_statistiche(colonne['tempo_totale_giorni']),
+        'percentuale_vincoli_violati': violazioni / n_repliche * 100,
+        'prodotti': {},
+    }
+
+    for nome, tempi in colonne['tempo_produzione_ore'].items():
+        quantita = colonne['quantita'][nome]
+        statistiche['prodotti'][nome] = {
+            'quantita_media': somma_vettore(quantita) / n_repliche,
+            'tempo_produzione_ore': calcola_statistiche(tempi),
+            'percentuale_capacita_superata': colonne['superamenti'][nome] / n_repliche * 100,
+        }
+
+    return statistiche
+
+
+# ===============================================
+# NUMERI CASUALI COMUNI
+# ===============================================
+def genera_uniformi(rng, n: int, n_prodotti: int, backend: str = 'auto', antitetiche: bool = False) -> dict:
+    """
+    Genera le uniformi U[0, 1) che guidano quantità, tempi e capacità di n repliche.
+    Le stesse uniformi possono essere applicate a scenari diversi (numeri casuali comuni).
+    Con antitetiche=True la seconda metà delle repliche usa 1 - u della prima metà
+    (la replica i è accoppiata con la replica i + n // 2).
+
+    Returns:
+        dict: liste di colonne 'quantita', 'tempi', 'capacita' (una per prodotto),
+        colonna 'capacita_totale' dell'impianto e 'backend'
+    """
+    if antitetiche and n % 2 != 0:
+        raise Exception("Con le variabili antitetiche il numero di repliche deve essere pari")
+
+    backend = risolvi_backend(backend)
+    n_base = n // 2 if antitetiche else n
+
+    if backend == 'numpy':
+        generatore = np.random.default_rng(rng.getrandbits(64))
+
+        def colonna():
+            u = generatore.random(n_base)
+            return np.concatenate((u, 1.0 - u)) if antitetiche else u
+    else:
+        casuale = rng.random
+        indici = range(n_base)
+
+        def colonna():
+            u = array('d', [casuale() for _ in indici])
+            if antitetiche:
+                u.extend([1.0 - x for x in u])
+            return u
+
+    return {
+        'quantita': [colonna() for _ in range(n_prodotti)],
+        'tempi': [colonna() for _ in range(n_prodotti)],
+        'capacita': [colonna() for _ in range(n_prodotti)],
+        'capacita_totale': colonna(),
+        'backend': backend,
+    }
+
+
+def valuta_su_uniformi(piano, uniformi: dict, quantita: tuple | None = None) -> dict:
+    """
+    Applica le uniformi di genera_uniformi al piano di uno scenario, con lo stesso modello
+    di esegui_repliche. A parità di uniformi, scenari diversi vedono gli stessi eventi casuali.
+    Se quantita è indicata (una per prodotto, nell'ordine del catalogo) le quantità sono fisse
+    e le uniformi delle quantità sono ignorate.
+
+    Returns:
+        dict: colonne 'tempo_totale_ore' e 'vincoli_rispettati'
+    """
+    var_tempi = piano.scenario.variabilita_tempi
+    var_capacita = piano.scenario.variabilita_capacita
+    cap_min = piano.capacita_totale_scenario * (1 - var_capacita)
+    cap_ampiezza = 2 * var_capacita * piano.capacita_totale_scenario
+    righe = zip(piano.quantita_min, piano.quantita_max, piano.tempo_scenario, piano.capacita_scenario,
+                uniformi['quantita'], uniformi['tempi'], uniformi['capacita'],
+                quantita if quantita is not None else [None] * len(piano.tempo_scenario))
+
+    if uniformi['backend'] == 'numpy':
+        n = len(uniformi['quantita'][0]) if uniformi['quantita'] else 0
+        minuti = np.zeros(n)
+        quantita_totale = np.zeros(n, dtype=np.int64)
+        vincoli = np.ones(n, dtype=bool)
+        for q_min, q_max, tempo, capacita, u_q, u_t, u_c, q_fissa in righe:
+            ampiezza = q_max - q_min + 1
+            if q_fissa is not None:
+                colonna_q = np.full(n, q_fissa, dtype=np.int64)
+            else:
+                colonna_q = q_min + np.minimum((u_q * ampiezza).astype(np.int64), ampiezza - 1)
+            colonna_t = tempo * (1 - var_tempi) + 2 * var_tempi * tempo * u_t
+            colonna_c = (capacita * (1 - var_capacita) + 2 * var_capacita * capacita * u_c).astype(np.int64)
+            minuti += colonna_q * colonna_t
+            quantita_totale += colonna_q
+            vincoli &= colonna_q <= colonna_c
+        vincoli &= quantita_totale <= (cap_min + cap_ampiezza * uniformi['capacita_totale']).astype(np.int64)
+        return {'tempo_totale_ore': minuti / 60, 'vincoli_rispettati': vincoli}
+
+    n = len(uniformi['quantita'][0]) if uniformi['quantita'] else 0
+    minuti = [0.0] * n
+    quantita_totale = [0] * n
+    vincoli = [True] * n
+    for q_min, q_max, tempo, capacita, u_q, u_t, u_c, q_fissa in righe:
+        ampiezza = q_max - q_min + 1
+        ultimo = ampiezza - 1
+        if q_fissa is not None:
+            colonna_q = [q_fissa] * n
+        else:
+            # min(): con le antitetiche u può valere esattamente 1.0
+            colonna_q = [q_min + min(int(u * ampiezza), ultimo) for u in u_q]
+        t_min = tempo * (1 - var_tempi)
+        t_ampiezza = 2 * var_tempi * tempo
+        c_min = capacita * (1 - var_capacita)
+        c_ampiezza = 2 * var_capacita * capacita
+
+        minuti = [m + q * (t_min + t_ampiezza * u) for m, q, u in zip(minuti, colonna_q, u_t)]
+        quantita_totale = [t + q for t, q in zip(quantita_totale, colonna_q)]
+        vincoli = [v and q <= int(c_min + c_ampiezza * u) for v, q, u in zip(vincoli, colonna_q, u_c)]
+
+    vincoli = [v and q <= int(cap_min + cap_ampiezza * u)
+               for v, q, u in zip(vincoli, quantita_totale, uniformi['capacita_totale'])]
+
+    return {
+        'tempo_totale_ore': array('d', [m / 60 for m in minuti]),
+        'vincoli_rispettati': array('b', vincoli),
+    }
@@ -0,0 +1,199 @@
+from dataclasses import replace
+import math
+import random
+
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+from entità.monte_carlo import genera_uniformi, np, valuta_su_uniformi
+from entità.piano_scenario import compila_piano
+
+
+# ===============================================
+# DIMENSIONAMENTO DELLA CAPACITÀ
+# ===============================================
+ORE_MASSIME_TURNO = 8
+TURNI_MASSIMI = 3
+TOLLERANZA_EFFICIENZA = 0.005
+# Ore di apertura giornaliere equivalenti al costo di lavorare con efficienza 1.0 (manutenzione, personale)
+COSTO_EFFICIENZA = 16.0
+
+
+def costo_predefinito(scenario: Scenario, costo_efficienza: float = COSTO_EFFICIENZA) -> float:
+    """
+    Costo di riferimento in ore di apertura giornaliere equivalenti: ore lavorative più il costo
+    dell'efficienza degli impianti, che cresce con il suo quadrato (ogni punto in più costa più del
+    precedente); a parità di costo conviene un turno in meno.
+    Le ore necessarie decrescono circa come 1 / efficienza, quindi il livello più conveniente
+    cresce con la domanda e non è sempre il più alto tra quelli proposti.
+    """
+    return (scenario.ore_lavorative_giorno + costo_efficienza * scenario.efficienza_impianti ** 2
+            + 0.01 * scenario.turni_giorno)
+
+
+class _ValutatoreDomanda:
+    """
+    Stima la probabilità di evadere una domanda fissa entro la scadenza.
+    Tutte le valutazioni usano le stesse uniformi (numeri casuali comuni): la probabilità stimata
+    è quindi monotona nelle ore e nell'efficienza e la bisezione non è disturbata dal rumore.
+    """
+
+    def __init__(self, domanda: dict, scadenza_giorni: float, prodotti, n_repliche: int,
+                 seed: int | None, backend: str):
+        if scadenza_giorni <= 0:
+            raise Exception("La scadenza deve essere maggiore di zero")
+        if n_repliche <= 0:
+            raise Exception("Il numero di repliche deve essere maggiore di zero")
+
+        self.catalogo = CatalogoProdotti.da_prodotti(prodotti)
+        quantita = [0] * len(self.catalogo)
+        for nome, qta in domanda.items():
+            if qta < 0:
+                raise Exception(f"La domanda di '{nome}' non può essere negativa")
+            quantita[self.catalogo.indice_di(nome)] = qta
+        self.quantita = tuple(quantita)
+
+        self.scadenza_giorni = scadenza_giorni
+        self.n_repliche = n_repliche
+        self.uniformi = genera_uniformi(random.Random(seed), n_repliche, len(self.catalogo), backend)
+        self.valutazioni = 0
+        self._memoria = {}
+
+    def probabilita(self, scenario: Scenario) -> float:
+        """Frazione delle repliche in cui la domanda è evasa entro la scadenza"""
+        if scenario in self._memoria:
+            return self._memoria[scenario]
+
+        self.valutazioni += 1
+        piano = compila_piano(scenario, self.catalogo, ConfigurazioneStabilimento.capacita_totale_giornaliera)
+        ore = valuta_su_uniformi(piano, self.uniformi, self.quantita)['tempo_totale_ore']
+        limite_ore = self.scadenza_giorni * scenario.ore_lavorative_giorno
+
+        if np is not None and isinstance(ore, np.ndarray):
+            entro_scadenza = int(np.count_nonzero(ore <= limite_ore))
+        else:
+            entro_scadenza = sum(1 for x in ore if x <= limite_ore)
+
+        probabilita = entro_scadenza / self.n_repliche
+        self._memoria[scenario] = probabilita
+        return probabilita
+
+
+def _ore_minime(valutatore: _ValutatoreDomanda, base: Scenario, probabilita: float, ore_massime: int) -> int | None:
+    """Bisezione sulle ore giornaliere: la più piccola che rispetta l'obiettivo, None se nessuna basta"""
+    def fattibile(ore: int) -> bool:
+        return valutatore.probabilita(replace(base, ore_lavorative_giorno=ore)) >= probabilita
+
+    if not fattibile(ore_massime):
+        return None
+
+    basso, alto = 0, ore_massime  # basso non fattibile (0 ore), alto fattibile
+    while alto - basso > 1:
+        medio = (basso + alto) // 2
+        if fattibile(medio):
+            alto = medio
+        else:
+            basso = medio
+
+    return alto
+
+
+def ottimizza_capacita(base: Scenario | dict, domanda: dict, scadenza_giorni: float, prodotti,
+                       probabilita: float = 0.9, livelli_efficienza: list[float] | None = None,
+                       turni_massimi: int = TURNI_MASSIMI, costo=costo_predefinito,
+                       n_repliche: int = 2_000, seed: int | None = 0, backend: str = 'auto') -> dict:
+    """
+    Cerca le impostazioni di scenario più economiche che evadono la domanda entro la scadenza
+    con la probabilità richiesta
+
+    Il tempo in giorni decresce con le ore lavorative e con l'efficienza: per ogni livello di
+    efficienza le ore minime si trovano per bisezione (circa log2(ore massime) valutazioni),
+    i turni sono i minimi che contengono quelle ore e tra i candidati si sceglie quello di costo minore.
+
+    Args:
+        base (Scenario | dict): scenario da cui partire per variabilità e range
+        domanda (dict): nome prodotto -> quantità da produrre
+        scadenza_giorni (float): giorni lavorativi disponibili
+        prodotti: catalogo o lista di prodotti
+        probabilita (float): probabilità minima di rispettare la scadenza
+        livelli_efficienza (list[float] | None): efficienze da considerare (default: quella di base)
+        turni_massimi (int): turni giornalieri ammessi, da ORE_MASSIME_TURNO ore ciascuno
+        costo (callable): costo di uno scenario, crescente con le ore lavorative e con l'efficienza
+        n_repliche (int): repliche comuni a tutte le valutazioni
+        seed (int | None): seed delle repliche comuni
+        backend (str): 'auto', 'array' o 'numpy'
+
+    Returns:
+        dict: scenario migliore (None se la domanda non è evadibile), candidati e numero di valutazioni
+    """
+    if not 0 < probabilita <= 1:
+        raise Exception("La probabilità deve essere compresa tra 0 e 1")
+    if turni_massimi <= 0:
+        raise Exception("Il numero massimo di turni deve essere maggiore di zero")
+
+    base = Scenario.da_valore(base)
+    valutatore = _ValutatoreDomanda(domanda, scadenza_giorni, prodotti, n_repliche, seed, backend)
+    ore_massime = turni_massimi * ORE_MASSIME_TURNO
+
+    candidati = []
+    for efficienza in livelli_efficienza or [base.efficienza_impianti]:
+        scenario_efficienza = replace(base, efficienza_impianti=efficienza)
+        ore = _ore_minime(valutatore, scenario_efficienza, probabilita, ore_massime)
+        if ore is None:
+            continue
+
+        scenario = replace(scenario_efficienza, ore_lavorative_giorno=ore,
+                           turni_giorno=math.ceil(ore / ORE_MASSIME_TURNO))
+        candidati.append({
+            'scenario': scenario,
+            'probabilita_stimata': valutatore.probabilita(replace(scenario_efficienza, ore_lavorative_giorno=ore)),
+            'costo': costo(scenario),
+        })
+
+    migliore = min(candidati, key=lambda c: c['costo']) if candidati else None
+
+    return {
+        'fattibile': migliore is not None,
+        'scenario': migliore['scenario'] if migliore else None,
+        'probabilita_stimata': migliore['probabilita_stimata'] if migliore else None,
+        'costo': migliore['costo'] if migliore else None,
+        'candidati': candidati,
+        'valutazioni': valutatore.valutazioni,
+        'n_repliche': n_repliche,
+    }
+
+
+def efficienza_necessaria(base: Scenario | dict, domanda: dict, scadenza_giorni: float, prodotti,
+                          probabilita: float = 0.9, efficienza_minima: float = 0.1,
+                          tolleranza: float = TOLLERANZA_EFFICIENZA, n_repliche: int = 2_000,
+                          seed: int | None = 0, backend: str = 'auto') -> float | None:
+    """
+    Efficienza minima degli impianti che, con le ore e i turni di base, evade la domanda
+    entro la scadenza con la probabilità richiesta (bisezione continua fino a tolleranza)
+
+    Returns:
+        float | None: efficienza necessaria, None se anche con efficienza 1.0 non basta
+    """
+    if not 0 < efficienza_minima < 1:
+        raise Exception("L'efficienza minima deve essere compresa tra 0 e 1")
+
+    base = Scenario.da_valore(base)
+    valutatore = _ValutatoreDomanda(domanda, scadenza_giorni, prodotti, n_repliche, seed, backend)
+
+    def fattibile(efficienza: float) -> bool:
+        return valutatore.probabilita(replace(base, efficienza_impianti=efficienza)) >= probabilita
+
+    if not fattibile(1.0):
+        return None
+    if fattibile(efficienza_minima):
+        return efficienza_minima
+
+    basso, alto = efficienza_minima, 1.0
+    while alto - basso > tolleranza:
+        medio = (basso + alto) / 2
+        if fattibile(medio):
+            alto = medio
+        else:
+            basso = medio
+
+    return alto
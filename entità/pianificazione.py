@@ -0,0 +1,225 @@
+import heapq
+
+
+# ===============================================
+# PIANIFICAZIONE GIORNALIERA SOTTO VINCOLI DI CAPACITÀ
+# ===============================================
+REGOLE_PRIORITA = ('giorni', 'quantita', 'tempo', 'ordine')
+
+
+def capacita_con_ore(capacita, tempi, ore_lavorative_giorno: float) -> list[int]:
+    """
+    Capacità giornaliera di ogni prodotto limitata anche dalle unità che la sua linea lavora
+    nelle ore del giorno: min(c_i, floor(ore * 60 / t_i)). Le linee lavorano in parallelo.
+    """
+    minuti_giornata = ore_lavorative_giorno * 60
+    return [min(c, int(minuti_giornata // t)) if t > 0 else c for c, t in zip(capacita, tempi)]
+
+
+def _dati_pianificazione(quantita: dict, parametri: dict,
+                         ore_lavorative_giorno: float | None = None) -> tuple[list, list, list, list, int]:
+    """Estrae da quantità e parametri (genera_parametri_casuali) i vettori usati dal pianificatore"""
+    nomi = list(quantita)
+    residui = [quantita[nome] for nome in nomi]
+    capacita = [parametri[nome]['capacita_giornaliera_effettiva'] for nome in nomi]
+    tempi = [parametri[nome]['tempo_produzione_unitario'] for nome in nomi]
+    if ore_lavorative_giorno is not None:
+        capacita = capacita_con_ore(capacita, tempi, ore_lavorative_giorno)
+    capacita_totale = parametri['capacita_totale_effettiva']
+
+    if capacita_totale <= 0 and any(q > 0 for q in residui):
+        raise Exception("Impossibile pianificare la produzione. La capacità totale dell'impianto è uguale a zero")
+    for nome, q, c in zip(nomi, residui, capacita):
+        if q < 0:
+            raise Exception(f"La quantità di '{nome}' non può essere negativa")
+        if q > 0 and c <= 0:
+            raise Exception(f"Impossibile pianificare '{nome}'. La capacità giornaliera è uguale a zero")
+
+    return nomi, residui, capacita, tempi, capacita_totale
+
+
+def giorni_minimi(quantita, capacita, capacita_totale: int) -> int:
+    """
+    Numero minimo di giorni per produrre le quantità con capacità giornaliere per prodotto
+    e capacità totale dell'impianto: max(max_i ceil(q_i / c_i), ceil(sum(q) / C)).
+    È sempre raggiungibile (vedi pianifica_produzione con esatta=True) e costa O(n).
+    Solleva un'eccezione se un prodotto da produrre ha capacità giornaliera nulla.
+    """
+    giorni = -(-sum(quantita) // capacita_totale) if capacita_totale > 0 else 0
+    for q, c in zip(quantita, capacita):
+        if q > 0:
+            if c <= 0:
+                raise Exception("Impossibile completare la produzione. Una capacità giornaliera è uguale a zero")
+            giorni = max(giorni, -(-q // c))
+    return giorni
+
+
+def ordina_per_priorita(regola: str, residui: list, capacita: list, tempi: list) -> list[int]:
+    """
+    Indici dei prodotti nell'ordine di priorità della regola (ordinamento O(n log n)).
+    I prodotti senza capacità nel giorno (es. linea ferma per tutta la giornata) sono esclusi:
+    il loro residuo resta invariato.
+    """
+    indici = [i for i, (q, c) in enumerate(zip(residui, capacita)) if q > 0 and c > 0]
+    if regola == 'giorni':
+        # Prima i prodotti che richiedono più giorni con la sola capacità propria
+        indici.sort(key=lambda i: -(-residui[i] // capacita[i]), reverse=True)
+    elif regola == 'quantita':
+        indici.sort(key=lambda i: residui[i], reverse=True)
+    elif regola == 'tempo':
+        indici.sort(key=lambda i: tempi[i])
+    elif regola != 'ordine':
+        raise Exception(f"Regola di priorità '{regola}' non supportata. Valori ammessi: {', '.join(REGOLE_PRIORITA)}")
+    return indici
+
+
+def assegna_giorno(residui: list, capacita: list, capacita_totale: int, ordine) -> dict[int, int]:
+    """
+    Produzione di un giorno: la capacità dell'impianto è assegnata ai prodotti nell'ordine
+    di priorità, ciascuno fino alla propria capacità giornaliera. Aggiorna residui.
+
+    Returns:
+        dict: indice del prodotto -> quantità prodotta, per i soli prodotti considerati
+    """
+    giorno = {}
+    disponibile = capacita_totale
+    for i in ordine:
+        if disponibile <= 0:
+            break
+        assegnato = min(residui[i], capacita[i], disponibile)
+        giorno[i] = assegnato
+        residui[i] -= assegnato
+        disponibile -= assegnato
+
+    return giorno
+
+
+def _pianifica_greedy(residui: list, capacita: list, capacita_totale: int, ordine: list[int]) -> list[dict]:
+    """
+    Ogni giorno assegna la capacità dell'impianto ai prodotti nell'ordine di priorità,
+    ciascuno fino alla propria capacità giornaliera
+    """
+    giorni = []
+    attivi = ordine
+    while attivi:
+        giorno = assegna_giorno(residui, capacita, capacita_totale, attivi)
+        toccati = len(giorno)
+
+        # Solo i prodotti toccati possono essere terminati: il resto della lista è invariato
+        attivi = [i for i in attivi[:toccati] if residui[i] > 0] + attivi[toccati:]
+        giorni.append(giorno)
+
+    return giorni
+
+
+def _pianifica_esatta(residui: list, capacita: list, capacita_totale: int, ordine: list[int]) -> list[dict]:
+    """
+    Pianificazione in giorni_minimi giorni. Ogni giorno un prodotto produce almeno la quota
+    obbligatoria max(0, residuo - giorni_rimanenti * capacità), che mantiene fattibile il resto
+    del piano; la capacità dell'impianto rimasta è poi assegnata per priorità.
+    Un prodotto diventa critico (quota obbligatoria > 0) dal giorno D - ceil(residuo / capacità):
+    una coda a priorità lo segnala al momento giusto senza ricontrollare tutti i prodotti ogni giorno.
+    """
+    n_giorni = giorni_minimi(residui, capacita, capacita_totale)
+
+    def giorno_critico(i: int) -> int:
+        return n_giorni - -(-residui[i] // capacita[i])
+
+    coda = [(giorno_critico(i), i) for i in ordine]
+    heapq.heapify(coda)
+    critici = set()
+
+    giorni = []
+    attivi = ordine
+    for d in range(n_giorni):
+        rimanenti = n_giorni - d - 1
+        while coda and coda[0][0] <= d:
+            chiave, i = heapq.heappop(coda)
+            if residui[i] > 0 and chiave == giorno_critico(i):
+                critici.add(i)
+
+        giorno = {}
+        disponibile = capacita_totale
+        for i in list(critici):
+            obbligatoria = residui[i] - rimanenti * capacita[i]
+            if obbligatoria > 0:
+                giorno[i] = obbligatoria
+                residui[i] -= obbligatoria
+                disponibile -= obbligatoria
+            else:
+                # Anticipato nei giorni precedenti: torna in coda con il nuovo giorno critico
+                critici.discard(i)
+                heapq.heappush(coda, (giorno_critico(i), i))
+
+        toccati = 0
+        for i in attivi:
+            if disponibile == 0:
+                break
+            toccati += 1
+            assegnato = min(residui[i], capacita[i] - giorno.get(i, 0), disponibile)
+            if assegnato <= 0:
+                continue
+            giorno[i] = giorno.get(i, 0) + assegnato
+            residui[i] -= assegnato
+            disponibile -= assegnato
+            if i not in critici:
+                heapq.heappush(coda, (giorno_critico(i), i))
+
+        terminati_critici = [i for i in critici if residui[i] == 0]
+        if terminati_critici:
+            critici.difference_update(terminati_critici)
+            attivi = [i for i in attivi if residui[i] > 0]
+        else:
+            attivi = [i for i in attivi[:toccati] if residui[i] > 0] + attivi[toccati:]
+        giorni.append(giorno)
+
+    return giorni
+
+
+def pianifica_produzione(quantita: dict, parametri: dict, regola: str = 'giorni', esatta: bool = False,
+                         ore_lavorative_giorno: float | None = None) -> dict:
+    """
+    Distribuisce la produzione sui giorni rispettando sia la capacità giornaliera di ogni prodotto
+    sia la capacità totale dell'impianto (capacita_totale_effettiva). Con ore_lavorative_giorno
+    la capacità di ogni prodotto è limitata anche dalle sue ore di lavoro (vedi capacita_con_ore).
+
+    Il modo greedy assegna ogni giorno la capacità dell'impianto per priorità; il modo esatto
+    termina sempre nel numero minimo di giorni (giorni_minimi). L'ordinamento iniziale costa
+    O(n log n), il resto è proporzionale al numero di assegnazioni del piano.
+
+    Args:
+        quantita (dict): quantità da produrre per ogni prodotto
+        parametri (dict): parametri operativi di genera_parametri_casuali
+        regola (str): priorità tra i prodotti: 'giorni', 'quantita', 'tempo' o 'ordine'
+        esatta (bool): usa la pianificazione in numero minimo di giorni
+        ore_lavorative_giorno (float | None): ore lavorative giornaliere di ogni linea (None: nessun limite)
+
+    Returns:
+        dict: piano giorno per giorno, giorno di completamento e utilizzo dell'impianto
+    """
+    nomi, residui, capacita, tempi, capacita_totale = _dati_pianificazione(quantita, parametri, ore_lavorative_giorno)
+    minimo = giorni_minimi(residui, capacita, capacita_totale)
+    ordine = ordina_per_priorita(regola, residui, capacita, tempi)
+
+    if esatta:
+        giorni = _pianifica_esatta(residui, capacita, capacita_totale, ordine)
+    else:
+        giorni = _pianifica_greedy(residui, capacita, capacita_totale, ordine)
+
+    piano = []
+    for giorno in giorni:
+        prodotti = {nomi[i]: q for i, q in sorted(giorno.items()) if q > 0}
+        totale = sum(prodotti.values())
+        piano.append({
+            'prodotti': prodotti,
+            'quantita_totale': totale,
+            'utilizzo_impianto_percentuale': round(totale / capacita_totale * 100, 1),
+        })
+
+    return {
+        'regola': regola,
+        'esatta': esatta,
+        'giorno_completamento': len(piano),
+        'giorni_minimi': minimo,
+        'piano_giornaliero': piano,
+    }
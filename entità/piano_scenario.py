@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+
+
+# ===============================================
+# PIANI DI SCENARIO PRECOMPILATI
+# ===============================================
+DIMENSIONE_CACHE_PIANI = 128
+
+
+@dataclass(frozen=True, slots=True)
+class PianoScenario:
+    """
+    Valori derivati di una coppia (scenario, catalogo prodotti), calcolati una sola volta.
+    È immutabile: più simulatori possono condividerlo senza sovrascriversi a vicenda.
+    Tutti i vettori sono tuple allineate alla posizione del prodotto nel catalogo.
+    """
+    chiave: str
+    scenario: Scenario
+    catalogo: CatalogoProdotti
+    capacita_scenario: tuple[int, ...]
+    tempo_scenario: tuple[float, ...]
+    quantita_min: tuple[int, ...]
+    quantita_max: tuple[int, ...]
+    capacita_totale_scenario: float
+
+
+def impronta_scenario(scenario: Scenario) -> str:
+    """Hash del contenuto di uno scenario"""
+    return hashlib.sha256(repr(scenario).encode()).hexdigest()
+
+
+def chiave_piano(scenario: Scenario, catalogo: CatalogoProdotti, capacita_totale: int) -> str:
+    """Hash del contenuto della configurazione da cui dipende un piano"""
+    testo = f"{impronta_scenario(scenario)}:{catalogo.impronta}:{capacita_totale}"
+    return hashlib.sha256(testo.encode()).hexdigest()
+
+
+@lru_cache(maxsize=DIMENSIONE_CACHE_PIANI)
+def _compila(scenario: Scenario, catalogo: CatalogoProdotti, capacita_totale: int) -> PianoScenario:
+    """
+    Calcola il piano. Scenario e catalogo sono confrontati per contenuto
+    (il catalogo usa la propria impronta), quindi configurazioni uguali condividono la voce in cache.
+    """
+    efficienza = scenario.efficienza_impianti
+
+    if efficienza == 0:
+        raise Exception("Impossibile calcolare il 'tempo necessario di produzione' \
+                        perchè per lo scenario in questione, l'efficienza è uguale a zero")
+
+    # Riduce capacità e aumenta tempi se efficienza < 1.0
+    capacita_scenario = tuple(int(c * efficienza) for c in catalogo.capacita_max)
+    tempo_scenario = tuple(t / efficienza for t in catalogo.tempi_base)
+
+    range_min, range_max = scenario.range_quantita
+    quantita_min = tuple(int(c * range_min) for c in capacita_scenario)
+    quantita_max = tuple(int(c * range_max) for c in capacita_scenario)
+
+    return PianoScenario(
+        chiave=chiave_piano(scenario, catalogo, capacita_totale),
+        scenario=scenario,
+        catalogo=catalogo,
+        capacita_scenario=capacita_scenario,
+        tempo_scenario=tempo_scenario,
+        quantita_min=quantita_min,
+        quantita_max=quantita_max,
+        capacita_totale_scenario=capacita_totale * efficienza,
+    )
+
+
+def compila_piano(scenario: Scenario | dict, prodotti, capacita_totale: int) -> PianoScenario:
+    """
+    Restituisce il piano precompilato per scenario e prodotti, dalla cache LRU se già calcolato
+
+    Args:
+        scenario (Scenario | dict): scenario produttivo
+        prodotti: catalogo o lista di prodotti
+        capacita_totale (int): capacità totale giornaliera dell'impianto
+
+    Returns:
+        PianoScenario: valori derivati condivisibili tra simulatori
+    """
+    return _compila(Scenario.da_valore(scenario), CatalogoProdotti.da_prodotti(prodotti), capacita_totale)
+
+
+def info_cache_piani():
+    """Statistiche della cache dei piani (hits, misses, dimensione)"""
+    return _compila.cache_info()
+
+
+def svuota_cache_piani() -> None:
+    """Svuota la cache dei piani"""
+    _compila.cache_clear()
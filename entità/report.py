@@ -0,0 +1,256 @@
+import csv
+import heapq
+import io
+import json
+import sys
+
+
+# ===============================================
+# REPORT DEI RISULTATI
+# ===============================================
+# Il report è costruito in due passi: dati_report estrae dai risultati una struttura con le sole righe
+# da mostrare, i renderer la trasformano in testo, JSON o CSV in un'unica stringa e scrivi_report la
+# scrive con una sola operazione di I/O. Con i livelli 'primi' e 'sintesi' il testo prodotto ha
+# dimensione costante, qualunque sia il numero di prodotti del catalogo.
+LIVELLI = ('completo', 'primi', 'sintesi')
+FORMATI = ('testo', 'json', 'csv')
+# Criterio di ordinamento del livello 'primi' -> campo dei dettagli per prodotto
+CRITERI = {'capacita': 'capacita_utilizzata_percentuale', 'tempo': 'tempo_produzione_ore'}
+PRIMI_DEFAULT = 10
+
+COLONNE_PRODOTTO = ('nome', 'quantita', 'unita_misura', 'tempo_produzione_unitario', 'capacita_giornaliera_effettiva',
+                    'tempo_produzione_ore', 'capacita_utilizzata_percentuale', 'capacita_superata',
+                    'guasti', 'minuti_fermo')
+
+
+def formatta_hms(ore:float) -> str:
+    """
+    Converte un valore in ore (float) nel formato "Hh Mm Ss".
+    Gestisce arrotondamenti e carry-over (es. 59.6s -> 60s -> +1m).
+    """
+
+    total_seconds = int(round(ore*3600))
+    h = total_seconds // 3600
+    m = (total_seconds % 3600) // 60
+    s = total_seconds % 60
+
+    return f"{h}h {m}m {s}s"
+
+
+def _riga_prodotto(dettaglio: dict, parametri: dict) -> dict:
+    """Riga del report per un prodotto, dai dettagli di calcola_tempo_produzione e dai suoi parametri"""
+    param = parametri[dettaglio['nome']]
+    riga = {
+        'nome': dettaglio['nome'],
+        'quantita': dettaglio['quantita'],
+        'unita_misura': dettaglio['unita_misura'],
+        'tempo_produzione_unitario': param['tempo_produzione_unitario'],
+        'capacita_giornaliera_effettiva': param['capacita_giornaliera_effettiva'],
+        'tempo_produzione_ore': dettaglio['tempo_produzione_ore'],
+        'capacita_utilizzata_percentuale': dettaglio['capacita_utilizzata_percentuale'],
+        'capacita_superata': dettaglio['capacita_superata'],
+    }
+    if 'guasti' in param:
+        riga['guasti'] = param['guasti']
+        riga['minuti_fermo'] = param['minuti_fermo']
+    return riga
+
+
+def dati_report(quantita: dict, parametri: dict, risultati: dict, ore_lavorative_giorno: int,
+                livello: str = 'completo', primi: int = PRIMI_DEFAULT, criterio: str = 'capacita') -> dict:
+    """
+    Struttura del report di una simulazione, da passare a un renderer
+
+    Args:
+        quantita (dict): quantità da produrre per prodotto
+        parametri (dict): parametri operativi della simulazione
+        risultati (dict): risultati di calcola_tempo_produzione
+        ore_lavorative_giorno (int): ore lavorative dello scenario
+        livello (str): 'completo' (tutti i prodotti), 'primi' (i primi N per criterio) o 'sintesi' (solo totali)
+        primi (int): numero di prodotti del livello 'primi'
+        criterio (str): 'capacita' (capacità utilizzata) o 'tempo' (tempo di produzione)
+
+    Returns:
+        dict: totali, avvisi e righe dei soli prodotti da mostrare
+    """
+    if livello not in LIVELLI:
+        raise Exception(f"Livello '{livello}' non supportato. Livelli: {', '.join(LIVELLI)}")
+    if criterio not in CRITERI:
+        raise Exception(f"Criterio '{criterio}' non supportato. Criteri: {', '.join(CRITERI)}")
+    if primi < 1:
+        raise Exception("Il numero di prodotti da mostrare deve essere almeno 1")
+
+    dettagli = risultati['dettagli_prodotti']
+    if livello == 'completo':
+        mostrati = dettagli.values()
+    elif livello == 'primi':
+        campo = CRITERI[criterio]
+        mostrati = heapq.nlargest(primi, dettagli.values(), key=lambda dettaglio: dettaglio[campo])
+    else:
+        mostrati = ()
+
+    dati = {
+        'livello': livello,
+        'prodotti_totali': len(dettagli),
+        'prodotti_capacita_superata': sum(1 for dettaglio in dettagli.values() if dettaglio['capacita_superata']),
+        'quantita_totale': sum(quantita.values()),
+        'capacita_totale_effettiva': parametri['capacita_totale_effettiva'],
+        'tempo_totale_ore': risultati['tempo_totale_ore'],
+        'tempo_totale_giorni': risultati['tempo_totale_giorni'],
+        'ore_lavorative_giorno': ore_lavorative_giorno,
+        'giorni_completamento': risultati.get('giorni_completamento'),
+        'capacita_totale_superata': bool(risultati.get('capacita_totale_superata')),
+        'vincoli_rispettati': risultati['vincoli_rispettati'],
+        'prodotti': [_riga_prodotto(dettaglio, parametri) for dettaglio in mostrati],
+    }
+    if livello == 'primi':
+        dati['criterio'] = criterio
+    if 'minuti_cambio_formato' in parametri:
+        dati['minuti_cambio_formato'] = parametri['minuti_cambio_formato']
+    guasti = [parametri[nome]['guasti'] for nome in dettagli if 'guasti' in parametri[nome]]
+    if guasti:
+        dati['guasti_totali'] = sum(guasti)
+
+    return dati
+
+
+# ===============================================
+# RENDERER
+# ===============================================
+def _righe_testo(dati: dict) -> list[str]:
+    """Righe di testo di un report; il livello 'completo' riproduce il formato storico di stampa_risultati"""
+    righe = []
+    if 'replica' in dati:
+        righe.append(f"=== REPLICA {dati['replica']} ===")
+
+    livello = dati['livello']
+    if livello != 'completo':
+        righe.append("RIEPILOGO:")
+        righe.append(f"  - Prodotti: {dati['prodotti_totali']:,} "
+                     f"({dati['prodotti_capacita_superata']:,} con capacita superata)")
+        righe.append(f"  - Quantita totale: {dati['quantita_totale']:,} unita")
+        righe.append(f"  - Capacita Totale Impianto: {dati['capacita_totale_effettiva']:,} unita/giorno")
+        if 'guasti_totali' in dati:
+            righe.append(f"  - Guasti: {dati['guasti_totali']:,}")
+        if 'minuti_cambio_formato' in dati:
+            righe.append(f"  - Cambi formato: {formatta_hms(dati['minuti_cambio_formato'] / 60)}")
+        righe.append("")
+
+    prodotti = dati['prodotti']
+    if livello != 'sintesi':
+        if livello == 'primi':
+            righe.append(f"PRIMI {len(prodotti)} DI {dati['prodotti_totali']:,} PRODOTTI "
+                         f"PER {'CAPACITA UTILIZZATA' if dati['criterio'] == 'capacita' else 'TEMPO DI PRODUZIONE'}")
+            righe.append("")
+
+        righe.append("QUANTITA DA PRODURRE (generate casualmente):")
+        for riga in prodotti:
+            righe.append(f"  - {riga['nome']}: {riga['quantita']:,} {riga['unita_misura']}")
+
+        righe.append("\nPARAMETRI OPERATIVI (generati casualmente):")
+        for riga in prodotti:
+            unita = riga['unita_misura']
+            righe.append(f"  - {riga['nome']}: {riga['tempo_produzione_unitario']} min/{unita}, "
+                         f"Capacita: {riga['capacita_giornaliera_effettiva']:,} {unita}/giorno")
+            if 'guasti' in riga:
+                righe.append(f"    Guasti: {riga['guasti']}, fermo {formatta_hms(riga['minuti_fermo'] / 60)}")
+        if livello == 'completo':
+            righe.append(f"  - Capacita Totale Impianto: {dati['capacita_totale_effettiva']:,} unita/giorno")
+            if 'minuti_cambio_formato' in dati:
+                righe.append(f"  - Cambi formato: {formatta_hms(dati['minuti_cambio_formato'] / 60)}")
+
+        righe.append("\nRISULTATI PRODUZIONE:")
+        for riga in prodotti:
+            righe.append(f"  - {riga['nome']}:")
+            righe.append(f"    Quantita: {riga['quantita']:,} {riga['unita_misura']}")
+            righe.append(f"    Tempo produzione: {formatta_hms(riga['tempo_produzione_ore'])}")
+            righe.append(f"    Capacita utilizzata: {riga['capacita_utilizzata_percentuale']}%")
+            if riga['capacita_superata']:
+                righe.append("    ATTENZIONE: Capacita superata!")
+        if len(prodotti) < dati['prodotti_totali']:
+            righe.append(f"  ... altri {dati['prodotti_totali'] - len(prodotti):,} prodotti")
+        righe.append("")
+
+    righe.append("TEMPO TOTALE PRODUZIONE:")
+    righe.append(f"  - {formatta_hms(dati['tempo_totale_ore'])} ")
+    righe.append(f"  - {dati['tempo_totale_giorni']} giorni lavorativi ({dati['ore_lavorative_giorno']}h/giorno, un prodotto alla volta)")
+    giorni = dati['giorni_completamento']
+    if giorni is not None:
+        righe.append(f"  - Completamento in {giorni} {'giorno' if giorni == 1 else 'giorni'} con le linee in parallelo "
+                     f"({dati['ore_lavorative_giorno']}h/giorno per linea, limiti di capacita giornaliera)")
+
+    if dati['capacita_totale_superata']:
+        righe.append("\nATTENZIONE: Capacita totale dell'impianto superata!")
+
+    if not dati['vincoli_rispettati']:
+        righe.append("\nAVVISO: Alcuni vincoli di capacita non sono stati rispettati!")
+    else:
+        righe.append("\nTutti i vincoli di capacita sono stati rispettati")
+
+    return righe
+
+
+def rendi_testo(dati: dict | list[dict]) -> str:
+    """Report in testo leggibile; più report (una serie di esecuzioni) sono separati da una riga vuota"""
+    if isinstance(dati, dict):
+        dati = [dati]
+    righe = []
+    for indice, report in enumerate(dati):
+        if indice:
+            righe.append("")
+        righe.extend(_righe_testo(report))
+    righe.append("")
+    return '\n'.join(righe)
+
+
+def rendi_json(dati: dict | list[dict]) -> str:
+    """Report in JSON: un oggetto per un report, una lista per una serie"""
+    return json.dumps(dati, ensure_ascii=False, indent=2) + '\n'
+
+
+def rendi_csv(dati: dict | list[dict]) -> str:
+    """
+    Report in CSV: una riga per prodotto mostrato e una riga TOTALE per report.
+    Nella riga TOTALE quantita e tempo_produzione_ore sono i totali, capacita_superata indica
+    il superamento della capacità dell'impianto e guasti il totale dei guasti.
+    """
+    if isinstance(dati, dict):
+        dati = [dati]
+    serie = any('replica' in report for report in dati)
+    colonne = (('replica',) if serie else ()) + COLONNE_PRODOTTO
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=colonne, lineterminator='\n')
+    writer.writeheader()
+    for report in dati:
+        replica = {'replica': report.get('replica')} if serie else {}
+        for riga in report['prodotti']:
+            writer.writerow({**replica, **riga, 'capacita_superata': int(riga['capacita_superata'])})
+        writer.writerow({
+            **replica,
+            'nome': 'TOTALE',
+            'quantita': report['quantita_totale'],
+            'capacita_giornaliera_effettiva': report['capacita_totale_effettiva'],
+            'tempo_produzione_ore': report['tempo_totale_ore'],
+            'capacita_superata': int(report['capacita_totale_superata']),
+            'guasti': report.get('guasti_totali'),
+            'minuti_fermo': None,
+        })
+    return buffer.getvalue()
+
+
+RENDERER = {'testo': rendi_testo, 'json': rendi_json, 'csv': rendi_csv}
+
+
+def rendi_report(dati: dict | list[dict], formato: str = 'testo') -> str:
+    """Rende uno o più report (vedi dati_report) nel formato richiesto"""
+    if formato not in RENDERER:
+        raise Exception(f"Formato '{formato}' non supportato. Formati: {', '.join(FORMATI)}")
+    return RENDERER[formato](dati)
+
+
+def scrivi_report(testo: str, destinazione=None) -> None:
+    """Scrive il report già reso con una sola operazione di scrittura (default: stdout)"""
+    destinazione = destinazione if destinazione is not None else sys.stdout
+    destinazione.write(testo)
+    destinazione.flush()
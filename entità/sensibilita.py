@@ -0,0 +1,421 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+import math
+import os
+import random
+
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+from entità.esecuzione_parallela import deriva_seed
+from entità.esperimenti import applica_valori
+from entità.monte_carlo import genera_uniformi, np, valuta_su_uniformi
+from entità.piano_scenario import compila_piano
+
+
+# ===============================================
+# ANALISI DI SENSIBILITÀ GLOBALE
+# ===============================================
+# Ogni metodo costruisce in anticipo i propri punti nel cubo unitario dei fattori; i punti di
+# tutti i metodi richiesti sono valutati insieme, una volta sola ciascuno, su un pool di processi.
+# Ogni valutazione applica le stesse uniformi (numeri casuali comuni) al piano del punto: l'uscita
+# è una funzione deterministica dei fattori e le differenze tra punti non contengono rumore Monte Carlo.
+FATTORI_SCENARIO = ('efficienza_impianti', 'variabilita_tempi', 'variabilita_capacita',
+                    'range_quantita_min', 'range_quantita_max', 'ore_lavorative_giorno')
+PREFISSO_TEMPO_BASE = 'tempo_base_produzione:'
+USCITE = ('tempo_totale_ore', 'tempo_totale_giorni', 'percentuale_vincoli_violati')
+METODI = ('oat', 'morris', 'sobol')
+
+AMPIEZZA_DEFAULT = 0.2       # intervalli predefiniti: ±20% attorno al valore dello scenario
+REPLICHE_DEFAULT = 2_000
+CAMPIONI_SOBOL = 256
+TRAIETTORIE_MORRIS = 20
+LIVELLI_MORRIS = 4
+RICAMPIONAMENTI = 100        # bootstrap degli indici di Sobol
+PUNTI_PER_TASK = 64
+
+
+def fattori_disponibili(prodotti) -> tuple[str, ...]:
+    """Campi dello scenario e tempi base dei prodotti (tempo_base_produzione:<nome>) analizzabili"""
+    catalogo = CatalogoProdotti.da_prodotti(prodotti)
+    return FATTORI_SCENARIO + tuple(f"{PREFISSO_TEMPO_BASE}{nome}" for nome in catalogo.nomi)
+
+
+def intervalli_predefiniti(base: Scenario | dict, prodotti, uscita: str = 'tempo_totale_ore',
+                           ampiezza: float = AMPIEZZA_DEFAULT) -> dict[str, tuple[float, float]]:
+    """
+    Intervalli di ±ampiezza (relativa) attorno ai valori dello scenario e dei prodotti.
+    L'efficienza non supera 1.0; le ore lavorative sono incluse solo se l'uscita è in giorni,
+    perché non influiscono sulle altre uscite.
+    """
+    base = Scenario.da_valore(base)
+    catalogo = CatalogoProdotti.da_prodotti(prodotti)
+    if not 0 < ampiezza < 1:
+        raise Exception("L'ampiezza degli intervalli deve essere compresa tra 0 e 1")
+
+    def attorno(valore: float) -> tuple[float, float]:
+        return valore * (1 - ampiezza), valore * (1 + ampiezza)
+
+    minimo, massimo = base.range_quantita
+    intervalli = {
+        'efficienza_impianti': (base.efficienza_impianti * (1 - ampiezza),
+                                min(1.0, base.efficienza_impianti * (1 + ampiezza))),
+        'variabilita_tempi': attorno(base.variabilita_tempi),
+        'variabilita_capacita': attorno(base.variabilita_capacita),
+        'range_quantita_min': attorno(minimo),
+        'range_quantita_max': attorno(massimo),
+    }
+    if uscita == 'tempo_totale_giorni':
+        intervalli['ore_lavorative_giorno'] = attorno(base.ore_lavorative_giorno)
+    for prodotto in catalogo:
+        intervalli[f"{PREFISSO_TEMPO_BASE}{prodotto.nome}"] = attorno(prodotto.tempo_base_produzione)
+
+    return intervalli
+
+
+def _verifica_intervalli(intervalli: dict, catalogo: CatalogoProdotti, base: Scenario) -> None:
+    if not intervalli:
+        raise Exception("Nessun fattore da analizzare")
+
+    disponibili = fattori_disponibili(catalogo)
+    for fattore, (minimo, massimo) in intervalli.items():
+        if fattore not in disponibili:
+            raise Exception(f"Fattore '{fattore}' non analizzabile. Fattori disponibili: {', '.join(disponibili)}")
+        if minimo > massimo:
+            raise Exception(f"Intervallo di '{fattore}' non valido: minimo maggiore del massimo")
+    if intervalli.get('efficienza_impianti', (1, 1))[0] <= 0:
+        raise Exception("L'efficienza degli impianti deve restare maggiore di zero")
+    if intervalli.get('ore_lavorative_giorno', (1, 1))[0] < 1:
+        raise Exception("Le ore lavorative devono restare almeno 1")
+
+    # range_quantita deve restare ordinato in ogni punto del cubo
+    minimo_massimo = intervalli.get('range_quantita_min', (base.range_quantita[0],) * 2)[1]
+    massimo_minimo = intervalli.get('range_quantita_max', (base.range_quantita[1],) * 2)[0]
+    if minimo_massimo > massimo_minimo:
+        raise Exception("Gli intervalli di range_quantita_min e range_quantita_max si sovrappongono")
+
+
+class _Modello:
+    """
+    Uscita dello scenario in funzione dei fattori, valutata sulle stesse uniformi per ogni punto.
+    Le uniformi non viaggiano verso i worker: ognuno le rigenera dal seed alla prima valutazione.
+    """
+
+    def __init__(self, base: Scenario, catalogo: CatalogoProdotti, intervalli: dict, uscita: str,
+                 n_repliche: int, seed: int, backend: str, capacita_totale: int):
+        self.base = base
+        self.catalogo = catalogo
+        self.intervalli = intervalli
+        self.uscita = uscita
+        self.n_repliche = n_repliche
+        self.seed = seed
+        self.backend = backend
+        self.capacita_totale = capacita_totale
+        self._uniformi = None
+
+    def __getstate__(self) -> dict:
+        stato = dict(self.__dict__)
+        stato['_uniformi'] = None
+        return stato
+
+    def __setstate__(self, stato: dict) -> None:
+        self.__dict__.update(stato)
+
+    def configurazione(self, punto: tuple) -> tuple[Scenario, CatalogoProdotti]:
+        """Scenario e catalogo corrispondenti a un punto del cubo unitario"""
+        valori_scenario = {}
+        tempi_base = {}
+        for (fattore, (minimo, massimo)), u in zip(self.intervalli.items(), punto):
+            valore = minimo + (massimo - minimo) * u
+            if fattore.startswith(PREFISSO_TEMPO_BASE):
+                tempi_base[fattore[len(PREFISSO_TEMPO_BASE):]] = valore
+            elif fattore == 'ore_lavorative_giorno':
+                valori_scenario[fattore] = int(round(valore))
+            else:
+                valori_scenario[fattore] = valore
+
+        scenario = applica_valori(self.base, valori_scenario) if valori_scenario else self.base
+        catalogo = self.catalogo
+        if tempi_base:
+            catalogo = CatalogoProdotti([replace(p, tempo_base_produzione=tempi_base[p.nome]) if p.nome in tempi_base
+                                         else p for p in catalogo])
+        return scenario, catalogo
+
+    def valuta(self, punto: tuple) -> float:
+        if self._uniformi is None:
+            self._uniformi = genera_uniformi(random.Random(self.seed), self.n_repliche, len(self.catalogo),
+                                             self.backend)
+
+        scenario, catalogo = self.configurazione(punto)
+        colonne = valuta_su_uniformi(compila_piano(scenario, catalogo, self.capacita_totale), self._uniformi)
+
+        if self.uscita == 'percentuale_vincoli_violati':
+            vincoli = colonne['vincoli_rispettati']
+            rispettati = int(np.count_nonzero(vincoli)) if self._uniformi['backend'] == 'numpy' else sum(vincoli)
+            return (self.n_repliche - rispettati) / self.n_repliche * 100
+
+        ore = colonne['tempo_totale_ore']
+        media = float(ore.mean()) if self._uniformi['backend'] == 'numpy' else math.fsum(ore) / self.n_repliche
+        if self.uscita == 'tempo_totale_giorni':
+            return media / scenario.ore_lavorative_giorno
+        return media
+
+
+def _valuta_gruppo(modello: _Modello, punti: list[tuple]) -> list[float]:
+    return [modello.valuta(punto) for punto in punti]
+
+
+def _valuta_punti(modello: _Modello, punti: list[tuple], n_worker: int | None) -> list[float]:
+    """Valuta i punti (già senza duplicati) a gruppi di PUNTI_PER_TASK, in processo o su un pool"""
+    gruppi = [punti[i:i + PUNTI_PER_TASK] for i in range(0, len(punti), PUNTI_PER_TASK)]
+    n_worker = max(1, min(n_worker or os.cpu_count() or 1, len(gruppi)))
+
+    if n_worker == 1:
+        return _valuta_gruppo(modello, punti)
+
+    uscite = []
+    with ProcessPoolExecutor(max_workers=n_worker) as executor:
+        try:
+            for risultati in executor.map(_valuta_gruppo, [modello] * len(gruppi), gruppi):
+                uscite.extend(risultati)
+        finally:
+            executor.shutdown(cancel_futures=True)
+    return uscite
+
+
+# ===============================================
+# PIANI DEI METODI
+# ===============================================
+def _piano_oat(k: int) -> list[tuple]:
+    """Punto centrale, poi ogni fattore al minimo e al massimo con gli altri al centro"""
+    centro = (0.5,) * k
+    punti = [centro]
+    for i in range(k):
+        for estremo in (0.0, 1.0):
+            punti.append(centro[:i] + (estremo,) + centro[i + 1:])
+    return punti
+
+
+def _piano_morris(k: int, n_traiettorie: int, livelli: int, rng: random.Random) -> tuple[list[tuple], list[list[int]]]:
+    """
+    Traiettorie di Morris su una griglia di 'livelli' valori: ogni traiettoria parte da un punto
+    della griglia e sposta un fattore alla volta di delta, in ordine casuale (k + 1 punti)
+
+    Returns:
+        tuple: punti e, per ogni traiettoria, l'ordine in cui i fattori sono stati spostati
+    """
+    if livelli < 2 or livelli % 2:
+        raise Exception("Il numero di livelli di Morris deve essere pari e almeno 2")
+    delta = livelli / (2 * (livelli - 1))
+    partenze = [j / (livelli - 1) for j in range(livelli // 2)]   # valori x per cui x + delta <= 1
+
+    punti = []
+    ordini = []
+    for _ in range(n_traiettorie):
+        x = [rng.choice(partenze) for _ in range(k)]
+        ordine = list(range(k))
+        rng.shuffle(ordine)
+        punti.append(tuple(x))
+        for i in ordine:
+            x[i] += delta
+            punti.append(tuple(x))
+        ordini.append(ordine)
+    return punti, ordini
+
+
+def _piano_sobol(k: int, n_campioni: int, rng: random.Random) -> list[tuple]:
+    """
+    Matrici di Saltelli: A, B e le k matrici AB_i (A con la colonna i presa da B), N (k + 2) punti.
+    A e B sono condivise da tutti gli indici.
+    """
+    a = [tuple(rng.random() for _ in range(k)) for _ in range(n_campioni)]
+    b = [tuple(rng.random() for _ in range(k)) for _ in range(n_campioni)]
+    punti = a + b
+    for i in range(k):
+        punti.extend(riga_a[:i] + (riga_b[i],) + riga_a[i + 1:] for riga_a, riga_b in zip(a, b))
+    return punti
+
+
+# ===============================================
+# INDICI
+# ===============================================
+def _indici_oat(fattori: list[str], intervalli: dict, uscite: list[float]) -> dict:
+    centrale = uscite[0]
+    indici = {}
+    for i, fattore in enumerate(fattori):
+        minimo, massimo = uscite[1 + 2 * i], uscite[2 + 2 * i]
+        basso, alto = intervalli[fattore]
+        centro = (basso + alto) / 2
+        variazione_relativa = (alto - basso) / centro if centro else 0.0
+        indici[fattore] = {
+            'uscita_minimo': minimo,
+            'uscita_massimo': massimo,
+            'effetto': massimo - minimo,
+            'elasticita': (massimo - minimo) / centrale / variazione_relativa
+            if centrale and variazione_relativa else 0.0,
+        }
+    return {'uscita_centrale': centrale, 'fattori': _ordina(indici, 'effetto')}
+
+
+def _indici_morris(fattori: list[str], livelli: int, ordini: list[list[int]], uscite: list[float]) -> dict:
+    delta = livelli / (2 * (livelli - 1))
+    effetti = [[] for _ in fattori]
+    posizione = 0
+    for ordine in ordini:
+        for passo, i in enumerate(ordine):
+            effetti[i].append((uscite[posizione + passo + 1] - uscite[posizione + passo]) / delta)
+        posizione += len(ordine) + 1
+
+    indici = {}
+    for fattore, valori in zip(fattori, effetti):
+        media = math.fsum(valori) / len(valori)
+        varianza = math.fsum((v - media) ** 2 for v in valori) / (len(valori) - 1) if len(valori) > 1 else 0.0
+        indici[fattore] = {
+            'mu': media,
+            'mu_star': math.fsum(abs(v) for v in valori) / len(valori),
+            'sigma': math.sqrt(varianza),
+        }
+    return {'traiettorie': len(ordini), 'livelli': livelli, 'fattori': _ordina(indici, 'mu_star')}
+
+
+def _stima_sobol(f_a: list[float], f_b: list[float], f_ab: list[list[float]], campioni) -> tuple[list, list, float]:
+    """Indici del primo ordine (Saltelli 2010) e totali (Jansen 1999) sulle righe indicate"""
+    n = len(campioni)
+    valori = [f_a[j] for j in campioni] + [f_b[j] for j in campioni]
+    media = math.fsum(valori) / len(valori)
+    varianza = math.fsum((v - media) ** 2 for v in valori) / len(valori)
+    if varianza == 0:
+        return [0.0] * len(f_ab), [0.0] * len(f_ab), 0.0
+
+    primo_ordine = []
+    totali = []
+    for f_abi in f_ab:
+        # f_B centrato sulla media: stesso valore atteso, varianza molto minore se la media è grande
+        primo_ordine.append(math.fsum((f_b[j] - media) * (f_abi[j] - f_a[j]) for j in campioni) / n / varianza)
+        totali.append(math.fsum((f_a[j] - f_abi[j]) ** 2 for j in campioni) / (2 * n) / varianza)
+    return primo_ordine, totali, varianza
+
+
+def _indici_sobol(fattori: list[str], n_campioni: int, uscite: list[float], rng: random.Random) -> dict:
+    f_a = uscite[:n_campioni]
+    f_b = uscite[n_campioni:2 * n_campioni]
+    f_ab = [uscite[(2 + i) * n_campioni:(3 + i) * n_campioni] for i in range(len(fattori))]
+
+    tutte = range(n_campioni)
+    primo_ordine, totali, varianza = _stima_sobol(f_a, f_b, f_ab, tutte)
+
+    # Bootstrap sulle righe: riusa le valutazioni, nessuna simulazione aggiuntiva
+    repliche_s = [[] for _ in fattori]
+    repliche_st = [[] for _ in fattori]
+    for _ in range(RICAMPIONAMENTI):
+        campioni = [rng.randrange(n_campioni) for _ in tutte]
+        s, st, _ = _stima_sobol(f_a, f_b, f_ab, campioni)
+        for i in range(len(fattori)):
+            repliche_s[i].append(s[i])
+            repliche_st[i].append(st[i])
+
+    def intervallo(valori: list[float]) -> list[float]:
+        valori = sorted(valori)
+        return [valori[int(0.025 * (len(valori) - 1))], valori[int(0.975 * (len(valori) - 1))]]
+
+    indici = {}
+    for i, fattore in enumerate(fattori):
+        indici[fattore] = {
+            'primo_ordine': primo_ordine[i],
+            'primo_ordine_ic95': intervallo(repliche_s[i]),
+            'totale': totali[i],
+            'totale_ic95': intervallo(repliche_st[i]),
+        }
+    return {'campioni': n_campioni, 'varianza_uscita': varianza, 'fattori': _ordina(indici, 'totale')}
+
+
+def _ordina(indici: dict, chiave: str) -> dict:
+    """Fattori in ordine di importanza decrescente"""
+    return dict(sorted(indici.items(), key=lambda voce: abs(voce[1][chiave]), reverse=True))
+
+
+def analizza_sensibilita(base: Scenario | dict, prodotti, metodi=METODI, intervalli: dict | None = None,
+                         uscita: str = 'tempo_totale_ore', n_repliche: int = REPLICHE_DEFAULT,
+                         n_campioni: int = CAMPIONI_SOBOL, n_traiettorie: int = TRAIETTORIE_MORRIS,
+                         livelli: int = LIVELLI_MORRIS, seed: int = 0, n_worker: int | None = None,
+                         backend: str = 'auto', capacita_totale: int | None = None) -> dict:
+    """
+    Analisi di sensibilità dell'uscita rispetto ai campi dello scenario e ai tempi base dei prodotti
+
+    Metodi:
+        oat: un fattore alla volta dal centro degli intervalli (2k + 1 valutazioni)
+        morris: effetti elementari su n_traiettorie traiettorie (mu*, sigma; r (k + 1) valutazioni)
+        sobol: indici del primo ordine e totali con le matrici di Saltelli (N (k + 2) valutazioni),
+               con intervalli bootstrap calcolati sulle stesse valutazioni
+
+    I piani di tutti i metodi sono generati prima di simulare e i punti ripetuti sono valutati una volta.
+
+    Args:
+        base (Scenario | dict): scenario di riferimento per i campi non analizzati
+        prodotti: catalogo o lista di prodotti
+        metodi: sottoinsieme di METODI
+        intervalli (dict | None): fattore -> (minimo, massimo) (default: intervalli_predefiniti)
+        uscita (str): grandezza di cui si misura la media (vedi USCITE)
+        n_repliche (int): repliche comuni a tutte le valutazioni
+        n_campioni (int): righe delle matrici A e B di Sobol
+        n_traiettorie (int): traiettorie di Morris
+        livelli (int): livelli della griglia di Morris (pari)
+        seed (int): seed di uniformi e piani
+        n_worker (int | None): numero di processi (default: numero di CPU)
+        backend (str): 'auto', 'array' o 'numpy'
+        capacita_totale (int | None): capacità dell'impianto (default: ConfigurazioneStabilimento)
+
+    Returns:
+        dict: fattori, intervalli, numero di valutazioni e indici per metodo (fattori in ordine di importanza)
+    """
+    base = Scenario.da_valore(base)
+    catalogo = CatalogoProdotti.da_prodotti(prodotti)
+    metodi = tuple(dict.fromkeys(metodi))
+    for metodo in metodi:
+        if metodo not in METODI:
+            raise Exception(f"Metodo '{metodo}' non disponibile. Metodi: {', '.join(METODI)}")
+    if uscita not in USCITE:
+        raise Exception(f"Uscita '{uscita}' non disponibile. Uscite: {', '.join(USCITE)}")
+    if n_repliche <= 0 or n_campioni <= 1 or n_traiettorie <= 0:
+        raise Exception("Repliche, campioni e traiettorie devono essere maggiori di zero (almeno 2 campioni)")
+
+    if intervalli is None:
+        intervalli = intervalli_predefiniti(base, catalogo, uscita)
+    intervalli = {fattore: tuple(estremi) for fattore, estremi in intervalli.items()}
+    _verifica_intervalli(intervalli, catalogo, base)
+    fattori = list(intervalli)
+    k = len(fattori)
+
+    if capacita_totale is None:
+        capacita_totale = ConfigurazioneStabilimento.capacita_totale_giornaliera
+    modello = _Modello(base, catalogo, intervalli, uscita, n_repliche, deriva_seed(seed, 0), backend, capacita_totale)
+
+    piani = {}
+    if 'oat' in metodi:
+        piani['oat'] = _piano_oat(k)
+    if 'morris' in metodi:
+        piani['morris'], ordini = _piano_morris(k, n_traiettorie, livelli, random.Random(deriva_seed(seed, 1)))
+    if 'sobol' in metodi:
+        piani['sobol'] = _piano_sobol(k, n_campioni, random.Random(deriva_seed(seed, 2)))
+
+    unici = list(dict.fromkeys(punto for punti in piani.values() for punto in punti))
+    valori = dict(zip(unici, _valuta_punti(modello, unici, n_worker)))
+
+    risultati = {
+        'scenario': base.nome,
+        'uscita': uscita,
+        'n_repliche': n_repliche,
+        'fattori': fattori,
+        'intervalli': {fattore: list(estremi) for fattore, estremi in intervalli.items()},
+        'punti': sum(len(punti) for punti in piani.values()),
+        'valutazioni': len(unici),
+    }
+    if 'oat' in piani:
+        risultati['oat'] = _indici_oat(fattori, intervalli, [valori[p] for p in piani['oat']])
+    if 'morris' in piani:
+        risultati['morris'] = _indici_morris(fattori, livelli, ordini, [valori[p] for p in piani['morris']])
+    if 'sobol' in piani:
+        risultati['sobol'] = _indici_sobol(fattori, n_campioni, [valori[p] for p in piani['sobol']],
+                                           random.Random(deriva_seed(seed, 3)))
+
+    return risultati
@@ -0,0 +1,455 @@
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from http import HTTPStatus
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from entità.configurazione_prodotti import CatalogoProdotti, ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari, Scenario
+from entità.confronto_scenari import confronta_scenari_multipli
+from entità.monte_carlo import np
+from entità.piano_scenario import impronta_scenario
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+from entità.statistiche_online import StatisticaOnline
+
+
+# ===============================================
+# SERVIZIO HTTP DI SIMULAZIONE
+# ===============================================
+HOST_DEFAULT = '127.0.0.1'
+PORTA_DEFAULT = 8080
+LIMITE_CODA = 64                # calcoli distinti in corso oltre i quali si risponde 503
+REPLICHE_MASSIME = 1_000_000    # repliche massime per richiesta
+DIMENSIONE_MEMORIA = 256        # risultati recenti conservati per richieste con seed
+CORPO_MASSIMO = 1 << 20         # byte massimi del corpo di una richiesta
+INTESTAZIONI_MASSIME = 100
+
+
+class _RichiestaNonValida(Exception):
+    """Richiesta HTTP malformata: la connessione viene chiusa dopo la risposta"""
+
+    def __init__(self, stato: HTTPStatus, messaggio: str):
+        super().__init__(messaggio)
+        self.stato = stato
+
+
+def _calcola_run(scenario: Scenario, prodotti: tuple, seed: int | None) -> dict:
+    return SimulatoreProduzioneKimbo(scenario, prodotti, seed).simula_produzione_completa()
+
+
+def _calcola_monte_carlo(scenario: Scenario, prodotti: tuple, seed: int | None, n_repliche: int,
+                         backend: str) -> dict:
+    simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, seed)
+    return simulatore.simula_monte_carlo(n_repliche, backend, conserva_repliche=False)
+
+
+def _calcola_confronto(scenari: list[Scenario], prodotti: tuple, seed: int | None, n_repliche: int,
+                       antitetiche: bool, livello_confidenza: float, backend: str) -> dict:
+    return confronta_scenari_multipli(scenari, prodotti, n_repliche, seed, antitetiche, livello_confidenza, backend)
+
+
+def _serializza(valore):
+    """Conversione per json.dumps dei tipi usati nei risultati"""
+    if isinstance(valore, Scenario):
+        return valore.a_dict()
+    if np is not None and isinstance(valore, (np.ndarray, np.generic)):
+        return valore.tolist()
+    if hasattr(valore, 'tolist'):  # array.array
+        return valore.tolist()
+    raise TypeError(f"Tipo non serializzabile: {type(valore).__name__}")
+
+
+def codifica_json(valore) -> bytes:
+    return json.dumps(valore, ensure_ascii=False, default=_serializza).encode()
+
+
+class _MetricheEndpoint:
+    __slots__ = ('richieste', 'errori', 'latenza_ms')
+
+    def __init__(self):
+        self.richieste = 0
+        self.errori = 0
+        self.latenza_ms = StatisticaOnline()
+
+    def a_dict(self) -> dict:
+        misure = {'richieste': self.richieste, 'errori': self.errori}
+        if self.latenza_ms.n:
+            misure['latenza_ms'] = self.latenza_ms.riepilogo()
+        return misure
+
+
+class ServizioSimulazione:
+    """
+    Servizio JSON su HTTP/1.1 (asyncio, solo libreria standard) che esegue le simulazioni
+    su un pool di processi.
+
+    Endpoint:
+        POST /run          {"scenario", "seed", "prodotti"}: simula_produzione_completa
+        POST /monte_carlo  {"scenario", "repliche", "seed", "backend", "prodotti"}: statistiche di sintesi
+        POST /confronta    {"scenari", "repliche", "seed", "antitetiche", "livello_confidenza", "backend", "prodotti"}
+        GET  /metriche     latenze, throughput, coalescenze e richieste rifiutate
+
+    "scenario" è il nome di uno scenario configurato o un dizionario completo; "prodotti",
+    se assente, è il catalogo configurato. Con un seed il risultato è deterministico:
+    richieste identiche in corso condividono un solo calcolo e i risultati recenti sono
+    riusati. Oltre limite_coda calcoli distinti in corso il servizio risponde 503.
+    """
+
+    def __init__(self, configurazione_scenari: ConfigurazioneScenari | None = None,
+                 configurazione_prodotti: ConfigurazioneProdotti | None = None, n_worker: int | None = None,
+                 limite_coda: int = LIMITE_CODA, repliche_massime: int = REPLICHE_MASSIME,
+                 dimensione_memoria: int = DIMENSIONE_MEMORIA):
+        """
+        Args:
+            configurazione_scenari (ConfigurazioneScenari | None): scenari richiamabili per nome
+            configurazione_prodotti (ConfigurazioneProdotti | None): catalogo usato se la richiesta non ne indica uno
+            n_worker (int | None): processi di calcolo (default: numero di CPU)
+            limite_coda (int): calcoli distinti in corso o in attesa ammessi
+            repliche_massime (int): repliche massime per richiesta
+            dimensione_memoria (int): risultati recenti conservati (0 per disattivare)
+        """
+        if limite_coda <= 0:
+            raise Exception("Il limite della coda deve essere maggiore di zero")
+        if repliche_massime <= 0:
+            raise Exception("Il numero massimo di repliche deve essere maggiore di zero")
+
+        self.configurazione_scenari = configurazione_scenari or ConfigurazioneScenari()
+        self.configurazione_prodotti = configurazione_prodotti or ConfigurazioneProdotti()
+        self.n_worker = n_worker or os.cpu_count() or 1
+        self.limite_coda = limite_coda
+        self.repliche_massime = repliche_massime
+        self.dimensione_memoria = dimensione_memoria
+
+        self._executor = None
+        self._server = None
+        self._in_corso = {}
+        self._memoria = OrderedDict()
+
+        self._avvio = time.monotonic()
+        self._endpoint = {}
+        self._stati = {}
+        self._calcoli = 0
+        self._coalescenze = 0
+        self._dalla_memoria = 0
+        self._rifiutate = 0
+
+        self._percorsi = {
+            ('POST', '/run'): self._richiesta_run,
+            ('POST', '/monte_carlo'): self._richiesta_monte_carlo,
+            ('POST', '/confronta'): self._richiesta_confronto,
+            ('GET', '/metriche'): self._richiesta_metriche,
+        }
+
+    # -----------------------------------------------
+    # Avvio e arresto
+    # -----------------------------------------------
+    async def avvia(self, host: str = HOST_DEFAULT, porta: int = PORTA_DEFAULT) -> None:
+        # I worker partono prima di accettare connessioni: con fork erediterebbero i socket dei client
+        # e una connessione chiusa dal servizio resterebbe aperta nei processi figli
+        self._executor = ProcessPoolExecutor(max_workers=self.n_worker)
+        await asyncio.gather(*[asyncio.get_running_loop().run_in_executor(self._executor, os.getpid)
+                               for _ in range(self.n_worker)])
+        self._server = await asyncio.start_server(self._gestisci_connessione, host, porta)
+
+    @property
+    def indirizzi(self) -> list[tuple]:
+        return [socket.getsockname() for socket in self._server.sockets] if self._server else []
+
+    async def servi(self) -> None:
+        """Accetta connessioni finché il task non viene annullato"""
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def chiudi(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    # -----------------------------------------------
+    # Protocollo HTTP
+    # -----------------------------------------------
+    async def _leggi_richiesta(self, reader: asyncio.StreamReader):
+        """
+        Returns:
+            tuple | None: (metodo, percorso, intestazioni, corpo), None a connessione chiusa
+        """
+        riga = await reader.readline()
+        if not riga:
+            return None
+
+        try:
+            metodo, percorso, versione = riga.decode('latin-1').split()
+        except ValueError:
+            raise _RichiestaNonValida(HTTPStatus.BAD_REQUEST, "Riga di richiesta non valida") from None
+
+        intestazioni = {'_versione': versione}
+        while True:
+            riga = await reader.readline()
+            if riga in (b'\r\n', b'\n', b''):
+                break
+            if len(intestazioni) > INTESTAZIONI_MASSIME:
+                raise _RichiestaNonValida(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Troppe intestazioni")
+            nome, _, valore = riga.decode('latin-1').partition(':')
+            intestazioni[nome.strip().lower()] = valore.strip()
+
+        try:
+            lunghezza = int(intestazioni.get('content-length', 0))
+        except ValueError:
+            raise _RichiestaNonValida(HTTPStatus.BAD_REQUEST, "Content-Length non valido") from None
+        if lunghezza > CORPO_MASSIMO:
+            raise _RichiestaNonValida(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                      f"Corpo della richiesta oltre {CORPO_MASSIMO} byte")
+
+        corpo = await reader.readexactly(lunghezza) if lunghezza > 0 else b''
+        return metodo.upper(), percorso.split('?', 1)[0], intestazioni, corpo
+
+    @staticmethod
+    def _risposta(stato: HTTPStatus, corpo: bytes, mantieni: bool, intestazioni: dict | None = None) -> bytes:
+        righe = [
+            f"HTTP/1.1 {stato.value} {stato.phrase}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(corpo)}",
+            f"Connection: {'keep-alive' if mantieni else 'close'}",
+        ]
+        for nome, valore in (intestazioni or {}).items():
+            righe.append(f"{nome}: {valore}")
+        return ('\r\n'.join(righe) + '\r\n\r\n').encode('latin-1') + corpo
+
+    async def _gestisci_connessione(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve le richieste di una connessione, che resta aperta tra una richiesta e l'altra (keep-alive)"""
+        try:
+            while True:
+                try:
+                    richiesta = await self._leggi_richiesta(reader)
+                except _RichiestaNonValida as e:
+                    self._conta_stato(e.stato)
+                    writer.write(self._risposta(e.stato, codifica_json({'errore': str(e)}), False))
+                    await writer.drain()
+                    break
+                if richiesta is None:
+                    break
+
+                metodo, percorso, intestazioni, corpo = richiesta
+                connessione = intestazioni.get('connection', '').lower()
+                mantieni = connessione != 'close' and (intestazioni['_versione'] != 'HTTP/1.0' or connessione == 'keep-alive')
+
+                stato, corpo_risposta, extra = await self._instrada(metodo, percorso, corpo)
+                writer.write(self._risposta(stato, corpo_risposta, mantieni, extra))
+                await writer.drain()
+                if not mantieni:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client disconnesso: un eventuale calcolo in corso prosegue per gli altri richiedenti
+        finally:
+            writer.close()
+
+    async def _instrada(self, metodo: str, percorso: str, corpo: bytes) -> tuple[HTTPStatus, bytes, dict | None]:
+        gestore = self._percorsi.get((metodo, percorso))
+        if gestore is None:
+            consentito = any(p == percorso for _, p in self._percorsi)
+            stato = HTTPStatus.METHOD_NOT_ALLOWED if consentito else HTTPStatus.NOT_FOUND
+            self._conta_stato(stato)
+            return stato, codifica_json({'errore': f"{metodo} {percorso} non disponibile"}), None
+
+        metriche = self._endpoint.setdefault(percorso, _MetricheEndpoint())
+        metriche.richieste += 1
+        inizio = time.perf_counter()
+        extra = None
+
+        try:
+            dati = json.loads(corpo) if corpo else {}
+            if not isinstance(dati, dict):
+                raise Exception("Il corpo della richiesta deve essere un oggetto JSON")
+            stato, risposta = HTTPStatus.OK, await gestore(dati)
+        except _RichiestaNonValida as e:
+            stato, risposta = e.stato, codifica_json({'errore': str(e)})
+            if stato == HTTPStatus.SERVICE_UNAVAILABLE:
+                extra = {'Retry-After': 1}
+        except BrokenExecutor:
+            stato, risposta = HTTPStatus.INTERNAL_SERVER_ERROR, codifica_json({'errore': "Pool di calcolo non disponibile"})
+        except json.JSONDecodeError as e:
+            stato, risposta = HTTPStatus.BAD_REQUEST, codifica_json({'errore': f"JSON non valido: {e}"})
+        except Exception as e:
+            stato, risposta = HTTPStatus.BAD_REQUEST, codifica_json({'errore': str(e)})
+
+        if stato != HTTPStatus.OK:
+            metriche.errori += 1
+        metriche.latenza_ms.aggiungi((time.perf_counter() - inizio) * 1e3)
+        self._conta_stato(stato)
+        return stato, risposta, extra
+
+    def _conta_stato(self, stato: HTTPStatus) -> None:
+        self._stati[stato.value] = self._stati.get(stato.value, 0) + 1
+
+    # -----------------------------------------------
+    # Calcolo condiviso
+    # -----------------------------------------------
+    async def _esegui(self, chiave: str | None, funzione, *argomenti) -> bytes:
+        """
+        Esegue funzione(*argomenti) nel pool e restituisce il risultato codificato in JSON.
+        Con una chiave (richiesta con seed) il risultato è preso dalla memoria dei risultati recenti
+        o da un calcolo identico già in corso; senza chiave ogni richiesta è un calcolo a sé.
+        """
+        if chiave is not None:
+            if chiave in self._memoria:
+                self._memoria.move_to_end(chiave)
+                self._dalla_memoria += 1
+                return self._memoria[chiave]
+
+            calcolo = self._in_corso.get(chiave)
+            if calcolo is not None:
+                self._coalescenze += 1
+                return await asyncio.shield(calcolo)
+
+        if len(self._in_corso) >= self.limite_coda:
+            self._rifiutate += 1
+            raise _RichiestaNonValida(HTTPStatus.SERVICE_UNAVAILABLE,
+                                      f"Servizio occupato: {len(self._in_corso)} calcoli in corso")
+
+        chiave_calcolo = chiave if chiave is not None else object()
+        calcolo = asyncio.ensure_future(self._calcola(chiave, funzione, argomenti))
+        self._in_corso[chiave_calcolo] = calcolo
+        calcolo.add_done_callback(lambda c: self._termina_calcolo(chiave_calcolo, c))
+        # shield: se il client si disconnette il calcolo prosegue per chi lo sta attendendo
+        return await asyncio.shield(calcolo)
+
+    async def _calcola(self, chiave: str | None, funzione, argomenti: tuple) -> bytes:
+        self._calcoli += 1
+        risultato = await asyncio.get_running_loop().run_in_executor(self._executor, funzione, *argomenti)
+        codificato = codifica_json(risultato)
+
+        if chiave is not None and self.dimensione_memoria > 0:
+            self._memoria[chiave] = codificato
+            if len(self._memoria) > self.dimensione_memoria:
+                self._memoria.popitem(last=False)
+        return codificato
+
+    def _termina_calcolo(self, chiave, calcolo: asyncio.Future) -> None:
+        del self._in_corso[chiave]
+        if not calcolo.cancelled():
+            calcolo.exception()  # Segna l'eccezione come letta anche se tutti i client si sono disconnessi
+
+    # -----------------------------------------------
+    # Endpoint
+    # -----------------------------------------------
+    def _scenario(self, valore) -> Scenario:
+        if isinstance(valore, str):
+            return self.configurazione_scenari.get_scenario(valore)
+        if isinstance(valore, dict):
+            try:
+                return Scenario.da_dict(valore)
+            except KeyError as e:
+                raise Exception(f"Scenario incompleto: manca il campo {e}") from None
+        raise Exception("Lo scenario deve essere un nome o un oggetto")
+
+    def _catalogo(self, dati: dict) -> CatalogoProdotti:
+        if 'prodotti' not in dati:
+            return self.configurazione_prodotti.get_catalogo()
+        try:
+            return CatalogoProdotti(dati['prodotti'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise Exception(f"Prodotti non validi: {e}") from None
+
+    def _repliche(self, dati: dict, predefinite: int) -> int:
+        n_repliche = dati.get('repliche', predefinite)
+        if not isinstance(n_repliche, int) or n_repliche <= 0:
+            raise Exception("Il numero di repliche deve essere un intero maggiore di zero")
+        if n_repliche > self.repliche_massime:
+            raise _RichiestaNonValida(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                      f"Al massimo {self.repliche_massime} repliche per richiesta")
+        return n_repliche
+
+    @staticmethod
+    def _seed(dati: dict) -> int | None:
+        seed = dati.get('seed')
+        if seed is not None and not isinstance(seed, int):
+            raise Exception("Il seed deve essere un intero")
+        return seed
+
+    @staticmethod
+    def _chiave(tipo: str, scenari: list[Scenario], catalogo: CatalogoProdotti, seed: int | None, *parametri) -> str | None:
+        """Chiave canonica di un calcolo deterministico; None senza seed"""
+        if seed is None:
+            return None
+        impronte = ','.join(impronta_scenario(s) for s in scenari)
+        testo = f"{tipo}:{impronte}:{catalogo.impronta}:{seed}:{parametri!r}"
+        return hashlib.sha256(testo.encode()).hexdigest()
+
+    async def _richiesta_run(self, dati: dict) -> bytes:
+        scenario = self._scenario(dati.get('scenario'))
+        catalogo = self._catalogo(dati)
+        seed = self._seed(dati)
+
+        chiave = self._chiave('run', [scenario], catalogo, seed)
+        return await self._esegui(chiave, _calcola_run, scenario, catalogo.prodotti, seed)
+
+    async def _richiesta_monte_carlo(self, dati: dict) -> bytes:
+        scenario = self._scenario(dati.get('scenario'))
+        catalogo = self._catalogo(dati)
+        seed = self._seed(dati)
+        n_repliche = self._repliche(dati, 1_000)
+        backend = dati.get('backend', 'auto')
+
+        chiave = self._chiave('monte_carlo', [scenario], catalogo, seed, n_repliche, backend)
+        return await self._esegui(chiave, _calcola_monte_carlo, scenario, catalogo.prodotti, seed, n_repliche, backend)
+
+    async def _richiesta_confronto(self, dati: dict) -> bytes:
+        scenari = dati.get('scenari')
+        if not isinstance(scenari, list):
+            raise Exception("'scenari' deve essere una lista di nomi o oggetti")
+        scenari = [self._scenario(s) for s in scenari]
+        catalogo = self._catalogo(dati)
+        seed = self._seed(dati)
+        n_repliche = self._repliche(dati, 10_000)
+        antitetiche = bool(dati.get('antitetiche', False))
+        livello_confidenza = float(dati.get('livello_confidenza', 0.95))
+        backend = dati.get('backend', 'auto')
+
+        chiave = self._chiave('confronta', scenari, catalogo, seed, n_repliche, antitetiche, livello_confidenza, backend)
+        return await self._esegui(chiave, _calcola_confronto, scenari, catalogo.prodotti, seed, n_repliche,
+                                  antitetiche, livello_confidenza, backend)
+
+    async def _richiesta_metriche(self, dati: dict) -> bytes:
+        return codifica_json(self.metriche())
+
+    def metriche(self) -> dict:
+        """Latenze per endpoint, throughput e stato del pool"""
+        secondi = time.monotonic() - self._avvio
+        richieste = sum(m.richieste for m in self._endpoint.values())
+        return {
+            'secondi_attivo': secondi,
+            'richieste': richieste,
+            'richieste_al_secondo': richieste / secondi if secondi > 0 else 0.0,
+            'endpoint': {percorso: m.a_dict() for percorso, m in self._endpoint.items()},
+            'stati': dict(self._stati),
+            'calcoli': self._calcoli,
+            'coalescenze': self._coalescenze,
+            'dalla_memoria': self._dalla_memoria,
+            'rifiutate': self._rifiutate,
+            'in_corso': len(self._in_corso),
+            'limite_coda': self.limite_coda,
+            'n_worker': self.n_worker,
+        }
+
+
+def avvia_servizio(host: str = HOST_DEFAULT, porta: int = PORTA_DEFAULT, **opzioni) -> None:
+    """Avvia il servizio e lo mantiene attivo fino a Ctrl+C"""
+    async def esegui():
+        servizio = ServizioSimulazione(**opzioni)
+        await servizio.avvia(host, porta)
+        for indirizzo in servizio.indirizzi:
+            print(f"Servizio di simulazione in ascolto su http://{indirizzo[0]}:{indirizzo[1]}")
+        try:
+            await servizio.servi()
+        finally:
+            await servizio.chiudi()
+
+    try:
+        asyncio.run(esegui())
+    except KeyboardInterrupt:
+        print("\nServizio arrestato")
@@ -0,0 +1,326 @@
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+import random
+import time
+
+from entità.configurazione_prodotti import CatalogoProdotti, Prodotto
+from entità.configurazione_scenari import Scenario
+from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+from entità.piano_scenario import compila_piano
+
+
+# ===============================================
+# SIMULAZIONE A EVENTI DISCRETI
+# ===============================================
+MINUTI_GIORNO = 24 * 60
+
+# Tipi di evento (interi: il confronto è più rapido di quello tra stringhe)
+INIZIO_TURNO = 0
+FINE_TURNO = 1
+FINE_LOTTO = 2
+
+
+class Evento:
+    """Evento in coda: nessun __dict__, solo i campi necessari"""
+    __slots__ = ('tempo', 'tipo', 'macchina', 'versione')
+
+    def __init__(self, tempo: float, tipo: int, macchina: "Macchina | None" = None, versione: int = 0):
+        self.tempo = tempo
+        self.tipo = tipo
+        self.macchina = macchina
+        self.versione = versione
+
+
+class Lotto:
+    """Lotto di produzione di un singolo prodotto"""
+    __slots__ = ('prodotto', 'quantita', 'durata')
+
+    def __init__(self, prodotto: int, quantita: int, durata: float):
+        self.prodotto = prodotto
+        self.quantita = quantita
+        self.durata = durata
+
+
+class Macchina:
+    """Macchina di una linea: lavora un lotto alla volta, solo durante i turni"""
+    __slots__ = ('linea', 'indice', 'lotto', 'residuo', 'inizio', 'versione', 'minuti_lavoro')
+
+    def __init__(self, linea: "Linea", indice: int):
+        self.linea = linea
+        self.indice = indice
+        self.lotto = None
+        self.residuo = 0.0
+        self.inizio = 0.0
+        self.versione = 0  # incrementata per invalidare un FINE_LOTTO già in coda
+        self.minuti_lavoro = 0.0
+
+
+class Linea:
+    """
+    Linea produttiva con un certo numero di macchine identiche e una coda di lotti.
+    I prodotti assegnati alla stessa linea competono per le sue macchine.
+    """
+    __slots__ = ('nome', 'prodotti', 'macchine', 'coda')
+
+    def __init__(self, nome: str, n_macchine: int, prodotti: list[str]):
+        if n_macchine <= 0:
+            raise Exception(f"La linea '{nome}' deve avere almeno una macchina")
+
+        self.nome = nome
+        self.prodotti = list(prodotti)
+        self.macchine = [Macchina(self, i) for i in range(n_macchine)]
+        self.coda = deque()
+
+
+class CalendarioTurni:
+    """
+    Calendario dei turni: ogni giorno le ore lavorative dello scenario sono divise
+    in turni_giorno turni consecutivi di uguale durata, a partire da ora_inizio.
+    """
+    __slots__ = ('turni_giorno', 'durata_turno', 'inizio_giornata')
+
+    def __init__(self, ore_lavorative_giorno: float, turni_giorno: int, ora_inizio: float = 6.0):
+        if ore_lavorative_giorno <= 0 or ore_lavorative_giorno > 24:
+            raise Exception("Le ore lavorative giornaliere devono essere comprese tra 0 e 24")
+        if turni_giorno <= 0:
+            raise Exception("Il numero di turni giornalieri deve essere maggiore di zero")
+
+        self.turni_giorno = turni_giorno
+        self.durata_turno = ore_lavorative_giorno * 60 / turni_giorno
+        self.inizio_giornata = min(ora_inizio, 24 - ore_lavorative_giorno) * 60
+
+    @classmethod
+    def da_scenario(cls, scenario: Scenario, ora_inizio: float = 6.0) -> "CalendarioTurni":
+        return cls(scenario.ore_lavorative_giorno, scenario.turni_giorno, ora_inizio)
+
+    def finestra(self, k: int) -> tuple[float, float]:
+        """Inizio e fine (minuti dall'inizio della simulazione) del k-esimo turno"""
+        giorno, turno = divmod(k, self.turni_giorno)
+        inizio = giorno * MINUTI_GIORNO + self.inizio_giornata + turno * self.durata_turno
+        return inizio, inizio + self.durata_turno
+
+
+def linee_predefinite(catalogo: CatalogoProdotti) -> list[Linea]:
+    """
+    Configurazione di default: un'unica linea condivisa con una macchina per prodotto,
+    così i prodotti competono per le stesse macchine.
+    """
+    return [Linea('linea_principale', len(catalogo), list(catalogo.nomi))]
+
+
+class SimulatoreEventiKimbo:
+    """
+    Simulatore a eventi discreti del processo produttivo Kimbo.
+    Le quantità sono divise in lotti, i lotti sono lavorati dalle macchine delle linee
+    solo durante i turni e gli eventi sono gestiti con una coda a priorità (heapq).
+    Usa gli stessi scenari e prodotti di SimulatoreProduzioneKimbo.
+    """
+
+    def __init__(self, scenario: Scenario | dict, prodotti: CatalogoProdotti | list[Prodotto] | list[dict],
+                 seed: int | None = None, linee: list[Linea] | None = None, dimensione_lotto: int = 100,
+                 ora_inizio: float = 6.0):
+        """
+        Args:
+            scenario (Scenario | dict): scenario produttivo
+            prodotti: catalogo o lista di prodotti
+            seed (int | None): seed del generatore casuale del simulatore
+            linee (list[Linea] | None): linee produttive (default: linee_predefinite)
+            dimensione_lotto (int): unità per lotto
+            ora_inizio (float): ora del giorno in cui inizia il primo turno
+        """
+        if scenario is None:
+            raise Exception("Immettere uno scenario")
+        if dimensione_lotto <= 0:
+            raise Exception("La dimensione del lotto deve essere maggiore di zero")
+
+        self.rng = random.Random(seed)
+        self.scenario_corrente = Scenario.da_valore(scenario)
+        self.catalogo = CatalogoProdotti.da_prodotti(prodotti)
+        self.piano = compila_piano(self.scenario_corrente, self.catalogo,
+                                   ConfigurazioneStabilimento.capacita_totale_giornaliera)
+        self.calendario = CalendarioTurni.da_scenario(self.scenario_corrente, ora_inizio)
+        self.linee = linee if linee is not None else linee_predefinite(self.catalogo)
+        self.dimensione_lotto = dimensione_lotto
+
+        # Ogni prodotto deve essere assegnato a esattamente una linea
+        self._linea_prodotto = {}
+        for linea in self.linee:
+            for nome in linea.prodotti:
+                indice = self.catalogo.indice_di(nome)
+                if indice in self._linea_prodotto:
+                    raise Exception(f"Prodotto '{nome}' assegnato a più linee")
+                self._linea_prodotto[indice] = linea
+
+        if len(self._linea_prodotto) != len(self.catalogo):
+            raise Exception("Ogni prodotto deve essere assegnato a una linea")
+
+    def genera_lotti(self, quantita: dict | None = None) -> int:
+        """
+        Divide le quantità da produrre in lotti e li accoda alle linee, alternando i prodotti.
+        Le quantità, se non indicate, sono estratte come in genera_quantita_casuali.
+
+        Returns:
+            int: numero di lotti generati
+        """
+        piano = self.piano
+        var_tempi = self.scenario_corrente.variabilita_tempi
+        casuale = self.rng.random
+        dimensione = self.dimensione_lotto
+
+        lotti_per_prodotto = []
+        for i, nome in enumerate(self.catalogo.nomi):
+            if quantita is None:
+                q_min = piano.quantita_min[i]
+                qta = q_min + int(casuale() * (piano.quantita_max[i] - q_min + 1))
+            else:
+                qta = quantita.get(nome, 0)
+
+            t_min = piano.tempo_scenario[i] * (1 - var_tempi)
+            t_ampiezza = 2 * var_tempi * piano.tempo_scenario[i]
+
+            lotti = []
+            while qta > 0:
+                unita = min(dimensione, qta)
+                lotti.append(Lotto(i, unita, unita * (t_min + t_ampiezza * casuale())))
+                qta -= unita
+            lotti_per_prodotto.append(lotti)
+
+        for linea in self.linee:
+            linea.coda.clear()
+            for macchina in linea.macchine:
+                macchina.lotto = None
+                macchina.versione = 0
+                macchina.minuti_lavoro = 0.0
+
+        # Accoda alternando i prodotti, così nessun prodotto monopolizza la linea
+        totale = 0
+        n_max = max((len(lotti) for lotti in lotti_per_prodotto), default=0)
+        for k in range(n_max):
+            for lotti in lotti_per_prodotto:
+                if k < len(lotti):
+                    lotto = lotti[k]
+                    self._linea_prodotto[lotto.prodotto].coda.append(lotto)
+                    totale += 1
+
+        return totale
+
+    def simula(self, quantita: dict | None = None) -> dict:
+        """
+        Esegue la simulazione a eventi fino al completamento di tutti i lotti
+
+        Args:
+            quantita (dict | None): quantità per prodotto; se None sono estratte casualmente
+
+        Returns:
+            dict: completamento, ore lavorate, utilizzo delle linee e statistiche sugli eventi
+        """
+        inizio_cronometro = time.perf_counter()
+
+        lotti_da_completare = self.genera_lotti(quantita)
+        n_prodotti = len(self.catalogo)
+        completamento_prodotti = [0.0] * n_prodotti
+        quantita_prodotte = [0] * n_prodotti
+
+        coda_eventi = []
+        sequenza = count()
+        macchine = [m for linea in self.linee for m in linea.macchine]
+
+        turno = 0
+        inizio_turno, fine_turno = self.calendario.finestra(turno)
+        heappush(coda_eventi, (inizio_turno, next(sequenza), Evento(inizio_turno, INIZIO_TURNO)))
+
+        in_turno = False
+        adesso = 0.0
+        eventi_elaborati = 0
+
+        while coda_eventi and lotti_da_completare > 0:
+            adesso, _, evento = heappop(coda_eventi)
+            eventi_elaborati += 1
+            tipo = evento.tipo
+
+            if tipo == FINE_LOTTO:
+                macchina = evento.macchina
+                if evento.versione != macchina.versione:
+                    continue  # lotto interrotto da un fine turno: evento non più valido
+
+                lotto = macchina.lotto
+                macchina.minuti_lavoro += adesso - macchina.inizio
+                macchina.lotto = None
+                completamento_prodotti[lotto.prodotto] = adesso
+                quantita_prodotte[lotto.prodotto] += lotto.quantita
+                lotti_da_completare -= 1
+
+                coda = macchina.linea.coda
+                if coda:
+                    self._avvia(macchina, coda.popleft(), adesso, coda_eventi, sequenza)
+
+            elif tipo == INIZIO_TURNO:
+                in_turno = True
+                for macchina in macchine:
+                    if macchina.lotto is not None:
+                        self._riprendi(macchina, adesso, coda_eventi, sequenza)
+                    elif macchina.linea.coda:
+                        self._avvia(macchina, macchina.linea.coda.popleft(), adesso, coda_eventi, sequenza)
+
+                heappush(coda_eventi, (fine_turno, next(sequenza), Evento(fine_turno, FINE_TURNO)))
+
+            else:  # FINE_TURNO
+                in_turno = False
+                for macchina in macchine:
+                    if macchina.lotto is not None:
+                        lavorato = adesso - macchina.inizio
+                        macchina.minuti_lavoro += lavorato
+                        macchina.residuo -= lavorato
+                        macchina.versione += 1
+
+                turno += 1
+                inizio_turno, fine_turno = self.calendario.finestra(turno)
+                heappush(coda_eventi, (inizio_turno, next(sequenza), Evento(inizio_turno, INIZIO_TURNO)))
+
+        durata_cronometro = time.perf_counter() - inizio_cronometro
+
+        # Turni completi lavorati più la frazione dell'ultimo turno
+        minuti_turni = turno * self.calendario.durata_turno
+        if in_turno:
+            minuti_turni += adesso - inizio_turno
+
+        utilizzo_linee = {}
+        for linea in self.linee:
+            lavoro = sum(m.minuti_lavoro for m in linea.macchine)
+            disponibile = minuti_turni * len(linea.macchine)
+            utilizzo_linee[linea.nome] = round(lavoro / disponibile * 100, 1) if disponibile > 0 else 0.0
+
+        return {
+            'scenario': self.scenario_corrente,
+            'tempo_completamento_minuti': adesso,
+            'giorni_calendario': adesso / MINUTI_GIORNO,
+            'ore_lavorate': minuti_turni / 60,
+            'turni_lavorati': turno + (1 if in_turno else 0),
+            'utilizzo_linee_percentuale': utilizzo_linee,
+            'prodotti': {
+                nome: {
+                    'quantita': quantita_prodotte[i],
+                    'completamento_ore': completamento_prodotti[i] / 60,
+                }
+                for i, nome in enumerate(self.catalogo.nomi)
+            },
+            'eventi_elaborati': eventi_elaborati,
+            'eventi_al_secondo': eventi_elaborati / durata_cronometro if durata_cronometro > 0 else 0.0,
+        }
+
+    @staticmethod
+    def _avvia(macchina: Macchina, lotto: Lotto, adesso: float, coda_eventi: list, sequenza) -> None:
+        """Assegna un lotto a una macchina libera e programma la fine della lavorazione"""
+        macchina.lotto = lotto
+        macchina.residuo = lotto.durata
+        macchina.inizio = adesso
+        fine = adesso + lotto.durata
+        heappush(coda_eventi, (fine, next(sequenza), Evento(fine, FINE_LOTTO, macchina, macchina.versione)))
+
+    @staticmethod
+    def _riprendi(macchina: Macchina, adesso: float, coda_eventi: list, sequenza) -> None:
+        """Riprende a inizio turno il lotto interrotto dal turno precedente"""
+        macchina.inizio = adesso
+        fine = adesso + macchina.residuo
+        heappush(coda_eventi, (fine, next(sequenza), Evento(fine, FINE_LOTTO, macchina, macchina.versione)))
@@ -1,21 +1,42 @@
+from dataclasses import asdict, dataclass
+from itertools import islice
+
+from entità.configurazione_prodotti import CatalogoProdotti, Prodotto
+from entità.configurazione_scenari import Scenario
 from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+from entità.fermi_macchina import ModelloFermi, applica_fermi_colonne
+from entità.monte_carlo import DIMENSIONE_BLOCCO, esegui_repliche, riepiloga_repliche
+from entità.piano_scenario import PianoScenario, compila_piano
+from entità.pianificazione import (assegna_giorno, capacita_con_ore, giorni_minimi, ordina_per_priorita,
+                                   pianifica_produzione)
+from entità.report import PRIMI_DEFAULT, dati_report, rendi_report, scrivi_report
+# Riesportata: formatta_hms era definita in questo modulo prima di spostarsi in entità.report
+from entità.report import formatta_hms  # noqa: F401
+from entità.sorgenti_domanda import SorgenteCasuale, SorgenteDomanda
+from entità.strumentazione import STRUMENTAZIONE_DISATTIVATA
 import random
 
 # ===============================================
 # GENERAZIONE SIMULAZIONI
 # ===============================================
-def formatta_hms(ore:float) -> str:
+
+@dataclass(frozen=True, slots=True)
+class RecordGiornaliero:
     """
-    Converte un valore in ore (float) nel formato "Hh Mm Ss".
-    Gestisce arrotondamenti e carry-over (es. 59.6s -> 60s -> +1m).
+    Risultato di un giorno della simulazione su orizzonte.
+    Le tuple sono allineate all'ordine dei prodotti nel catalogo del simulatore.
     """
+    giorno: int
+    domanda: tuple[int, ...]
+    produzione: tuple[int, ...]
+    arretrato: tuple[int, ...]
+    capacita_utilizzata_percentuale: float
+    ore_produzione: float
+    superamenti: int
+    capacita_totale_superata: bool
 
-    total_seconds = int(round(ore*3600))
-    h = total_seconds // 3600
-    m = (total_seconds % 3600) // 60
-    s = total_seconds % 60
-
-    return f"{h}h {m}m {s}s"
+    def a_dict(self) -> dict:
+        return asdict(self)
 
 
 class SimulatoreProduzioneKimbo:
@@ -24,49 +45,52 @@ class SimulatoreProduzioneKimbo:
     Simula la produzione di tre tipologie principali di prodotto
     """
 
-    def __init__(self, scenario: dict, prodotti: list[dict], seed: int | None = None):
+    def __init__(self, scenario: Scenario | dict, prodotti: CatalogoProdotti | list[Prodotto] | list[dict],
+                 seed: int | None = None, strumentazione=None, capacita_totale_giornaliera: int | None = None,
+                 fermi: ModelloFermi | None = None):
         """
         Inizializza il simulatore con uno scenario configurabile
 
         Args:
-            scenario (dict): Configurazione dello scenario produttivo, lista di prodotti e seed (opzionale) per i dati casuali
+            scenario (Scenario | dict): Configurazione dello scenario produttivo, lista di prodotti e seed (opzionale) per i dati casuali
+            strumentazione (Strumentazione | None): raccoglie tempi per fase e contatori (default: disattivata)
+            capacita_totale_giornaliera (int | None): capacità dell'impianto (default: ConfigurazioneStabilimento)
+            fermi (ModelloFermi | None): guasti per linea e cambi formato (default: nessun fermo)
         """
 
-        if seed is not None:
-            random.seed(seed)
-
-        # Configurazione prodotti base
-        self.prodotti = prodotti
-        self.capacita_totale_giornaliera = ConfigurazioneStabilimento.capacita_totale_giornaliera
-        self.scenario_corrente = scenario
+        # Generatore casuale proprio del simulatore: istanze diverse non condividono lo stato
+        self.rng = random.Random(seed)
+        self.strumentazione = strumentazione or STRUMENTAZIONE_DISATTIVATA
 
         # Carica scenario o usa quello standard
         if scenario is None:
             raise Exception("Immettere uno scenario")
 
+        # Configurazione prodotti base, indicizzata per nome
+        self.catalogo = CatalogoProdotti.da_prodotti(prodotti)
+        self.prodotti = self.catalogo.prodotti
+        if capacita_totale_giornaliera is None:
+            capacita_totale_giornaliera = ConfigurazioneStabilimento.capacita_totale_giornaliera
+        self.capacita_totale_giornaliera = capacita_totale_giornaliera
+        self.fermi = fermi
+        if fermi is not None:
+            fermi.verifica(self.catalogo.nomi)
+        self._stato_fermi = None
+        self.scenario_corrente = Scenario.da_valore(scenario)
+
         # Applica configurazioni dello scenario
         self._applica_scenario()
 
     def _applica_scenario(self) -> None:
         """
-        Applica le configurazioni dello scenario ai parametri di produzione
+        Applica le configurazioni dello scenario ai parametri di produzione.
+        I valori derivati provengono da un PianoScenario immutabile, condiviso tramite cache
+        con gli altri simulatori che usano la stessa configurazione.
         """
-        efficienza = self.scenario_corrente['efficienza_impianti']
-
-        # Modifica capacità e tempi in base all'efficienza dello scenario
-        for prodotto in self.prodotti:
-            # Riduce capacità se efficienza < 1.0
-            capacita_originale = prodotto['capacita_max_giornaliera']
-            prodotto['capacita_scenario'] = int(capacita_originale * efficienza)
-
-            # Aumenta tempi se efficienza < 1.0
-            tempo_originale = prodotto['tempo_base_produzione']
-
-            if efficienza == 0:
-                raise Exception("Impossibile calcolare il 'tempo necessario di produzione' \
-                                perchè per lo scenario in questione, l'efficienza è uguale a zero")
-
-            prodotto['tempo_scenario'] = tempo_originale / efficienza
+        self.piano: PianoScenario = compila_piano(self.scenario_corrente, self.catalogo,
+                                                  self.capacita_totale_giornaliera)
+        self.capacita_scenario = self.piano.capacita_scenario
+        self.tempo_scenario = self.piano.tempo_scenario
 
     def genera_quantita_casuali(self) -> dict:
         """
@@ -77,63 +101,87 @@ class SimulatoreProduzioneKimbo:
             dict: Dizionario con le quantità per ogni prodotto
         """
         quantita = {}
-        range_min, range_max = self.scenario_corrente['range_quantita']
-
-        for prodotto in self.prodotti:
-            # Usa capacità modificata dallo scenario
-            capacita_max = prodotto['capacita_scenario']
-            quantita_min = int(capacita_max * range_min)
-            quantita_max = int(capacita_max * range_max)
 
-            quantita[prodotto['nome']] = random.randint(quantita_min, quantita_max)
+        # Usa i limiti già calcolati dal piano sulla capacità modificata dallo scenario
+        for nome, quantita_min, quantita_max in zip(self.catalogo.nomi, self.piano.quantita_min, self.piano.quantita_max):
+            quantita[nome] = self.rng.randint(quantita_min, quantita_max)
 
         return quantita
 
-    def genera_parametri_casuali(self) -> dict:
+    def genera_parametri_casuali(self, quantita: dict | None = None) -> dict:
         """
         Genera casualmente i parametri operativi della produzione
         Utilizza le variabilità definite nello scenario corrente
 
+        Con un modello di fermi, se le quantità sono indicate si estraggono guasti e riparazioni
+        durante la lavorazione di ogni prodotto e i cambi formato tra i prodotti da lavorare;
+        senza quantità si simula una giornata lavorativa, che prosegue lo stato dei guasti della
+        precedente, e la capacità di ogni linea si riduce in proporzione al tempo di fermo.
+
+        Args:
+            quantita (dict | None): quantità da produrre per prodotto
+
         Returns:
             dict: Parametri di configurazione casuali
         """
         parametri = {}
-        var_tempi = self.scenario_corrente['variabilita_tempi']
-        var_capacita = self.scenario_corrente['variabilita_capacita']
+        var_tempi = self.scenario_corrente.variabilita_tempi
+        var_capacita = self.scenario_corrente.variabilita_capacita
 
-        for prodotto in self.prodotti:
+        for nome, tempo_base, capacita_base in zip(self.catalogo.nomi, self.tempo_scenario, self.capacita_scenario):
             # Variazione casuale del tempo di produzione
-            tempo_base = prodotto['tempo_scenario']
-            variazione = random.uniform(-var_tempi, var_tempi)
+            variazione = self.rng.uniform(-var_tempi, var_tempi)
             tempo_effettivo = tempo_base * (1 + variazione)
 
             # Variazione casuale della capacità
-            capacita_base = prodotto['capacita_scenario']
-            variazione_cap = random.uniform(-var_capacita, var_capacita)
+            variazione_cap = self.rng.uniform(-var_capacita, var_capacita)
             capacita_effettiva = int(capacita_base * (1 + variazione_cap))
 
-            parametri[prodotto['nome']] = {
+            parametri[nome] = {
                 'tempo_produzione_unitario': round(tempo_effettivo, 2),
                 'capacita_giornaliera_effettiva': capacita_effettiva
             }
 
         # Capacità totale con variabilità dello scenario
-        variazione_totale = random.uniform(-var_capacita, var_capacita)
-        capacita_scenario = self.capacita_totale_giornaliera * self.scenario_corrente['efficienza_impianti']
-        parametri['capacita_totale_effettiva'] = int(capacita_scenario * (1 + variazione_totale))
+        variazione_totale = self.rng.uniform(-var_capacita, var_capacita)
+        parametri['capacita_totale_effettiva'] = int(self.piano.capacita_totale_scenario * (1 + variazione_totale))
+
+        if self.fermi is not None:
+            self._campiona_fermi(parametri, quantita)
 
         return parametri
 
-    def get_product_by_name(self, nome: str) -> dict | None:
+    def _campiona_fermi(self, parametri: dict, quantita: dict | None) -> None:
+        """Aggiunge ai parametri guasti, minuti di fermo e cambi formato (vedi genera_parametri_casuali)"""
+        if quantita is not None:
+            for nome, modello in self.fermi.guasti.items():
+                minuti = quantita.get(nome, 0) * parametri[nome]['tempo_produzione_unitario']
+                guasti, fermo = modello.campiona_fermo(self.rng, minuti)
+                parametri[nome]['guasti'] = guasti
+                parametri[nome]['minuti_fermo'] = round(fermo, 2)
+            parametri['minuti_cambio_formato'] = self.fermi.minuti_cambio(
+                [nome for nome in self.catalogo.nomi if quantita.get(nome, 0) > 0])
+            return
+
+        minuti_giornata = self.scenario_corrente.ore_lavorative_giorno * 60
+        if self._stato_fermi is None:
+            self._stato_fermi = {nome: (None, 0.0) for nome in self.fermi.guasti}
+        for nome, modello in self.fermi.guasti.items():
+            guasti, operativi, residuo, riparazione = modello.campiona_giornata(self.rng, minuti_giornata,
+                                                                                *self._stato_fermi[nome])
+            self._stato_fermi[nome] = (residuo, riparazione)
+            parametri[nome]['guasti'] = guasti
+            parametri[nome]['minuti_fermo'] = round(minuti_giornata - operativi, 2)
+            parametri[nome]['capacita_giornaliera_effettiva'] = int(
+                parametri[nome]['capacita_giornaliera_effettiva'] * operativi / minuti_giornata)
+
+    def get_product_by_name(self, nome: str) -> Prodotto:
         """
-        Cerca in una lista di dizionari quello che ha 'nome' uguale al parametro.
-        Ritorna il dizionario trovato oppure None se non esiste.
+        Restituisce il prodotto che ha 'nome' uguale al parametro, tramite l'indice del catalogo (O(1)).
+        Solleva un'eccezione se il prodotto non esiste.
         """
-        for p in self.prodotti:
-            if p.get("nome") == nome:
-                return p
-
-        raise Exception("Prodotto non trovato!")
+        self.strumentazione.conta('ricerca_prodotto')
+        return self.catalogo.prodotti[self.catalogo.indice_di(nome)]
 
     def calcola_tempo_produzione(self, quantita: dict, parametri: dict) -> dict:
         """
@@ -159,11 +207,11 @@ class SimulatoreProduzioneKimbo:
         for nome_prodotto, qta in quantita.items():
             product = self.get_product_by_name(nome_prodotto)
 
-            unita = product['unita_misura']
+            unita = product.unita_misura
 
             # Tempo di produzione per questo prodotto
             tempo_unitario = parametri[nome_prodotto]['tempo_produzione_unitario']
-            tempo_prodotto = qta * tempo_unitario
+            tempo_prodotto = qta * tempo_unitario + parametri[nome_prodotto].get('minuti_fermo', 0)
 
             # Verifica capacità
             capacita_max = parametri[nome_prodotto]['capacita_giornaliera_effettiva']
@@ -185,39 +233,83 @@ class SimulatoreProduzioneKimbo:
                 'capacita_utilizzata_percentuale': round(percentuale_capacita, 1),
                 'capacita_superata': qta > capacita_max
             }
+            if 'guasti' in parametri[nome_prodotto]:
+                risultati['dettagli_prodotti'][nome_prodotto]['guasti'] = parametri[nome_prodotto]['guasti']
+                risultati['dettagli_prodotti'][nome_prodotto]['minuti_fermo'] = parametri[nome_prodotto]['minuti_fermo']
 
             tempo_totale += tempo_prodotto
 
+        # Cambi formato tra i prodotti lavorati (solo con un modello di fermi)
+        if 'minuti_cambio_formato' in parametri:
+            risultati['minuti_cambio_formato'] = parametri['minuti_cambio_formato']
+            tempo_totale += parametri['minuti_cambio_formato']
+
         risultati['tempo_totale_minuti'] = round(tempo_totale, 2)
         risultati['tempo_totale_ore'] = round(tempo_totale / 60, 2)
 
         # Calcola giorni lavorativi in base alle ore dello scenario
-        ore_lavorative = self.scenario_corrente['ore_lavorative_giorno']
+        ore_lavorative = self.scenario_corrente.ore_lavorative_giorno
         if ore_lavorative == 0:
             raise Exception("Impossibile calcolare il tempo totale in giorni. Le ore lavorate sono uguale a zero")
 
         risultati['tempo_totale_giorni'] = round(tempo_totale / (60 * ore_lavorative), 2)
 
+        # Vincolo di capacità totale dell'impianto, oltre a quello di ogni prodotto
+        capacita_totale = parametri['capacita_totale_effettiva']
+        risultati['capacita_totale_superata'] = sum(quantita.values()) > capacita_totale
+        if risultati['capacita_totale_superata']:
+            risultati['vincoli_rispettati'] = False
+
+        # Giorno di completamento con le linee in parallelo (pianificazione ottima, O(n)): ogni prodotto
+        # entro la propria capacità e le unità lavorabili in ore_lavorative, l'impianto entro la capacità totale.
+        # None se un'unità richiede più delle ore lavorative di un giorno
+        capacita = capacita_con_ore([parametri[nome]['capacita_giornaliera_effettiva'] for nome in quantita],
+                                    [parametri[nome]['tempo_produzione_unitario'] for nome in quantita],
+                                    ore_lavorative)
+        if any(q > 0 and c <= 0 for q, c in zip(quantita.values(), capacita)):
+            risultati['giorni_completamento'] = None
+        else:
+            risultati['giorni_completamento'] = giorni_minimi(quantita.values(), capacita, capacita_totale)
+
         return risultati
 
-    def simula_produzione_completa(self) -> dict:
+    def pianifica_produzione(self, quantita: dict, parametri: dict, regola: str = 'giorni',
+                             esatta: bool = False) -> dict:
+        """
+        Piano di produzione giorno per giorno che rispetta la capacità di ogni prodotto, le ore
+        lavorative dello scenario e la capacità totale dell'impianto (vedi pianificazione.pianifica_produzione)
+        """
+        return pianifica_produzione(quantita, parametri, regola, esatta, self.scenario_corrente.ore_lavorative_giorno)
+
+    def simula_produzione_completa(self, stampa: bool = False) -> dict:
         """
         Esegue una simulazione completa del processo produttivo
 
+        Args:
+            stampa (bool): se True visualizza i risultati a console
+
         Returns:
             dict: Risultati completi della simulazione
         """
-        print(f"Descrizione: {self.scenario_corrente['descrizione']}\n")
+        strumentazione = self.strumentazione
+
+        if stampa:
+            print(f"Descrizione: {self.scenario_corrente.descrizione}\n")
 
         # Genera dati casuali
-        quantita = self.genera_quantita_casuali()
-        parametri = self.genera_parametri_casuali()
+        with strumentazione.fase('genera_quantita'):
+            quantita = self.genera_quantita_casuali()
+        with strumentazione.fase('genera_parametri'):
+            parametri = self.genera_parametri_casuali(quantita)
 
         # Calcola tempi di produzione
-        risultati = self.calcola_tempo_produzione(quantita, parametri)
+        with strumentazione.fase('calcola_tempo_produzione'):
+            risultati = self.calcola_tempo_produzione(quantita, parametri)
 
         # Visualizza risultati
-        self.stampa_risultati(quantita, parametri, risultati)
+        if stampa:
+            with strumentazione.fase('stampa_risultati'):
+                self.stampa_risultati(quantita, parametri, risultati)
 
         return {
             'scenario': self.scenario_corrente,
@@ -226,42 +318,175 @@ class SimulatoreProduzioneKimbo:
             'risultati_produzione': risultati
         }
 
-    def stampa_risultati(self, quantita: dict, parametri: dict, risultati: dict) -> None:
+    def simula_monte_carlo(self, n_repliche: int, backend: str = 'auto', conserva_repliche: bool = True) -> dict:
         """
-        Stampa i risultati della simulazione in formato leggibile
+        Esegue n_repliche simulazioni in blocco, senza stampare nulla.
+        Quantità e parametri di tutte le repliche sono generati insieme in vettori piatti
+        e il calcolo di calcola_tempo_produzione è svolto colonna per colonna.
+
+        Args:
+            n_repliche (int): numero di repliche da simulare
+            backend (str): 'auto' (NumPy se installato), 'array' o 'numpy'
+            conserva_repliche (bool): se False restituisce solo le statistiche di sintesi
+
+        Returns:
+            dict: Statistiche di sintesi e, opzionalmente, i vettori per replica
         """
-        print("QUANTITA DA PRODURRE (generate casualmente):")
-        for nome_prodotto, qta in quantita.items():
-            prodotto = self.get_product_by_name(nome_prodotto)
-            unita = prodotto['unita_misura']
-            print(f"  - {nome_prodotto}: {qta:,} {unita}")
-
-        print("\nPARAMETRI OPERATIVI (generati casualmente):")
-        for nome_prodotto, param in parametri.items():
-            if nome_prodotto != 'capacita_totale_effettiva':
-                prodotto = self.get_product_by_name(nome_prodotto)
-                tempo = param['tempo_produzione_unitario']
-                capacita = param['capacita_giornaliera_effettiva']
-                unita = prodotto['unita_misura']
-                print(f"  - {nome_prodotto}: {tempo} min/{unita}, Capacita: {capacita:,} {unita}/giorno")
-
-        print(f"  - Capacita Totale Impianto: {parametri['capacita_totale_effettiva']:,} unita/giorno")
-
-        print("\nRISULTATI PRODUZIONE:")
-        for _, dettaglio in risultati['dettagli_prodotti'].items():
-            print(f"  - {dettaglio['nome']}:")
-            print(f"    Quantita: {dettaglio['quantita']:,} {dettaglio['unita_misura']}")
-            print(f"    Tempo produzione: {formatta_hms(dettaglio['tempo_produzione_ore'])}")
-            print(f"    Capacita utilizzata: {dettaglio['capacita_utilizzata_percentuale']}%")
-            if dettaglio['capacita_superata']:
-                print("    ATTENZIONE: Capacita superata!")
-
-        ore_scenario = self.scenario_corrente['ore_lavorative_giorno']
-        print(f"\nTEMPO TOTALE PRODUZIONE:")
-        print(f"  - {formatta_hms(risultati['tempo_totale_ore'])} ")
-        print(f"  - {risultati['tempo_totale_giorni']} giorni lavorativi ({ore_scenario}h/giorno)")
-
-        if not risultati['vincoli_rispettati']:
-            print("\nAVVISO: Alcuni vincoli di capacita non sono stati rispettati!")
-        else:
-            print("\nTutti i vincoli di capacita sono stati rispettati")
+        colonne = self.genera_colonne_monte_carlo(n_repliche, backend)
+
+        with self.strumentazione.fase('statistiche'):
+            statistiche = riepiloga_repliche(colonne, n_repliche)
+
+        risultati = {
+            'scenario': self.scenario_corrente,
+            'n_repliche': n_repliche,
+            'backend': colonne.pop('backend'),
+            'statistiche': statistiche,
+        }
+
+        if conserva_repliche:
+            colonne.pop('superamenti')
+            risultati['repliche'] = colonne
+
+        return risultati
+
+    def genera_colonne_monte_carlo(self, n_repliche: int, backend: str = 'auto') -> dict:
+        """
+        Genera le colonne grezze di n_repliche simulazioni, senza calcolare le statistiche.
+        Usato da simula_monte_carlo e dall'esecuzione parallela a blocchi.
+
+        Returns:
+            dict: Vettori per replica, conteggio dei superamenti per prodotto e backend usato
+        """
+        self.strumentazione.conta('repliche', n_repliche)
+        with self.strumentazione.fase('monte_carlo_colonne'):
+            colonne = esegui_repliche(self.rng, n_repliche, self.piano, backend)
+        if self.fermi is not None:
+            with self.strumentazione.fase('fermi'):
+                applica_fermi_colonne(colonne, self.fermi, self.rng, self.catalogo.nomi,
+                                      self.scenario_corrente.ore_lavorative_giorno)
+        return colonne
+
+    def genera_repliche(self, n_repliche: int, dimensione_blocco: int = DIMENSIONE_BLOCCO, backend: str = 'auto'):
+        """
+        Generatore che restituisce un record per replica, senza stampare nulla.
+        Le repliche sono calcolate a blocchi, quindi la memoria usata resta costante
+        qualunque sia il numero di repliche richiesto.
+
+        Args:
+            n_repliche (int): numero di repliche da generare
+            dimensione_blocco (int): repliche calcolate insieme per ogni blocco
+            backend (str): 'auto', 'array' o 'numpy'
+
+        Yields:
+            dict: risultati della singola replica
+        """
+        if n_repliche <= 0:
+            raise Exception("Il numero di repliche deve essere maggiore di zero")
+
+        nomi = self.catalogo.nomi
+        replica = 0
+
+        while replica < n_repliche:
+            n_blocco = min(dimensione_blocco, n_repliche - replica)
+            colonne = self.genera_colonne_monte_carlo(n_blocco, backend)
+
+            quantita = colonne['quantita']
+            tempi = colonne['tempo_produzione_ore']
+            ore = colonne['tempo_totale_ore']
+            giorni = colonne['tempo_totale_giorni']
+            vincoli = colonne['vincoli_rispettati']
+            capacita = colonne['capacita_totale_effettiva']
+
+            for i in range(n_blocco):
+                yield {
+                    'replica': replica + i,
+                    'tempo_totale_ore': float(ore[i]),
+                    'tempo_totale_giorni': float(giorni[i]),
+                    'vincoli_rispettati': bool(vincoli[i]),
+                    'capacita_totale_effettiva': int(capacita[i]),
+                    'quantita': {nome: int(quantita[nome][i]) for nome in nomi},
+                    'tempo_produzione_ore': {nome: float(tempi[nome][i]) for nome in nomi},
+                }
+
+            replica += n_blocco
+
+    def simula_orizzonte(self, giorni: int | None, regola: str = 'giorni', sorgente: SorgenteDomanda | None = None):
+        """
+        Generatore che simula un orizzonte di più giorni, restituendo un record per giorno.
+        Ogni giorno arrivano nuove quantità dalla sorgente della domanda e si estraggono nuovi
+        parametri operativi; ciò che non si riesce a produrre per i limiti di capacità (del prodotto
+        o dell'impianto) passa al giorno successivo come arretrato. La memoria non dipende dal numero di giorni.
+
+        Args:
+            giorni (int | None): numero di giorni da simulare (None: fino alla fine della sorgente)
+            regola (str): priorità tra i prodotti quando la capacità dell'impianto non basta
+            sorgente (SorgenteDomanda | None): origine delle quantità giornaliere (default: SorgenteCasuale)
+
+        Yields:
+            RecordGiornaliero: domanda, produzione, arretrato e utilizzo della capacità del giorno
+        """
+        if giorni is not None and giorni <= 0:
+            raise Exception("Il numero di giorni deve essere maggiore di zero")
+
+        nomi = self.catalogo.nomi
+        indici = range(len(nomi))
+        arretrato = [0] * len(nomi)
+        domande = (sorgente or SorgenteCasuale()).giorni(self)
+        if giorni is not None:
+            domande = islice(domande, giorni)
+
+        strumentazione = self.strumentazione
+        self._stato_fermi = None
+        for giorno, domanda in enumerate(domande, start=1):
+            with strumentazione.fase('genera_parametri'):
+                parametri = self.genera_parametri_casuali()
+
+            capacita = [parametri[nome]['capacita_giornaliera_effettiva'] for nome in nomi]
+            tempi = [parametri[nome]['tempo_produzione_unitario'] for nome in nomi]
+            capacita_totale = parametri['capacita_totale_effettiva']
+
+            residui = [a + q for a, q in zip(arretrato, domanda)]
+            superamenti = sum(1 for r, c in zip(residui, capacita) if r > c)
+            capacita_totale_superata = sum(min(r, c) for r, c in zip(residui, capacita)) > capacita_totale
+
+            with strumentazione.fase('pianificazione'):
+                ordine = ordina_per_priorita(regola, residui, capacita, tempi)
+                prodotti_giorno = assegna_giorno(residui, capacita, capacita_totale, ordine)
+            produzione = tuple(prodotti_giorno.get(i, 0) for i in indici)
+            totale = sum(produzione)
+            minuti = sum(p * t for p, t in zip(produzione, tempi))
+            if self.fermi is not None:
+                minuti += self.fermi.minuti_cambio([nome for nome, p in zip(nomi, produzione) if p > 0])
+
+            yield RecordGiornaliero(
+                giorno=giorno,
+                domanda=domanda,
+                produzione=produzione,
+                arretrato=tuple(residui),
+                capacita_utilizzata_percentuale=round(totale / capacita_totale * 100, 1) if capacita_totale > 0 else 0.0,
+                ore_produzione=round(minuti / 60, 2),
+                superamenti=superamenti,
+                capacita_totale_superata=capacita_totale_superata,
+            )
+
+            arretrato = residui
+
+    def stampa_risultati(self, quantita: dict, parametri: dict, risultati: dict, formato: str = 'testo',
+                         livello: str = 'completo', primi: int = PRIMI_DEFAULT, criterio: str = 'capacita',
+                         destinazione=None) -> None:
+        """
+        Stampa i risultati della simulazione in formato leggibile.
+        Il report è reso in memoria e scritto con una sola operazione (vedi entità.report);
+        con livello 'primi' o 'sintesi' la dimensione del report non dipende dal numero di prodotti.
+
+        Args:
+            formato (str): 'testo', 'json' o 'csv'
+            livello (str): 'completo', 'primi' (i primi N prodotti per criterio) o 'sintesi'
+            primi (int): prodotti mostrati con livello 'primi'
+            criterio (str): 'capacita' o 'tempo'
+            destinazione: file su cui scrivere (default: stdout)
+        """
+        dati = dati_report(quantita, parametri, risultati, self.scenario_corrente.ore_lavorative_giorno,
+                           livello, primi, criterio)
+        scrivi_report(rendi_report(dati, formato), destinazione)
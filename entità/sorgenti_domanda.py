@@ -0,0 +1,151 @@
+import csv
+import json
+import mmap
+import os
+
+
+# ===============================================
+# SORGENTI DELLA DOMANDA
+# ===============================================
+DIMENSIONE_BUFFER = 1 << 20  # byte letti dal disco per ogni blocco
+POLITICHE_SCONOSCIUTI = ('errore', 'ignora')
+
+
+class SorgenteDomanda:
+    """
+    Interfaccia delle sorgenti di domanda usate da SimulatoreProduzioneKimbo.simula_orizzonte.
+    Una sorgente produce, giorno per giorno, le quantità da produrre come tupla
+    allineata all'ordine dei prodotti nel catalogo del simulatore.
+    """
+
+    def giorni(self, simulatore):
+        """
+        Generatore delle quantità giornaliere
+
+        Args:
+            simulatore (SimulatoreProduzioneKimbo): simulatore che consuma la domanda
+
+        Yields:
+            tuple[int, ...]: quantità del giorno per ogni prodotto del catalogo
+        """
+        raise Exception(f"{type(self).__name__} non implementa giorni()")
+
+
+class SorgenteCasuale(SorgenteDomanda):
+    """Domanda casuale uniforme nel range_quantita dello scenario (genera_quantita_casuali)"""
+
+    def giorni(self, simulatore):
+        nomi = simulatore.catalogo.nomi
+        while True:
+            quantita = simulatore.genera_quantita_casuali()
+            yield tuple(quantita[nome] for nome in nomi)
+
+
+class _SorgenteStorico(SorgenteDomanda):
+    """
+    Base delle sorgenti che rileggono uno storico ordini riga per riga.
+    Le righe devono essere ordinate per giorno: le righe consecutive con lo stesso giorno
+    formano la domanda di quel giorno, quindi la memoria usata non dipende dalla dimensione del file.
+    """
+
+    def __init__(self, percorso: str, campo_giorno: str = 'data', campo_prodotto: str = 'prodotto',
+                 campo_quantita: str = 'quantita', prodotti_sconosciuti: str = 'errore'):
+        """
+        Args:
+            percorso (str): file dello storico ordini
+            campo_giorno (str): campo con la data o il numero del giorno
+            campo_prodotto (str): campo con il nome del prodotto
+            campo_quantita (str): campo con la quantità ordinata
+            prodotti_sconosciuti (str): 'errore' o 'ignora' per i prodotti assenti dal catalogo
+        """
+        if not os.path.isfile(percorso):
+            raise Exception(f"File della domanda '{percorso}' non trovato")
+        if prodotti_sconosciuti not in POLITICHE_SCONOSCIUTI:
+            raise Exception(f"Politica '{prodotti_sconosciuti}' non supportata. "
+                            f"Valori ammessi: {', '.join(POLITICHE_SCONOSCIUTI)}")
+
+        self.percorso = percorso
+        self.campo_giorno = campo_giorno
+        self.campo_prodotto = campo_prodotto
+        self.campo_quantita = campo_quantita
+        self.prodotti_sconosciuti = prodotti_sconosciuti
+
+    def _righe(self):
+        """Generatore di terne (giorno, prodotto, quantità) lette dal file"""
+        raise Exception(f"{type(self).__name__} non implementa _righe()")
+
+    def giorni(self, simulatore):
+        indice = simulatore.catalogo.indice
+        ignora = self.prodotti_sconosciuti == 'ignora'
+        giorno_corrente = None
+        quantita = [0] * len(indice)
+
+        for giorno, prodotto, qta in self._righe():
+            if giorno != giorno_corrente:
+                if giorno_corrente is not None:
+                    yield tuple(quantita)
+                    quantita = [0] * len(indice)
+                giorno_corrente = giorno
+
+            posizione = indice.get(prodotto)
+            if posizione is None:
+                if ignora:
+                    continue
+                raise Exception(f"Prodotto '{prodotto}' dello storico non presente nel catalogo")
+            quantita[posizione] += qta
+
+        if giorno_corrente is not None:
+            yield tuple(quantita)
+
+
+class SorgenteCSV(_SorgenteStorico):
+    """Storico ordini in CSV con intestazione, letto a blocchi di DIMENSIONE_BUFFER byte"""
+
+    def __init__(self, percorso: str, campo_giorno: str = 'data', campo_prodotto: str = 'prodotto',
+                 campo_quantita: str = 'quantita', prodotti_sconosciuti: str = 'errore',
+                 delimitatore: str = ',', dimensione_buffer: int = DIMENSIONE_BUFFER):
+        super().__init__(percorso, campo_giorno, campo_prodotto, campo_quantita, prodotti_sconosciuti)
+        self.delimitatore = delimitatore
+        self.dimensione_buffer = dimensione_buffer
+
+    def _righe(self):
+        with open(self.percorso, 'r', encoding='utf-8', newline='', buffering=self.dimensione_buffer) as file:
+            lettore = csv.reader(file, delimiter=self.delimitatore)
+            intestazione = next(lettore, None)
+            if intestazione is None:
+                return
+
+            try:
+                colonne = [intestazione.index(c) for c in (self.campo_giorno, self.campo_prodotto, self.campo_quantita)]
+            except ValueError:
+                raise Exception(f"Il file '{self.percorso}' deve avere le colonne "
+                                f"{self.campo_giorno}, {self.campo_prodotto} e {self.campo_quantita}")
+            c_giorno, c_prodotto, c_quantita = colonne
+
+            for riga in lettore:
+                if riga:
+                    yield riga[c_giorno], riga[c_prodotto], int(riga[c_quantita])
+
+
+class SorgenteJSONL(_SorgenteStorico):
+    """Storico ordini in JSON Lines (un ordine per riga), letto tramite mmap senza caricarlo in memoria"""
+
+    def _righe(self):
+        if os.path.getsize(self.percorso) == 0:
+            return
+
+        with open(self.percorso, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mappa:
+            for linea in iter(mappa.readline, b''):
+                if linea.strip():
+                    ordine = json.loads(linea)
+                    yield ordine[self.campo_giorno], ordine[self.campo_prodotto], int(ordine[self.campo_quantita])
+
+
+def apri_sorgente(percorso: str, **opzioni) -> SorgenteDomanda:
+    """Sceglie la sorgente in base all'estensione del file (.csv oppure .jsonl/.json)"""
+    estensione = os.path.splitext(percorso)[1].lower()
+    if estensione == '.csv':
+        return SorgenteCSV(percorso, **opzioni)
+    if estensione in ('.jsonl', '.json'):
+        return SorgenteJSONL(percorso, **opzioni)
+    raise Exception(f"Formato del file '{percorso}' non supportato: usare .csv o .jsonl")
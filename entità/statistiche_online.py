@@ -0,0 +1,302 @@
+import math
+
+from entità.monte_carlo import PERCENTILI, np
+
+
+# ===============================================
+# STATISTICHE IN STREAMING
+# ===============================================
+COMPRESSIONE_DEFAULT = 200
+
+
+def _come_lista(valori) -> list:
+    """Converte un vettore (array.array, ndarray, lista) in lista di float"""
+    if np is not None and isinstance(valori, np.ndarray):
+        return valori.tolist()
+    return list(valori)
+
+
+class DigestQuantili:
+    """
+    Stima dei quantili in stile t-digest con memoria limitata.
+    I valori sono raccolti in un buffer e periodicamente fusi in al più ~compressione centroidi,
+    più fitti sulle code (p95, p99) e più radi al centro. Due digest si possono unire,
+    quindi i risultati di worker diversi si combinano senza conservare i valori.
+    """
+    __slots__ = ('compressione', 'medie', 'pesi', 'buffer', 'minimo', 'massimo')
+
+    def __init__(self, compressione: int = COMPRESSIONE_DEFAULT):
+        self.compressione = compressione
+        self.medie = []
+        self.pesi = []
+        self.buffer = []
+        self.minimo = math.inf
+        self.massimo = -math.inf
+
+    def aggiungi(self, valore: float) -> None:
+        self.buffer.append(valore)
+        if len(self.buffer) >= 5 * self.compressione:
+            self._comprimi()
+
+    def aggiungi_valori(self, valori: list) -> None:
+        self.buffer.extend(valori)
+        if len(self.buffer) >= 5 * self.compressione:
+            self._comprimi()
+
+    def _limite(self, q: float) -> float:
+        """Quantile massimo raggiungibile dal centroide che inizia in q (funzione di scala k1)"""
+        k = self.compressione / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compressione / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compressione) + 1) / 2
+
+    def _comprimi(self, forza: bool = False) -> None:
+        if not self.buffer and not (forza and self.medie):
+            return
+
+        for valore in self.buffer:
+            if valore < self.minimo:
+                self.minimo = valore
+            if valore > self.massimo:
+                self.massimo = valore
+
+        punti = sorted(list(zip(self.medie, self.pesi)) + [(x, 1.0) for x in self.buffer])
+        self.buffer = []
+        totale = math.fsum(p for _, p in punti)
+
+        medie = []
+        pesi = []
+        media_corrente, peso_corrente = punti[0]
+        cumulato = 0.0
+        limite = totale * self._limite(0.0)
+
+        for media, peso in punti[1:]:
+            if cumulato + peso_corrente + peso <= limite:
+                # Fusione nel centroide corrente (media pesata)
+                peso_corrente += peso
+                media_corrente += (media - media_corrente) * peso / peso_corrente
+            else:
+                medie.append(media_corrente)
+                pesi.append(peso_corrente)
+                cumulato += peso_corrente
+                limite = totale * self._limite(cumulato / totale)
+                media_corrente, peso_corrente = media, peso
+
+        medie.append(media_corrente)
+        pesi.append(peso_corrente)
+        self.medie = medie
+        self.pesi = pesi
+
+    def unisci(self, altro: "DigestQuantili") -> None:
+        """Aggiunge a questo digest il contenuto di un altro"""
+        self.minimo = min(self.minimo, altro.minimo)
+        self.massimo = max(self.massimo, altro.massimo)
+        # I centroidi dell'altro digest entrano con il proprio peso, poi si ricomprime
+        self.medie = self.medie + altro.medie
+        self.pesi = self.pesi + altro.pesi
+        self.buffer.extend(altro.buffer)
+        self._comprimi(forza=True)
+
+    def quantile(self, q: float) -> float:
+        """Stima del quantile q (0 <= q <= 1)"""
+        self._comprimi()
+        if not self.medie:
+            return math.nan
+        if len(self.medie) == 1 or q <= 0:
+            return self.minimo if q <= 0 else (self.massimo if q >= 1 else self.medie[0])
+        if q >= 1:
+            return self.massimo
+
+        totale = math.fsum(self.pesi)
+        obiettivo = q * totale
+
+        # Il centro di ogni centroide è nel mezzo del suo peso cumulato
+        centro_precedente = 0.0
+        media_precedente = self.minimo
+        cumulato = 0.0
+        for media, peso in zip(self.medie, self.pesi):
+            centro = cumulato + peso / 2
+            if obiettivo < centro:
+                frazione = (obiettivo - centro_precedente) / (centro - centro_precedente)
+                return media_precedente + (media - media_precedente) * frazione
+            centro_precedente = centro
+            media_precedente = media
+            cumulato += peso
+
+        frazione = (obiettivo - centro_precedente) / (totale - centro_precedente)
+        return media_precedente + (self.massimo - media_precedente) * frazione
+
+
+class StatisticaOnline:
+    """
+    Media e varianza (Welford/Chan), minimo, massimo e quantili di una grandezza,
+    aggiornati valore per valore o a blocchi, in memoria costante e unibili tra worker.
+    """
+    __slots__ = ('n', 'media', 'm2', 'minimo', 'massimo', 'digest')
+
+    def __init__(self, compressione: int = COMPRESSIONE_DEFAULT):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.massimo = -math.inf
+        self.digest = DigestQuantili(compressione)
+
+    def aggiungi(self, valore: float) -> None:
+        """Aggiornamento di Welford con un singolo valore"""
+        self.n += 1
+        delta = valore - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valore - self.media)
+        if valore < self.minimo:
+            self.minimo = valore
+        if valore > self.massimo:
+            self.massimo = valore
+        self.digest.aggiungi(valore)
+
+    def aggiungi_valori(self, valori) -> None:
+        """Aggiornamento con un blocco di valori (formula di Chan), molto più rapido di un ciclo su aggiungi"""
+        valori = _come_lista(valori)
+        n_b = len(valori)
+        if n_b == 0:
+            return
+
+        media_b = math.fsum(valori) / n_b
+        m2_b = math.fsum([(x - media_b) ** 2 for x in valori])
+        self._combina(n_b, media_b, m2_b, min(valori), max(valori))
+        self.digest.aggiungi_valori(valori)
+
+    def _combina(self, n_b: int, media_b: float, m2_b: float, minimo_b: float, massimo_b: float) -> None:
+        n = self.n + n_b
+        delta = media_b - self.media
+        self.media += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+        self.minimo = min(self.minimo, minimo_b)
+        self.massimo = max(self.massimo, massimo_b)
+
+    def unisci(self, altra: "StatisticaOnline") -> None:
+        """Unisce le statistiche calcolate da un altro worker"""
+        if altra.n == 0:
+            return
+        self._combina(altra.n, altra.media, altra.m2, altra.minimo, altra.massimo)
+        self.digest.unisci(altra.digest)
+
+    @property
+    def varianza(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def deviazione_standard(self) -> float:
+        return math.sqrt(self.varianza)
+
+    def quantile(self, q: float) -> float:
+        return self.digest.quantile(q)
+
+    def riepilogo(self) -> dict:
+        """Stesse chiavi di monte_carlo.calcola_statistiche (percentili stimati)"""
+        if self.n == 0:
+            raise Exception("Impossibile calcolare le statistiche di un vettore vuoto")
+
+        statistiche = {
+            'media': self.media,
+            'deviazione_standard': self.deviazione_standard,
+            'minimo': float(self.minimo),
+            'massimo': float(self.massimo),
+        }
+        for p in PERCENTILI:
+            statistiche[f'p{p}'] = self.quantile(p / 100)
+
+        return statistiche
+
+
+class AggregatoreRepliche:
+    """
+    Aggrega i risultati delle repliche man mano che terminano, per prodotto e in totale.
+    La memoria dipende dal numero di prodotti, non dal numero di repliche.
+    """
+    __slots__ = ('n_repliche', 'tempo_totale_ore', 'tempo_totale_giorni', 'violazioni',
+                 'tempi_prodotti', 'quantita_prodotti', 'superamenti', 'compressione')
+
+    def __init__(self, compressione: int = COMPRESSIONE_DEFAULT):
+        self.compressione = compressione
+        self.n_repliche = 0
+        self.tempo_totale_ore = StatisticaOnline(compressione)
+        self.tempo_totale_giorni = StatisticaOnline(compressione)
+        self.violazioni = 0
+        self.tempi_prodotti = {}
+        self.quantita_prodotti = {}
+        self.superamenti = {}
+
+    def _prodotto(self, nome: str) -> None:
+        if nome not in self.tempi_prodotti:
+            self.tempi_prodotti[nome] = StatisticaOnline(self.compressione)
+            self.quantita_prodotti[nome] = 0
+            self.superamenti[nome] = 0
+
+    def aggiorna(self, risultati: dict) -> None:
+        """
+        Aggiunge una replica a partire dal dizionario restituito da calcola_tempo_produzione
+        """
+        self.n_repliche += 1
+        self.tempo_totale_ore.aggiungi(risultati['tempo_totale_ore'])
+        self.tempo_totale_giorni.aggiungi(risultati['tempo_totale_giorni'])
+        if not risultati['vincoli_rispettati']:
+            self.violazioni += 1
+
+        for nome, dettaglio in risultati['dettagli_prodotti'].items():
+            self._prodotto(nome)
+            self.tempi_prodotti[nome].aggiungi(dettaglio['tempo_produzione_ore'])
+            self.quantita_prodotti[nome] += dettaglio['quantita']
+            if dettaglio['capacita_superata']:
+                self.superamenti[nome] += 1
+
+    def aggiorna_colonne(self, colonne: dict) -> None:
+        """
+        Aggiunge un blocco di repliche a partire dalle colonne di genera_colonne_monte_carlo
+        """
+        n = len(colonne['tempo_totale_ore'])
+        self.n_repliche += n
+        self.tempo_totale_ore.aggiungi_valori(colonne['tempo_totale_ore'])
+        self.tempo_totale_giorni.aggiungi_valori(colonne['tempo_totale_giorni'])
+        self.violazioni += n - int(sum(_come_lista(colonne['vincoli_rispettati'])))
+
+        for nome, tempi in colonne['tempo_produzione_ore'].items():
+            self._prodotto(nome)
+            self.tempi_prodotti[nome].aggiungi_valori(tempi)
+            self.quantita_prodotti[nome] += int(sum(_come_lista(colonne['quantita'][nome])))
+            self.superamenti[nome] += colonne['superamenti'][nome]
+
+    def unisci(self, altro: "AggregatoreRepliche") -> None:
+        """Unisce l'aggregato di un altro worker"""
+        self.n_repliche += altro.n_repliche
+        self.tempo_totale_ore.unisci(altro.tempo_totale_ore)
+        self.tempo_totale_giorni.unisci(altro.tempo_totale_giorni)
+        self.violazioni += altro.violazioni
+
+        for nome, statistica in altro.tempi_prodotti.items():
+            self._prodotto(nome)
+            self.tempi_prodotti[nome].unisci(statistica)
+            self.quantita_prodotti[nome] += altro.quantita_prodotti[nome]
+            self.superamenti[nome] += altro.superamenti[nome]
+
+    def riepilogo(self) -> dict:
+        """Stessa struttura di monte_carlo.riepiloga_repliche"""
+        if self.n_repliche == 0:
+            raise Exception("Nessuna replica aggregata")
+
+        statistiche = {
+            'tempo_totale_ore': self.tempo_totale_ore.riepilogo(),
+            'tempo_totale_giorni': self.tempo_totale_giorni.riepilogo(),
+            'percentuale_vincoli_violati': self.violazioni / self.n_repliche * 100,
+            'prodotti': {},
+        }
+
+        for nome, statistica in self.tempi_prodotti.items():
+            statistiche['prodotti'][nome] = {
+                'quantita_media': self.quantita_prodotti[nome] / self.n_repliche,
+                'tempo_produzione_ore': statistica.riepilogo(),
+                'percentuale_capacita_superata': self.superamenti[nome] / self.n_repliche * 100,
+            }
+
+        return statistiche
@@ -0,0 +1,272 @@
+from statistics import NormalDist
+import heapq
+import math
+
+from entità.configurazione_prodotti import CatalogoProdotti
+from entità.configurazione_scenari import Scenario
+from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+from entità.monte_carlo import PERCENTILI
+from entità.piano_scenario import compila_piano
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+
+
+# ===============================================
+# STIMA ANALITICA SENZA CAMPIONAMENTO
+# ===============================================
+# Il modello delle repliche in blocco (monte_carlo.esegui_repliche, valori non arrotondati):
+#   Q_i ~ intero uniforme in [quantita_min_i, quantita_max_i]
+#   T_i = tempo_scenario_i * (1 + U(-variabilita_tempi, variabilita_tempi))
+#   C_i = int(capacita_scenario_i * (1 + U(-variabilita_capacita, variabilita_capacita)))
+#   tempo_totale_ore = sum_i Q_i * T_i / 60, con tutte le variabili indipendenti
+QUANTILI_NORMALI = {p: NormalDist().inv_cdf(p / 100) for p in PERCENTILI}
+RADICE_2 = math.sqrt(2)
+RADICE_2_PI = math.sqrt(2 * math.pi)
+
+
+def _coda_normale(z: float) -> float:
+    """P(Z > z) per una normale standard"""
+    return 0.5 * math.erfc(z / RADICE_2)
+
+
+def _integrale_cdf_normale(z: float) -> float:
+    """Primitiva della funzione di ripartizione normale: z * Phi(z) + phi(z)"""
+    return z * (1 - _coda_normale(z)) + math.exp(-z * z / 2) / RADICE_2_PI
+
+
+def _probabilita_superamento(q_min: int, q_max: int, capacita: float, variabilita: float) -> float:
+    """
+    P(Q > int(X)), esatta, con Q intero uniforme in [q_min, q_max] e X uniforme in
+    [capacita * (1 - variabilita), capacita * (1 + variabilita)).
+    Per Q intero vale Q > int(X) <=> X < Q, quindi P = media su q di P(X < q): la somma
+    della parte lineare si calcola in forma chiusa, senza ciclare sui valori di q.
+    """
+    n = q_max - q_min + 1
+    inizio = capacita * (1 - variabilita)
+    ampiezza = 2 * variabilita * capacita
+
+    if ampiezza <= 0:
+        return max(0, q_max - max(q_min - 1, int(inizio))) / n
+
+    fine = inizio + ampiezza
+    # q in (inizio, fine): contributo (q - inizio) / ampiezza
+    basso = max(q_min, math.floor(inizio) + 1)
+    alto = min(q_max, math.ceil(fine) - 1)
+    lineare = 0.0
+    if alto >= basso:
+        conteggio = alto - basso + 1
+        lineare = conteggio * ((basso + alto) / 2 - inizio) / ampiezza
+    # q >= fine: contributo 1
+    certi = max(0, q_max - max(q_min, math.ceil(fine)) + 1)
+    return (lineare + certi) / n
+
+
+def _probabilita_somma_oltre(media: float, varianza: float, capacita: float, variabilita: float) -> float:
+    """
+    P(S > int(X)) con S somma intera approssimata da una normale e X uniforme come sopra:
+    media su X della coda normale, integrata in forma chiusa
+    """
+    inizio = capacita * (1 - variabilita)
+    ampiezza = 2 * variabilita * capacita
+    sigma = math.sqrt(varianza)
+
+    if sigma == 0:
+        if ampiezza <= 0:
+            return float(media > int(inizio))
+        return min(1.0, max(0.0, (media - inizio) / ampiezza))
+    if ampiezza <= 0:
+        return _coda_normale((int(inizio) + 0.5 - media) / sigma)
+
+    z_inizio = (inizio - media) / sigma
+    z_fine = (inizio + ampiezza - media) / sigma
+    integrale_cdf = sigma * (_integrale_cdf_normale(z_fine) - _integrale_cdf_normale(z_inizio))
+    return min(1.0, max(0.0, 1 - integrale_cdf / ampiezza))
+
+
+def stima_analitica(scenario: Scenario | dict, prodotti) -> dict:
+    """
+    Media, varianza e probabilità di superamento della capacità in forma chiusa, senza repliche
+
+    Media e varianza di tempo_totale_ore sono esatte (somma di prodotti di uniformi indipendenti),
+    come le probabilità di superamento della capacità di ogni prodotto. La capacità totale
+    dell'impianto e i percentili usano l'approssimazione normale della somma; la probabilità
+    di violare almeno un vincolo tratta gli eventi come indipendenti ed è accompagnata dai
+    limiti esatti (massimo delle singole probabilità, somma delle probabilità).
+
+    Args:
+        scenario (Scenario | dict): scenario produttivo
+        prodotti: catalogo o lista di prodotti
+
+    Returns:
+        dict: stessa struttura delle statistiche di simula_monte_carlo, più varianze e limiti
+    """
+    scenario = Scenario.da_valore(scenario)
+    catalogo = CatalogoProdotti.da_prodotti(prodotti)
+    piano = compila_piano(scenario, catalogo, ConfigurazioneStabilimento.capacita_totale_giornaliera)
+
+    ore_lavorative = scenario.ore_lavorative_giorno
+    if ore_lavorative == 0:
+        raise Exception("Impossibile calcolare il tempo totale in giorni. Le ore lavorate sono uguale a zero")
+
+    var_tempi = scenario.variabilita_tempi
+    var_capacita = scenario.variabilita_capacita
+    # Momento secondo di (1 + U(-v, v)): 1 + v^2 / 3
+    momento_tempi = 1 + var_tempi * var_tempi / 3
+
+    media_minuti = 0.0
+    varianza_minuti = 0.0
+    minimo_minuti = 0.0
+    massimo_minuti = 0.0
+    media_quantita = 0.0
+    varianza_quantita = 0.0
+    probabilita_rispetto = 1.0
+    probabilita_prodotti = []
+    risultati_prodotti = {}
+
+    for nome, q_min, q_max, tempo, capacita in zip(catalogo.nomi, piano.quantita_min, piano.quantita_max,
+                                                   piano.tempo_scenario, piano.capacita_scenario):
+        n = q_max - q_min + 1
+        media_q = (q_min + q_max) / 2
+        varianza_q = (n * n - 1) / 12
+
+        # Var(Q T) = E[Q^2] E[T^2] - E[Q]^2 E[T]^2 per Q e T indipendenti
+        media_p = media_q * tempo
+        varianza_p = (varianza_q + media_q * media_q) * tempo * tempo * momento_tempi - media_p * media_p
+
+        probabilita = _probabilita_superamento(q_min, q_max, capacita, var_capacita)
+        probabilita_prodotti.append(probabilita)
+        probabilita_rispetto *= 1 - probabilita
+
+        media_minuti += media_p
+        varianza_minuti += varianza_p
+        minimo_minuti += q_min * tempo * (1 - var_tempi)
+        massimo_minuti += q_max * tempo * (1 + var_tempi)
+        media_quantita += media_q
+        varianza_quantita += varianza_q
+
+        risultati_prodotti[nome] = {
+            'quantita_media': media_q,
+            'tempo_produzione_ore': {
+                'media': media_p / 60,
+                'varianza': varianza_p / 3600,
+                'deviazione_standard': math.sqrt(max(0.0, varianza_p)) / 60,
+            },
+            'percentuale_capacita_superata': probabilita * 100,
+        }
+
+    if len(catalogo) == 1:
+        probabilita_totale = _probabilita_superamento(piano.quantita_min[0], piano.quantita_max[0],
+                                                      piano.capacita_totale_scenario, var_capacita)
+    else:
+        probabilita_totale = _probabilita_somma_oltre(media_quantita, varianza_quantita,
+                                                      piano.capacita_totale_scenario, var_capacita)
+
+    media_ore = media_minuti / 60
+    varianza_ore = max(0.0, varianza_minuti) / 3600
+    deviazione_ore = math.sqrt(varianza_ore)
+
+    tempo_totale_ore = {
+        'media': media_ore,
+        'varianza': varianza_ore,
+        'deviazione_standard': deviazione_ore,
+        'minimo': minimo_minuti / 60,
+        'massimo': massimo_minuti / 60,
+    }
+    for p, z in QUANTILI_NORMALI.items():
+        tempo_totale_ore[f'p{p}'] = min(tempo_totale_ore['massimo'], max(tempo_totale_ore['minimo'], media_ore + z * deviazione_ore))
+
+    tutte = probabilita_prodotti + [probabilita_totale]
+    return {
+        'scenario': scenario,
+        'tempo_totale_ore': tempo_totale_ore,
+        'tempo_totale_giorni': {
+            'media': media_ore / ore_lavorative,
+            'deviazione_standard': deviazione_ore / ore_lavorative,
+        },
+        'percentuale_capacita_totale_superata': probabilita_totale * 100,
+        'percentuale_vincoli_violati': (1 - probabilita_rispetto * (1 - probabilita_totale)) * 100,
+        'limiti_vincoli_violati': (max(tutte) * 100, min(1.0, sum(tutte)) * 100),
+        'prodotti': risultati_prodotti,
+    }
+
+
+def probabilita_oltre(stima: dict, soglia_ore: float) -> dict:
+    """
+    Probabilità che tempo_totale_ore superi soglia_ore
+
+    Returns:
+        dict: stima con l'approssimazione normale e limite superiore garantito, il minore tra
+              Hoeffding (termini limitati tra minimo e massimo) e Cantelli (solo la varianza)
+    """
+    ore = stima['tempo_totale_ore']
+    if soglia_ore >= ore['massimo']:
+        return {'normale': 0.0, 'limite_superiore': 0.0}
+    if soglia_ore < ore['minimo']:
+        return {'normale': 1.0, 'limite_superiore': 1.0}
+
+    scarto = soglia_ore - ore['media']
+    sigma = ore['deviazione_standard']
+    normale = _coda_normale(scarto / sigma) if sigma > 0 else float(scarto < 0)
+    if scarto <= 0:
+        return {'normale': normale, 'limite_superiore': 1.0}
+
+    # Hoeffding con l'ampiezza complessiva come somma delle ampiezze dei singoli termini
+    ampiezza = ore['massimo'] - ore['minimo']
+    hoeffding = math.exp(-2 * scarto * scarto / (ampiezza * ampiezza)) if ampiezza > 0 else 0.0
+    cantelli = ore['varianza'] / (ore['varianza'] + scarto * scarto)
+    return {'normale': normale, 'limite_superiore': min(hoeffding, cantelli)}
+
+
+def seleziona_scenari(scenari: list[Scenario | dict], prodotti, n_selezionati: int = 10,
+                      criterio: str = 'p95', violazioni_massime: float | None = None) -> list[dict]:
+    """
+    Screening di molti scenari candidati: stima analitica di ciascuno e selezione dei migliori
+    (tempo_totale_ore minore secondo il criterio) da verificare poi con la simulazione
+
+    Args:
+        scenari (list): scenari candidati
+        prodotti: catalogo o lista di prodotti
+        n_selezionati (int): dimensione della lista ristretta
+        criterio (str): statistica di tempo_totale_ore da minimizzare ('media', 'p50', 'p95', 'p99')
+        violazioni_massime (float | None): scarta gli scenari con percentuale_vincoli_violati maggiore
+
+    Returns:
+        list[dict]: stime analitiche degli scenari selezionati, dalla migliore
+    """
+    criteri = ('media',) + tuple(f'p{p}' for p in PERCENTILI)
+    if criterio not in criteri:
+        raise Exception(f"Criterio '{criterio}' non supportato. Valori ammessi: {', '.join(criteri)}")
+
+    catalogo = CatalogoProdotti.da_prodotti(prodotti)
+    stime = (stima_analitica(s, catalogo) for s in scenari)
+    if violazioni_massime is not None:
+        stime = (s for s in stime if s['percentuale_vincoli_violati'] <= violazioni_massime)
+    return heapq.nsmallest(n_selezionati, stime, key=lambda s: s['tempo_totale_ore'][criterio])
+
+
+def verifica_monte_carlo(scenario: Scenario | dict, prodotti, n_repliche: int = 100_000, seed: int | None = 0,
+                         backend: str = 'auto') -> dict:
+    """
+    Confronta la stima analitica con simula_monte_carlo sullo stesso scenario
+
+    Returns:
+        dict: stima analitica, statistiche simulate e scarto della media in errori standard
+    """
+    stima = stima_analitica(scenario, prodotti)
+    simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, seed)
+    statistiche = simulatore.simula_monte_carlo(n_repliche, backend, conserva_repliche=False)['statistiche']
+
+    ore_stimate = stima['tempo_totale_ore']
+    ore_simulate = statistiche['tempo_totale_ore']
+    errore_standard = ore_stimate['deviazione_standard'] / math.sqrt(n_repliche)
+    scarto = ore_simulate['media'] - ore_stimate['media']
+
+    return {
+        'n_repliche': n_repliche,
+        'analitica': stima,
+        'monte_carlo': statistiche,
+        'scarto_media_ore': scarto,
+        'scarto_media_errori_standard': scarto / errore_standard if errore_standard > 0 else 0.0,
+        'rapporto_deviazione_standard': (ore_simulate['deviazione_standard'] / ore_stimate['deviazione_standard']
+                                         if ore_stimate['deviazione_standard'] > 0 else None),
+        'scarto_vincoli_violati': statistiche['percentuale_vincoli_violati'] - stima['percentuale_vincoli_violati'],
+    }
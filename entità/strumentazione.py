@@ -0,0 +1,211 @@
+from contextlib import contextmanager, nullcontext
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+
+# ===============================================
+# STRUMENTAZIONE PER FASI
+# ===============================================
+RIGHE_PROFILO = 25
+
+
+class _Fase:
+    """
+    Misure di una fase: chiamate, tempo reale, tempo CPU e memoria allocata.
+    Un oggetto per nome di fase, riusato ad ogni ingresso: le fasi non devono annidarsi in sé stesse.
+    Con fasi annidate di nome diverso il picco di memoria della fase esterna riparte da ogni fase interna.
+    """
+    __slots__ = ('allocazioni', 'chiamate', 'secondi', 'secondi_cpu', 'byte_allocati', 'picco_byte',
+                 '_inizio', '_inizio_cpu', '_inizio_memoria')
+
+    def __init__(self, allocazioni: bool):
+        self.allocazioni = allocazioni
+        self.chiamate = 0
+        self.secondi = 0.0
+        self.secondi_cpu = 0.0
+        self.byte_allocati = 0
+        self.picco_byte = 0
+
+    def __enter__(self):
+        if self.allocazioni:
+            tracemalloc.reset_peak()
+            self._inizio_memoria = tracemalloc.get_traced_memory()[0]
+        self._inizio_cpu = time.process_time()
+        self._inizio = time.perf_counter()
+        return self
+
+    def __exit__(self, *eccezione):
+        self.secondi += time.perf_counter() - self._inizio
+        self.secondi_cpu += time.process_time() - self._inizio_cpu
+        self.chiamate += 1
+        if self.allocazioni:
+            attuale, picco = tracemalloc.get_traced_memory()
+            self.byte_allocati += max(0, attuale - self._inizio_memoria)
+            self.picco_byte = max(self.picco_byte, picco - self._inizio_memoria)
+        return False
+
+    def unisci(self, altra: "_Fase") -> None:
+        self.chiamate += altra.chiamate
+        self.secondi += altra.secondi
+        self.secondi_cpu += altra.secondi_cpu
+        self.byte_allocati += altra.byte_allocati
+        self.picco_byte = max(self.picco_byte, altra.picco_byte)
+
+    def a_dict(self) -> dict:
+        misure = {
+            'chiamate': self.chiamate,
+            'secondi': self.secondi,
+            'secondi_cpu': self.secondi_cpu,
+            'secondi_medi': self.secondi / self.chiamate if self.chiamate else 0.0,
+        }
+        if self.allocazioni:
+            misure['byte_allocati'] = self.byte_allocati
+            misure['picco_byte'] = self.picco_byte
+        return misure
+
+
+class Strumentazione:
+    """
+    Raccoglie tempi per fase, contatori e, su richiesta, allocazioni (tracemalloc) e profilo (cProfile).
+    Le strumentazioni dei worker paralleli si uniscono con unisci() in un unico report.
+
+    Esempio:
+        strumentazione = Strumentazione(allocazioni=True)
+        simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, 1, strumentazione=strumentazione)
+        simulatore.simula_produzione_completa()
+        strumentazione.report()
+    """
+    attiva = True
+
+    def __init__(self, allocazioni: bool = False, profilo: bool = False):
+        """
+        Args:
+            allocazioni (bool): misura la memoria allocata da ogni fase (rallenta l'esecuzione)
+            profilo (bool): abilita profila() con cProfile
+        """
+        self.allocazioni = allocazioni
+        self.profilo = profilo
+        self.fasi = {}
+        self.contatori = {}
+        self.statistiche_profilo = {}
+
+        if allocazioni and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def fase(self, nome: str) -> _Fase:
+        """Context manager che misura il blocco come fase 'nome'"""
+        fase = self.fasi.get(nome)
+        if fase is None:
+            fase = self.fasi[nome] = _Fase(self.allocazioni)
+        return fase
+
+    def conta(self, nome: str, quantita: int = 1) -> None:
+        self.contatori[nome] = self.contatori.get(nome, 0) + quantita
+
+    @contextmanager
+    def profila(self):
+        """Profila con cProfile il blocco, se la strumentazione è stata creata con profilo=True"""
+        if not self.profilo:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.create_stats()
+            self._unisci_profilo(profiler.stats)
+
+    def _unisci_profilo(self, statistiche: dict) -> None:
+        for funzione, valori in statistiche.items():
+            precedenti = self.statistiche_profilo.get(funzione, (0, 0, 0, 0, {}))
+            self.statistiche_profilo[funzione] = pstats.add_func_stats(precedenti, valori)
+
+    def unisci(self, altra: "Strumentazione") -> None:
+        """Aggiunge le misure di un'altra strumentazione (es. di un worker)"""
+        if not altra.attiva:
+            return
+        for nome, fase in altra.fasi.items():
+            if nome not in self.fasi:
+                self.fasi[nome] = _Fase(fase.allocazioni)
+            self.fasi[nome].unisci(fase)
+        for nome, quantita in altra.contatori.items():
+            self.conta(nome, quantita)
+        self._unisci_profilo(altra.statistiche_profilo)
+
+    def __getstate__(self) -> dict:
+        # Solo i dati raccolti: tracemalloc e cProfile restano nel processo che li ha avviati
+        return {
+            'allocazioni': self.allocazioni,
+            'profilo': self.profilo,
+            'fasi': self.fasi,
+            'contatori': self.contatori,
+            'statistiche_profilo': self.statistiche_profilo,
+        }
+
+    def __setstate__(self, stato: dict) -> None:
+        self.__dict__.update(stato)
+
+    def testo_profilo(self, righe: int = RIGHE_PROFILO) -> str | None:
+        """Funzioni più costose (tempo cumulativo) del profilo raccolto, in formato pstats"""
+        if not self.statistiche_profilo:
+            return None
+
+        flusso = io.StringIO()
+        statistiche = pstats.Stats(stream=flusso)
+        statistiche.stats = dict(self.statistiche_profilo)
+        statistiche.get_top_level_stats()
+        statistiche.sort_stats('cumulative').print_stats(righe)
+        return flusso.getvalue()
+
+    def report(self, righe_profilo: int = RIGHE_PROFILO) -> dict:
+        """
+        Returns:
+            dict: misure per fase (ordinate per tempo decrescente), contatori e profilo testuale
+        """
+        fasi = sorted(self.fasi.items(), key=lambda voce: voce[1].secondi, reverse=True)
+        return {
+            'fasi': {nome: fase.a_dict() for nome, fase in fasi},
+            'contatori': dict(self.contatori),
+            'profilo': self.testo_profilo(righe_profilo),
+        }
+
+    def stampa_report(self, destinazione=None) -> None:
+        """Stampa il report in forma tabellare"""
+        report = self.report()
+        righe = [f"{'fase':<28} {'chiamate':>10} {'secondi':>10} {'cpu':>10} {'media ms':>10}"]
+        for nome, misure in report['fasi'].items():
+            righe.append(f"{nome:<28} {misure['chiamate']:>10} {misure['secondi']:>10.4f} "
+                         f"{misure['secondi_cpu']:>10.4f} {misure['secondi_medi'] * 1e3:>10.4f}")
+            if 'byte_allocati' in misure:
+                righe.append(f"{'':<28} allocati {misure['byte_allocati']:,} byte, picco {misure['picco_byte']:,} byte")
+        for nome, quantita in report['contatori'].items():
+            righe.append(f"{nome:<28} {quantita:>10}")
+        if report['profilo']:
+            righe.append(report['profilo'])
+
+        print('\n'.join(righe), file=destinazione)
+
+
+class _StrumentazioneDisattivata:
+    """Strumentazione che non misura nulla: ogni metodo costa una sola chiamata vuota"""
+    __slots__ = ()
+    attiva = False
+    _contesto = nullcontext()
+
+    def fase(self, nome: str):
+        return self._contesto
+
+    def conta(self, nome: str, quantita: int = 1) -> None:
+        pass
+
+    def profila(self):
+        return self._contesto
+
+
+STRUMENTAZIONE_DISATTIVATA = _StrumentazioneDisattivata()
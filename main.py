@@ -1,6 +1,10 @@
-from entità.configurazione_scenari import ConfigurazioneScenari
-from entità.configurazione_prodotti import ConfigurazioneProdotti
+import sys
+
+from entità.configurazione_scenari import ConfigurazioneScenari, Scenario
+from entità.configurazione_prodotti import ConfigurazioneProdotti, Prodotto
 from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+from entità.confronto_scenari import confronta_scenari_multipli
+from entità.cache_risultati import CacheRisultati
 
 
 # ===============================================
@@ -31,12 +35,12 @@ def visualizza_scenari(configurazione_scenari: ConfigurazioneScenari) -> None:
     scenari = configurazione_scenari.get_scenari_disponibili()
 
     for i, scenario in enumerate(scenari, 1):
-        print(f"\n{i}. {scenario['nome']}")
-        print(f"   Descrizione: {scenario['descrizione']}")
-        print(f"   Ore lavorative/giorno: {scenario['ore_lavorative_giorno']}h")
-        print(f"   Turni/giorno: {scenario['turni_giorno']}")
-        print(f"   Efficienza impianti: {scenario['efficienza_impianti'] * 100:.0f}%")
-        print(f"   Range quantita: {scenario['range_quantita'][0] * 100:.0f}%-{scenario['range_quantita'][1] * 100:.0f}%")
+        print(f"\n{i}. {scenario.nome}")
+        print(f"   Descrizione: {scenario.descrizione}")
+        print(f"   Ore lavorative/giorno: {scenario.ore_lavorative_giorno}h")
+        print(f"   Turni/giorno: {scenario.turni_giorno}")
+        print(f"   Efficienza impianti: {scenario.efficienza_impianti * 100:.0f}%")
+        print(f"   Range quantita: {scenario.range_quantita[0] * 100:.0f}%-{scenario.range_quantita[1] * 100:.0f}%")
 
     input("\nPremere INVIO per tornare al menu principale...")
 
@@ -49,14 +53,14 @@ def visualizza_prodotti(configurazione_prodotti: ConfigurazioneProdotti) -> None
     prodotti = configurazione_prodotti.get_prodotti()
 
     for i, prodotto in enumerate(prodotti, 1):
-        print(f"\n{i}. {prodotto['nome']}")
-        print(f"   Unità di misura: {prodotto['unita_misura']}")
-        print(f"   Tempo base di produzione: {prodotto['tempo_base_produzione']}m")
-        print(f"   Capacità massima giornaliera: {prodotto['capacita_max_giornaliera']}")
+        print(f"\n{i}. {prodotto.nome}")
+        print(f"   Unità di misura: {prodotto.unita_misura}")
+        print(f"   Tempo base di produzione: {prodotto.tempo_base_produzione}m")
+        print(f"   Capacità massima giornaliera: {prodotto.capacita_max_giornaliera}")
 
     input("\nPremere INVIO per tornare al menu principale...")
 
-def crea_scenario_personalizzato() -> dict | None:
+def crea_scenario_personalizzato() -> Scenario | None:
     """Permette all'utente di creare un nuovo scenario personalizzato"""
     print("\n" + "=" * 50)
     print("CREAZIONE SCENARIO PERSONALIZZATO")
@@ -108,16 +112,16 @@ def crea_scenario_personalizzato() -> dict | None:
             raise Exception("Errore inserimento 'range_max'")
         range_max = max(range_min, min(1.0, range_max))
 
-        scenario_personalizzato = {
-            'nome': nome,
-            'descrizione': descrizione,
-            'ore_lavorative_giorno': ore_lavorative,
-            'turni_giorno': turni,
-            'efficienza_impianti': efficienza,
-            'variabilita_tempi': var_tempi,
-            'variabilita_capacita': var_capacita,
-            'range_quantita': (range_min, range_max),
-        }
+        scenario_personalizzato = Scenario(
+            nome=nome,
+            descrizione=descrizione,
+            ore_lavorative_giorno=ore_lavorative,
+            turni_giorno=turni,
+            efficienza_impianti=efficienza,
+            variabilita_tempi=var_tempi,
+            variabilita_capacita=var_capacita,
+            range_quantita=(range_min, range_max),
+        )
 
         return scenario_personalizzato
 
@@ -128,7 +132,7 @@ def crea_scenario_personalizzato() -> dict | None:
         print("\nOperazione annullata.")
         return None
 
-def crea_prodotto() -> dict | None:
+def crea_prodotto() -> Prodotto | None:
     """Permette all'utente di creare un nuovo prodotto"""
     print("\n" + "=" * 50)
     print("CREAZIONE PRODOTTO")
@@ -151,12 +155,12 @@ def crea_prodotto() -> dict | None:
         if not capacita_max_giornaliera or capacita_max_giornaliera < 0:
             raise Exception("Errore inserimento 'Capacità massima giornaliera")
 
-        prodotto_personalizzato = {
-            'nome': nome,
-            'unita_misura': unita_misura,
-            'tempo_base_produzione': tempo_base_produzione,
-            'capacita_max_giornaliera': capacita_max_giornaliera
-        }
+        prodotto_personalizzato = Prodotto(
+            nome=nome,
+            unita_misura=unita_misura,
+            tempo_base_produzione=tempo_base_produzione,
+            capacita_max_giornaliera=capacita_max_giornaliera
+        )
 
         return prodotto_personalizzato
 
@@ -167,7 +171,7 @@ def crea_prodotto() -> dict | None:
         print("\nOperazione annullata.")
         return None
 
-def seleziona_scenario(configurazione_scenari: ConfigurazioneScenari) -> dict | None:
+def seleziona_scenario(configurazione_scenari: ConfigurazioneScenari) -> Scenario | None:
     """Permette all'utente di selezionare uno scenario per la simulazione"""
 
     print("\n" + "=" * 50)
@@ -178,7 +182,7 @@ def seleziona_scenario(configurazione_scenari: ConfigurazioneScenari) -> dict |
 
     print("Scenari predefiniti:")
     for i, scenario in enumerate(scenari, 1):
-        print(f"{i}. {scenario['nome']}")
+        print(f"{i}. {scenario.nome}")
 
     print("0. Torna al menu principale")
 
@@ -200,18 +204,28 @@ def seleziona_scenario(configurazione_scenari: ConfigurazioneScenari) -> dict |
         print("\nOperazione annullata.")
         return None
 
-def esegui_simulazione(configurazione_scenari: ConfigurazioneScenari, configurazione_prodotti: ConfigurazioneProdotti) -> None:
-    """Esegue una simulazione con lo scenario selezionato"""
+def esegui_simulazione(configurazione_scenari: ConfigurazioneScenari, configurazione_prodotti: ConfigurazioneProdotti,
+                       cache: CacheRisultati | None = None) -> None:
+    """Esegue una simulazione con lo scenario selezionato (dalla cache se già eseguita con lo stesso seed)"""
     scenario = seleziona_scenario(configurazione_scenari)
     prodotti = configurazione_prodotti.get_prodotti()
     if scenario is None:
         return
-    print(f"\nEsecuzione simulazione con scenario: {scenario['nome']}")
+    print(f"\nEsecuzione simulazione con scenario: {scenario.nome}")
     print("-" * 50)
 
     try:
         simulatore = SimulatoreProduzioneKimbo(scenario, prodotti, 123)
-        _ = simulatore.simula_produzione_completa()
+        if cache is None:
+            _ = simulatore.simula_produzione_completa(stampa=True)
+        else:
+            risultato, da_cache = cache.simula_produzione_completa(scenario, prodotti, 123,
+                                                                simulatore.capacita_totale_giornaliera)
+            print(f"Descrizione: {scenario.descrizione}\n")
+            simulatore.stampa_risultati(risultato['quantita_prodotti'], risultato['parametri_operativi'],
+                                        risultato['risultati_produzione'])
+            if da_cache:
+                print("\n(Risultato letto dalla cache delle simulazioni)")
 
         print(f"\nSimulazione completata!")
 
@@ -220,53 +234,93 @@ def esegui_simulazione(configurazione_scenari: ConfigurazioneScenari, configuraz
 
     input("\nPremere INVIO per tornare al menu principale...")
 
+def seleziona_scenari_multipli(configurazione_scenari: ConfigurazioneScenari) -> list[Scenario] | None:
+    """Permette all'utente di selezionare due o più scenari da confrontare"""
+
+    scenari = configurazione_scenari.get_scenari_disponibili()
+
+    print("Scenari disponibili:")
+    for i, scenario in enumerate(scenari, 1):
+        print(f"{i}. {scenario.nome}")
+
+    try:
+        scelte = input("\nSeleziona gli scenari da confrontare (es. 1,2,3 - INVIO per tutti): ").strip()
+        if not scelte:
+            return list(scenari)
+
+        selezionati = []
+        for scelta in scelte.split(','):
+            indice = int(scelta)
+            if not 1 <= indice <= len(scenari):
+                print("Selezione non valida.")
+                return None
+            if scenari[indice - 1] not in selezionati:
+                selezionati.append(scenari[indice - 1])
+
+        if len(selezionati) < 2:
+            print("Selezionare almeno due scenari.")
+            return None
+
+        return selezionati
+
+    except ValueError:
+        print("Inserire numeri validi separati da virgola.")
+        return None
+    except KeyboardInterrupt:
+        print("\nOperazione annullata.")
+        return None
+
 def confronta_scenari(configurazione_scenari: ConfigurazioneScenari, configurazione_prodotti: ConfigurazioneProdotti) -> None:
-    """Confronta i risultati di diversi scenari"""
+    """Confronta i risultati di diversi scenari su numeri casuali comuni"""
 
     print("\n" + "=" * 50)
     print("CONFRONTO SCENARI")
     print("=" * 50)
 
-    print("Seleziona il primo scenario:")
-    scenario1 = seleziona_scenario(configurazione_scenari)
-    if scenario1 is None:
+    scenari = seleziona_scenari_multipli(configurazione_scenari)
+    if scenari is None:
         return
 
-    print("\nSeleziona il secondo scenario:")
-    scenario2 = seleziona_scenario(configurazione_scenari)
-    if scenario2 is None:
+    try:
+        n_repliche = int(input("Numero di repliche (default 10000): ") or "10000")
+        if n_repliche < 2:
+            raise Exception("Errore inserimento 'numero di repliche'")
+        antitetiche = (input("Usare variabili antitetiche? (s/n, default s): ").strip().lower() or "s") == "s"
+        if antitetiche and n_repliche % 2 != 0:
+            n_repliche += 1
+    except ValueError:
+        print("Errore: Inserire valori numerici validi.")
+        input("\nPremere INVIO per tornare al menu principale...")
         return
 
-    print(f"\nConfronto tra '{scenario1['nome']}' e '{scenario2['nome']}'")
+    nomi = ', '.join(f"'{s.nome}'" for s in scenari)
+    print(f"\nConfronto tra {nomi} ({n_repliche} repliche su numeri casuali comuni)")
     print("-" * 60)
 
     prodotti = configurazione_prodotti.get_prodotti()
     try:
-        # Simula primo scenario
-        simulatore1 = SimulatoreProduzioneKimbo(scenario1, prodotti)
-        print(f"\nSimulazione {scenario1['nome']}:")
-        risultati1 = simulatore1.simula_produzione_completa()
+        risultati = confronta_scenari_multipli(scenari, prodotti, n_repliche, antitetiche=antitetiche)
+        livello = risultati['livello_confidenza'] * 100
 
-        print("\n" + "=" * 60)
-
-        # Simula secondo scenario
-        simulatore2 = SimulatoreProduzioneKimbo(scenario2, prodotti)
-        print(f"\nSimulazione {scenario2['nome']}:")
-        risultati2 = simulatore2.simula_produzione_completa()
+        print("\nTEMPO TOTALE MEDIO:")
+        for nome, dati in risultati['scenari'].items():
+            print(f"  - {nome}: {dati['tempo_totale_ore_medio']:.1f} ± {dati['semiampiezza']:.2f} ore")
 
         # Mostra confronto
         print("\n" + "=" * 60)
-        print("RIEPILOGO CONFRONTO:")
-        print(f"{scenario1['nome']}: {risultati1['risultati_produzione']['tempo_totale_ore']} ore totali")
-        print(f"{scenario2['nome']}: {risultati2['risultati_produzione']['tempo_totale_ore']} ore totali")
-
-        diff_ore = risultati2['risultati_produzione']['tempo_totale_ore'] - risultati1['risultati_produzione']['tempo_totale_ore']
-        if diff_ore > 0:
-            print(f"Il secondo scenario richiede {abs(diff_ore):.1f} ore in piu")
-        elif diff_ore < 0:
-            print(f"Il secondo scenario richiede {abs(diff_ore):.1f} ore in meno")
-        else:
-            print("I due scenari richiedono lo stesso tempo")
+        print(f"RIEPILOGO CONFRONTO (intervalli di confidenza al {livello:.0f}%):")
+        for differenza in risultati['differenze']:
+            diff_ore = differenza['differenza_ore']
+            inferiore, superiore = differenza['intervallo']
+            print(f"\n'{differenza['scenario_b']}' rispetto a '{differenza['scenario_a']}': "
+                  f"{diff_ore:+.1f} ore [{inferiore:+.1f}, {superiore:+.1f}]")
+
+            if not differenza['significativa']:
+                print("  La differenza non è statisticamente significativa")
+            elif diff_ore > 0:
+                print(f"  '{differenza['scenario_b']}' richiede {abs(diff_ore):.1f} ore in piu")
+            else:
+                print(f"  '{differenza['scenario_b']}' richiede {abs(diff_ore):.1f} ore in meno")
 
     except Exception as e:
         print(f"Errore durante il confronto: {e}")
@@ -274,17 +328,23 @@ def confronta_scenari(configurazione_scenari: ConfigurazioneScenari, configurazi
     input("\nPremere INVIO per tornare al menu principale...")
 
 
-
 # ===============================================
 # MAIN
 # ===============================================
 
 if __name__ == "__main__":
+    # Con argomenti da riga di comando si usa la modalità non interattiva (es. python main.py run ...)
+    if len(sys.argv) > 1:
+        from entità.cli import main as main_cli
+        sys.exit(main_cli(sys.argv[1:]))
+
     print("========== SIMULAZIONE PROCESSO PRODUTTIVO KIMBO ==========\n\n")
 
     """Funzione principale per eseguire la simulazione"""
     configurazione_scenari = ConfigurazioneScenari()
     configurazione_prodotti = ConfigurazioneProdotti()
+    cache = CacheRisultati()
+    cache.collega(configurazione_prodotti, configurazione_scenari)
 
     while True:
         try:
@@ -297,7 +357,7 @@ if __name__ == "__main__":
                 nuovo_scenario = crea_scenario_personalizzato()
                 if nuovo_scenario:
                     configurazione_scenari.add_scenario(nuovo_scenario)
-                    print(f"Scenario '{nuovo_scenario['nome']}' creato con successo!")
+                    print(f"Scenario '{nuovo_scenario.nome}' creato con successo!")
                     input("Premere INVIO per continuare...")
             elif scelta == '3':
                 visualizza_prodotti(configurazione_prodotti)
@@ -305,15 +365,16 @@ if __name__ == "__main__":
                 nuovo_prodotto = crea_prodotto()
                 if nuovo_prodotto:
                     configurazione_prodotti.add_prodotto(nuovo_prodotto)
-                    print(f"Prodotto '{nuovo_prodotto['nome']}' inserito con successo!")
+                    print(f"Prodotto '{nuovo_prodotto.nome}' inserito con successo!")
                     input("Premere INVIO per continuare...")
             elif scelta == '5':
-                esegui_simulazione(configurazione_scenari, configurazione_prodotti)
+                esegui_simulazione(configurazione_scenari, configurazione_prodotti, cache)
             elif scelta == '6':
                 confronta_scenari(configurazione_scenari, configurazione_prodotti)
             elif scelta == '7':
                 print("\nGrazie per aver usato il Simulatore Produzione Kimbo!")
                 print("Arrivederci!")
+                cache.chiudi()
                 break
             else:
                 print("Selezione non valida. Riprova.")
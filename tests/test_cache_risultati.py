@@ -0,0 +1,34 @@
+import unittest
+
+from entità.cache_risultati import CacheRisultati
+from entità.configurazione_prodotti import ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.configurazione_stabilimento import ConfigurazioneStabilimento
+
+
+class TestCapacitaNellaChiave(unittest.TestCase):
+    """Stabilimenti con capacità diverse non devono condividere le voci della cache"""
+
+    def setUp(self):
+        self.cache = CacheRisultati(':memory:')
+        self.scenario = ConfigurazioneScenari().get_scenario('produzione_standard')
+        self.prodotti = ConfigurazioneProdotti().get_prodotti()
+
+    def tearDown(self):
+        self.cache.chiudi()
+
+    def test_capacita_diverse_non_collidono(self):
+        standard, _ = self.cache.simula_produzione_completa(self.scenario, self.prodotti, 1)
+        ridotto, da_cache = self.cache.simula_produzione_completa(self.scenario, self.prodotti, 1, 5000)
+
+        self.assertFalse(da_cache)
+        self.assertLess(ridotto['parametri_operativi']['capacita_totale_effettiva'],
+                        standard['parametri_operativi']['capacita_totale_effettiva'])
+
+        _, da_cache = self.cache.simula_produzione_completa(
+            self.scenario, self.prodotti, 1, ConfigurazioneStabilimento.capacita_totale_giornaliera)
+        self.assertTrue(da_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import json
+import os
+import signal
+import tempfile
+import unittest
+
+from entità.checkpoint import Checkpoint
+from entità.cli import main
+from entità.configurazione_prodotti import ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.esecuzione_parallela import esegui_aggregato_parallelo
+from entità.esperimenti import esegui_sweep, griglia_fattoriale
+
+
+class CheckpointInterrotto(Checkpoint):
+    """Checkpoint che si invia SIGINT dopo il blocco 'dopo', come un Ctrl+C durante l'esecuzione"""
+
+    def __init__(self, percorso: str, dopo: int):
+        super().__init__(percorso, intervallo_secondi=3600)
+        self.dopo = dopo
+
+    def avanza(self, tipo: str, argomenti: dict, completate: int, totale: int, parziale) -> None:
+        if completate == self.dopo:
+            os.kill(os.getpid(), signal.SIGINT)
+        super().avanza(tipo, argomenti, completate, totale, parziale)
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Un'esecuzione interrotta e ripresa dà lo stesso risultato di una mai interrotta"""
+
+    def setUp(self):
+        self.scenario = ConfigurazioneScenari().get_scenario('alta_produzione')
+        self.catalogo = ConfigurazioneProdotti().get_catalogo()
+        cartella = tempfile.TemporaryDirectory()
+        self.addCleanup(cartella.cleanup)
+        self.percorso = os.path.join(cartella.name, 'studio.ckpt')
+
+    def _aggregato(self, checkpoint=None, seed: int = 3) -> dict:
+        return esegui_aggregato_parallelo(self.scenario, self.catalogo, 4_000, seed, 1, 'array', 100,
+                                          checkpoint=checkpoint)
+
+    def test_ripresa_aggregato(self):
+        with self.assertRaises(KeyboardInterrupt):
+            self._aggregato(CheckpointInterrotto(self.percorso, 21))
+        stato = Checkpoint(self.percorso).leggi()
+        self.assertEqual((stato['completate'], stato['totale']), (21, 40))
+
+        uscita = io.StringIO()
+        with redirect_stdout(uscita), redirect_stderr(io.StringIO()):
+            self.assertEqual(main(['riprendi', self.percorso, '--worker', '1']), 0)
+
+        atteso = json.loads(json.dumps(self._aggregato()['statistiche']))
+        self.assertEqual(json.loads(uscita.getvalue())['statistiche'], atteso)
+
+    def test_argomenti_diversi_rifiutati(self):
+        with self.assertRaises(KeyboardInterrupt):
+            self._aggregato(CheckpointInterrotto(self.percorso, 5))
+        with self.assertRaisesRegex(Exception, "appartiene a un'altra esecuzione"):
+            self._aggregato(Checkpoint(self.percorso), seed=4)
+
+    def test_ripresa_sweep(self):
+        punti = griglia_fattoriale(self.scenario, {'efficienza_impianti': [0.6, 0.7, 0.8, 0.9]})
+        with self.assertRaises(KeyboardInterrupt):
+            esegui_sweep(punti, self.catalogo, 200, 1, 1, 'array', punti_per_task=1,
+                         checkpoint=CheckpointInterrotto(self.percorso, 2))
+        ripreso = esegui_sweep(punti, self.catalogo, 200, 1, 1, 'array', punti_per_task=1,
+                               checkpoint=Checkpoint(self.percorso))
+        self.assertEqual(ripreso, esegui_sweep(punti, self.catalogo, 200, 1, 1, 'array', punti_per_task=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from entità.configurazione_prodotti import ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.esecuzione_parallela import deriva_seed, esegui_aggregato_parallelo, esegui_repliche_parallele
+
+
+class TestEsecuzioneParallela(unittest.TestCase):
+    """Risultati identici con qualunque numero di worker e riproducibili a parità di seed"""
+
+    def setUp(self):
+        self.scenario = ConfigurazioneScenari().get_scenario('alta_produzione')
+        self.catalogo = ConfigurazioneProdotti().get_catalogo()
+
+    def _aggregato(self, seed: int, n_worker: int) -> dict:
+        return esegui_aggregato_parallelo(self.scenario, self.catalogo, 3_000, seed, n_worker,
+                                          backend='array', dimensione_blocco=500)
+
+    def test_deriva_seed(self):
+        self.assertEqual(deriva_seed(7, 3), deriva_seed(7, 3))
+        seeds = {deriva_seed(7, indice) for indice in range(100)}
+        self.assertEqual(len(seeds), 100)
+        self.assertNotEqual(deriva_seed(7, 0), deriva_seed(8, 0))
+
+    def test_aggregato_identico_con_piu_worker(self):
+        uno = self._aggregato(11, 1)
+        due = self._aggregato(11, 2)
+        self.assertEqual(uno['n_worker'], 1)
+        self.assertEqual(due['n_worker'], 2)
+        self.assertEqual(uno['statistiche'], due['statistiche'])
+
+    def test_seed_fissato_riproducibile(self):
+        self.assertEqual(self._aggregato(11, 1)['statistiche'], self._aggregato(11, 1)['statistiche'])
+        self.assertNotEqual(self._aggregato(11, 1)['statistiche'], self._aggregato(12, 1)['statistiche'])
+
+    def test_repliche_identiche_con_piu_worker(self):
+        uno = esegui_repliche_parallele(self.scenario, self.catalogo, 2_000, 5, 1, 'array', 300)
+        due = esegui_repliche_parallele(self.scenario, self.catalogo, 2_000, 5, 2, 'array', 300)
+        self.assertEqual(list(uno['repliche']['tempo_totale_ore']), list(due['repliche']['tempo_totale_ore']))
+        self.assertEqual(uno['statistiche'], due['statistiche'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from entità.configurazione_prodotti import ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.esperimenti import esegui_sweep, griglia_fattoriale, ipercubo_latino
+from entità.fermi_macchina import ModelloFermi
+
+
+class TestCampiSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.base = ConfigurazioneScenari().get_scenario('produzione_standard')
+
+    def test_range_quantita_non_variabile(self):
+        with self.assertRaisesRegex(Exception, "range_quantita_min"):
+            griglia_fattoriale(self.base, {'range_quantita': [[0.2, 0.5]]})
+        with self.assertRaisesRegex(Exception, "range_quantita_min"):
+            ipercubo_latino(self.base, {'range_quantita': (0.2, 0.5)}, 4)
+
+    def test_estremi_del_range(self):
+        punti = griglia_fattoriale(self.base, {'range_quantita_min': [0.2, 0.4], 'range_quantita_max': [0.9]})
+
+        self.assertEqual([scenario.range_quantita for _, scenario in punti], [(0.2, 0.9), (0.4, 0.9)])
+        # Gli scenari dei punti restano utilizzabili come chiavi (cache e piani compilati)
+        self.assertEqual(len({scenario for _, scenario in punti}), 2)
+
+
+class TestSweepConFermi(unittest.TestCase):
+
+    def test_fermi_applicati_a_ogni_punto(self):
+        base = ConfigurazioneScenari().get_scenario('produzione_standard')
+        prodotti = ConfigurazioneProdotti().get_prodotti()
+        punti = griglia_fattoriale(base, {'efficienza_impianti': [0.8, 1.0]})
+        fermi = ModelloFermi.da_dict({'cambi_formato': {'Caffè in Grani': {'Caffè Macinato': 600}}})
+
+        senza = esegui_sweep(punti, prodotti, 200, seed=1, n_worker=1, backend='array')
+        con = esegui_sweep(punti, prodotti, 200, seed=1, n_worker=1, backend='array', fermi=fermi)
+        con_due_worker = esegui_sweep(punti, prodotti, 200, seed=1, n_worker=2, backend='array', punti_per_task=1,
+                                      fermi=fermi)
+
+        self.assertEqual(con, con_due_worker)
+        for riga_senza, riga_con in zip(senza, con):
+            self.assertGreater(riga_con['tempo_totale_ore_medio'], riga_senza['tempo_totale_ore_medio'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from entità.configurazione_prodotti import ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.fermi_macchina import ModelloFermi
+from entità.pianificazione import capacita_con_ore, giorni_minimi, ordina_per_priorita, pianifica_produzione
+from entità.report import rendi_testo
+from entità.simulatore_produzione_kimbo import SimulatoreProduzioneKimbo
+
+
+class TestCapacitaNulla(unittest.TestCase):
+    """Linee con capacità giornaliera nulla, ad esempio per una riparazione lunga tutta la giornata"""
+
+    def test_ordina_per_priorita_esclude_capacita_nulla(self):
+        for regola in ('giorni', 'quantita', 'tempo', 'ordine'):
+            self.assertNotIn(0, ordina_per_priorita(regola, [10, 5, 8], [0, 4, 3], [1.0, 2.0, 3.0]))
+        self.assertEqual(ordina_per_priorita('giorni', [10, 5, 8], [0, 4, 3], [1.0, 2.0, 3.0]), [2, 1])
+
+    def test_giorni_minimi_capacita_nulla(self):
+        self.assertEqual(giorni_minimi([0, 6], [0, 3], 10), 2)
+        with self.assertRaises(Exception):
+            giorni_minimi([5, 6], [0, 3], 10)
+
+    def test_orizzonte_con_linea_ferma_tutto_il_giorno(self):
+        # Un guasto dopo un minuto e riparazioni di mesi: la linea resta ferma per tutto l'orizzonte
+        fermi = ModelloFermi.da_dict({'guasti': {'Caffè in Grani': {
+            'tempo_tra_guasti': {'tipo': 'esponenziale', 'scala': 1},
+            'riparazione': {'tipo': 'esponenziale', 'scala': 1_000_000},
+        }}})
+        scenario = ConfigurazioneScenari().get_scenario('produzione_standard')
+        simulatore = SimulatoreProduzioneKimbo(scenario, ConfigurazioneProdotti().get_catalogo(), 1, fermi=fermi)
+        indice = simulatore.catalogo.indice['Caffè in Grani']
+
+        record = list(simulatore.simula_orizzonte(20))
+
+        self.assertEqual(len(record), 20)
+        ferma = [r for r in record if r.produzione[indice] == 0]
+        self.assertTrue(ferma)
+        # La domanda dei giorni di fermo passa al giorno successivo come arretrato
+        arretrato = 0
+        for r in record:
+            arretrato += r.domanda[indice] - r.produzione[indice]
+            self.assertEqual(r.arretrato[indice], arretrato)
+
+
+class TestOreLavorative(unittest.TestCase):
+    """Capacità di ogni prodotto limitata dalle unità lavorabili nelle ore del giorno"""
+
+    def setUp(self):
+        self.quantita = {'A': 300, 'B': 50}
+        self.parametri = {
+            'A': {'capacita_giornaliera_effettiva': 1000, 'tempo_produzione_unitario': 4.0},
+            'B': {'capacita_giornaliera_effettiva': 20, 'tempo_produzione_unitario': 1.0},
+            'capacita_totale_effettiva': 10_000,
+        }
+
+    def test_capacita_con_ore(self):
+        # 8h = 480 minuti: 120 unità da 4 minuti, la capacità di B resta il limite
+        self.assertEqual(capacita_con_ore([1000, 20], [4.0, 1.0], 8), [120, 20])
+
+    def test_piano_rispetta_le_ore(self):
+        senza_ore = pianifica_produzione(self.quantita, self.parametri, esatta=True)
+        self.assertEqual(senza_ore['giorno_completamento'], 3)
+
+        piano = pianifica_produzione(self.quantita, self.parametri, esatta=True, ore_lavorative_giorno=8)
+        self.assertEqual(piano['giorno_completamento'], 3)
+        for giorno in piano['piano_giornaliero']:
+            self.assertLessEqual(giorno['prodotti'].get('A', 0) * 4.0, 480)
+
+        piano = pianifica_produzione(self.quantita, self.parametri, esatta=True, ore_lavorative_giorno=4)
+        self.assertEqual(piano['giorno_completamento'], 5)
+        self.assertEqual(piano['giorni_minimi'], 5)
+
+    def test_report_rispetta_le_ore(self):
+        scenario = ConfigurazioneScenari().get_scenario('produzione_standard')
+        simulatore = SimulatoreProduzioneKimbo(scenario, ConfigurazioneProdotti().get_catalogo(), 5)
+        risultato = simulatore.simula_produzione_completa()
+        quantita = risultato['quantita_prodotti']
+        parametri = risultato['parametri_operativi']
+        minuti_giornata = scenario.ore_lavorative_giorno * 60
+
+        giorni = risultato['risultati_produzione']['giorni_completamento']
+        for nome, q in quantita.items():
+            self.assertGreaterEqual(giorni * minuti_giornata, q * parametri[nome]['tempo_produzione_unitario'])
+        piano = simulatore.pianifica_produzione(quantita, parametri, esatta=True)
+        self.assertEqual(piano['giorno_completamento'], giorni)
+
+    def test_report_giorno_singolare(self):
+        dati = {'livello': 'sintesi', 'prodotti_totali': 1, 'prodotti_capacita_superata': 0, 'quantita_totale': 5,
+                'capacita_totale_effettiva': 10, 'tempo_totale_ore': 0.5, 'tempo_totale_giorni': 0.06,
+                'ore_lavorative_giorno': 8, 'giorni_completamento': 1, 'capacita_totale_superata': False,
+                'vincoli_rispettati': True, 'prodotti': []}
+        self.assertIn("Completamento in 1 giorno ", rendi_testo(dati))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+from contextlib import redirect_stdout
+import io
+import json
+import unittest
+
+from entità.cli import main
+from entità.configurazione_prodotti import ConfigurazioneProdotti
+from entità.configurazione_scenari import ConfigurazioneScenari
+from entità.simulatore_eventi import MINUTI_GIORNO, SimulatoreEventiKimbo
+
+
+class SimulatoreRegistrato(SimulatoreEventiKimbo):
+    """Registra gli istanti in cui le macchine iniziano o riprendono un lotto"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.avvii = []
+        registro = self.avvii
+        avvia, riprendi = SimulatoreEventiKimbo._avvia, SimulatoreEventiKimbo._riprendi
+
+        def _avvia(macchina, lotto, adesso, coda_eventi, sequenza):
+            registro.append(adesso)
+            avvia(macchina, lotto, adesso, coda_eventi, sequenza)
+
+        def _riprendi(macchina, adesso, coda_eventi, sequenza):
+            registro.append(adesso)
+            riprendi(macchina, adesso, coda_eventi, sequenza)
+
+        self._avvia = _avvia
+        self._riprendi = _riprendi
+
+
+class TestSimulatoreEventi(unittest.TestCase):
+
+    def setUp(self):
+        self.scenario = ConfigurazioneScenari().get_scenario('produzione_standard')
+        self.catalogo = ConfigurazioneProdotti().get_catalogo()
+
+    def nel_turno(self, simulatore, minuto: float) -> bool:
+        calendario = simulatore.calendario
+        ore = simulatore.scenario_corrente.ore_lavorative_giorno
+        nel_giorno = minuto % MINUTI_GIORNO - calendario.inizio_giornata
+        return -1e-6 <= nel_giorno <= ore * 60 + 1e-6
+
+    def test_seed_fissato_riproducibile(self):
+        risultati = [SimulatoreEventiKimbo(self.scenario, self.catalogo, 3).simula() for _ in range(2)]
+        self.assertEqual(risultati[0]['tempo_completamento_minuti'], risultati[1]['tempo_completamento_minuti'])
+        self.assertEqual(risultati[0]['prodotti'], risultati[1]['prodotti'])
+        self.assertAlmostEqual(risultati[0]['tempo_completamento_minuti'], 18111.01765147187, places=6)
+
+    def test_lotti_solo_nei_turni(self):
+        simulatore = SimulatoreRegistrato(self.scenario, self.catalogo, 3)
+        risultati = simulatore.simula()
+
+        # Il lotto dura più giorni di calendario: i lotti sono interrotti e ripresi a ogni turno
+        self.assertGreater(risultati['turni_lavorati'], 1)
+        self.assertTrue(simulatore.avvii)
+        for minuto in simulatore.avvii:
+            self.assertTrue(self.nel_turno(simulatore, minuto), minuto)
+        for prodotto in risultati['prodotti'].values():
+            self.assertTrue(self.nel_turno(simulatore, prodotto['completamento_ore'] * 60))
+        self.assertTrue(self.nel_turno(simulatore, risultati['tempo_completamento_minuti']))
+
+    def test_comando_eventi(self):
+        uscite = []
+        for _ in range(2):
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                self.assertEqual(main(['eventi', '--scenario', 'produzione_standard', '--turni', '2', '--seed', '3']), 0)
+            uscite.append(json.loads(buffer.getvalue()))
+
+        self.assertEqual(uscite[0]['scenario']['turni_giorno'], 2)
+        self.assertEqual(uscite[0]['tempo_completamento_minuti'], uscite[1]['tempo_completamento_minuti'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import math
+import random
+import statistics
+import unittest
+
+from entità.statistiche_online import DigestQuantili, StatisticaOnline
+
+
+def quantile_esatto(ordinati: list, q: float) -> float:
+    """Quantile con interpolazione lineare tra i valori ordinati"""
+    posizione = q * (len(ordinati) - 1)
+    basso = math.floor(posizione)
+    alto = min(basso + 1, len(ordinati) - 1)
+    return ordinati[basso] + (ordinati[alto] - ordinati[basso]) * (posizione - basso)
+
+
+class TestStatisticaOnline(unittest.TestCase):
+    """Welford/Chan: unire due metà equivale a una sola passata sui dati"""
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.valori = [rng.lognormvariate(5, 0.4) for _ in range(20_000)]
+
+    def test_unione_due_parti_uguale_passata_unica(self):
+        unica = StatisticaOnline()
+        unica.aggiungi_valori(self.valori)
+
+        prima, seconda = StatisticaOnline(), StatisticaOnline()
+        prima.aggiungi_valori(self.valori[:7_000])
+        for valore in self.valori[7_000:]:
+            seconda.aggiungi(valore)
+        prima.unisci(seconda)
+
+        self.assertEqual(prima.n, unica.n)
+        self.assertAlmostEqual(prima.media, unica.media, places=9)
+        self.assertAlmostEqual(prima.varianza / unica.varianza, 1.0, places=9)
+        self.assertEqual((prima.minimo, prima.massimo), (unica.minimo, unica.massimo))
+
+    def test_valori_esatti(self):
+        statistica = StatisticaOnline()
+        statistica.aggiungi_valori(self.valori)
+        self.assertAlmostEqual(statistica.media, statistics.fmean(self.valori), places=9)
+        self.assertAlmostEqual(statistica.deviazione_standard / statistics.stdev(self.valori), 1.0, places=9)
+
+    def test_unione_con_vuota(self):
+        statistica = StatisticaOnline()
+        statistica.aggiungi_valori(self.valori[:100])
+        media = statistica.media
+        statistica.unisci(StatisticaOnline())
+        self.assertEqual((statistica.n, statistica.media), (100, media))
+
+
+class TestDigestQuantili(unittest.TestCase):
+    """I percentili stimati restano vicini a quelli esatti, anche dopo l'unione di più digest"""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.valori = [rng.gammavariate(4, 30) for _ in range(50_000)]
+        self.ordinati = sorted(self.valori)
+
+    def _verifica(self, digest: DigestQuantili) -> None:
+        for q, tolleranza in ((0.5, 0.002), (0.95, 0.002), (0.99, 0.001)):
+            stimato = digest.quantile(q)
+            # Errore misurato in rango: il valore stimato cade tra i quantili esatti q ± tolleranza
+            self.assertGreaterEqual(stimato, quantile_esatto(self.ordinati, q - tolleranza), q)
+            self.assertLessEqual(stimato, quantile_esatto(self.ordinati, q + tolleranza), q)
+
+    def test_percentili_passata_unica(self):
+        digest = DigestQuantili()
+        digest.aggiungi_valori(self.valori)
+        self._verifica(digest)
+
+    def test_percentili_dopo_unione(self):
+        parti = [DigestQuantili() for _ in range(8)]
+        for indice, valore in enumerate(self.valori):
+            parti[indice % 8].aggiungi(valore)
+        digest = parti[0]
+        for parte in parti[1:]:
+            digest.unisci(parte)
+        self._verifica(digest)
+
+    def test_estremi(self):
+        digest = DigestQuantili()
+        digest.aggiungi_valori(self.valori)
+        self.assertEqual(digest.quantile(0.0), self.ordinati[0])
+        self.assertEqual(digest.quantile(1.0), self.ordinati[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()